@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+bench_compaction_diagnostics.py (v1.2)
+
+Benchmark suite for the compaction diagnostics tool. Generates synthetic
+transcripts (see gen_session_transcripts.py) and times:
+
+  analyze_session        one large transcript, default decoding
+  analyze_session_full   same transcript with the other decoding mode
+                         (prefilter on/off); results must match
+  format_report          human-readable and --json report for many sessions
+  summary                discovery + analysis + one-line summary, end to end
+
+Each case reports wall time (best of --repeat), throughput in MB/s and
+lines/s, and peak RSS. Every case runs in a fresh worker process so peak
+RSS belongs to that case alone.
+
+--backend-check skips the timings and checks JSON backend equivalence
+instead. Each installed backend (stdlib json, orjson, msgspec) runs in
+its own interpreter under OPENCLAW_JSON_BACKEND, analyzes the large
+transcript plus a transcript of inputs the fast decoders reject or
+misread (NaN, Infinity, integers beyond 64 bits, lone surrogates) in
+both decoding modes, and decodes those inputs directly. Every backend
+must produce the same records as stdlib json; exits 1 otherwise.
+
+Baselines:
+  --save-baseline FILE   write results as the new baseline
+  --baseline FILE        compare against a baseline; exits 1 if any case is
+                         slower or uses more memory than the baseline by
+                         more than --tolerance (default: 0.20)
+
+Usage:
+  python3 TOOLS/advanced/bench_compaction_diagnostics.py
+  python3 TOOLS/advanced/bench_compaction_diagnostics.py --size 500M --repeat 1
+  python3 TOOLS/advanced/bench_compaction_diagnostics.py --save-baseline bench-baseline.json
+  python3 TOOLS/advanced/bench_compaction_diagnostics.py --baseline bench-baseline.json
+  python3 TOOLS/advanced/bench_compaction_diagnostics.py --backend-check
+"""
+from __future__ import annotations
+import argparse
+import importlib.util
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import openclaw_compaction_diagnostics as diag  # noqa: E402
+import gen_session_transcripts as gen  # noqa: E402
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def _best_of(fn, repeat):
+    best = None
+    out = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best, out
+
+
+def _comparable(result):
+    r = dict(result)
+    r["compaction_events"] = [e.to_record() for e in r["compaction_events"]]
+    return r
+
+
+# Lines stdlib json accepts but orjson/msgspec reject or decode differently
+FALLBACK_LINES = [
+    '{"type": "message", "usage": {"input_tokens": NaN}}',
+    '{"type": "message", "usage": {"output_tokens": -Infinity}, "content": "nearing compaction, store durable notes"}',
+    '{"type": "tool_use", "name": "write", "input": {"path": "memory/2026-01-01-\\ud800.md"}}',
+    '{"type": "message", "totalTokens": 123456789012345678901234567890}',
+    '{"type": "compaction", "summary": "token summary \\udc80", "tokensBefore": 18446744073709551616, '
+    '"tokensAfter": -9223372036854775809, "deletedCount": 3}',
+    '{"type": "tool_use", "name": "read", "input": {"path": "GLOBAL-STATE.yaml"}, "id": 99999999999999999999}',
+    '{"type": "message", "content": "picking up where we left off \\ud83d", "contextTokens": -Infinity}',
+    '{"type": "compaction", "summary": "second", "tokensBefore": NaN}',
+    '{"type": "tool_use", "name": "memory_search", "input": {"query": "\\udfff"}}',
+]
+
+
+def _canonical(obj):
+    """Stable text form for comparing records that may hold NaN."""
+    return json.dumps(obj, sort_keys=True, default=repr)
+
+
+# ── Cases (each runs in its own worker process) ─────────────────────
+
+def case_analyze_session(path, repeat, prefilter):
+    seconds, result = _best_of(lambda: diag.analyze_session(path, prefilter=prefilter), repeat)
+    return seconds, _comparable(result), _peak_rss_mb()
+
+
+def case_format_report(sessions_dir, repeat):
+    files = diag.find_session_files(sessions_dir)
+    results = list(diag.analyze_sessions(files))
+
+    def run():
+        diag.format_report(results)
+        diag.format_report(results, output_json=True)
+
+    seconds, _ = _best_of(run, repeat)
+    return seconds, None, _peak_rss_mb()
+
+
+def case_summary(sessions_dir, repeat, jobs):
+    def run():
+        files = diag.find_session_files(sessions_dir)
+        return diag.format_summary(list(diag.analyze_sessions(files, jobs=jobs)))
+
+    seconds, line = _best_of(run, repeat)
+    return seconds, line, _peak_rss_mb()
+
+
+def case_backend(paths):
+    out = {"backend": diag.openclaw_json.BACKEND, "loads": [], "records": {}}
+    for line in FALLBACK_LINES:
+        for data in (line, line.encode("utf-8")):
+            out["loads"].append(repr(diag.openclaw_json.loads(data)))
+    for path in paths:
+        for prefilter in (True, False):
+            result = diag.analyze_session(path, prefilter=prefilter)
+            key = f"{os.path.basename(path)} prefilter={prefilter}"
+            out["records"][key] = _canonical(result and _comparable(result))
+    return out
+
+
+def _run_case(fn, *args):
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        return pool.submit(fn, *args).result()
+
+
+def _run_with_backend(backend, fn, *args):
+    """Run fn in a freshly spawned interpreter with OPENCLAW_JSON_BACKEND=backend."""
+    saved = os.environ.get("OPENCLAW_JSON_BACKEND")
+    os.environ["OPENCLAW_JSON_BACKEND"] = backend
+    try:
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            return pool.submit(fn, *args).result()
+    finally:
+        if saved is None:
+            del os.environ["OPENCLAW_JSON_BACKEND"]
+        else:
+            os.environ["OPENCLAW_JSON_BACKEND"] = saved
+
+
+def check_backends(paths):
+    """Compare every installed fast backend against stdlib json. Returns failure messages."""
+    reference = _run_with_backend("json", case_backend, paths)
+    fast = [name for name in diag.openclaw_json.BACKENDS
+            if name != "json" and importlib.util.find_spec(name) is not None]
+    if not fast:
+        print("[WARN] No fast JSON backend installed; only stdlib json was run.")
+    failures = []
+    for name in fast:
+        got = _run_with_backend(name, case_backend, paths)
+        if got["backend"] != name:
+            failures.append(f"{name}: worker ran with backend {got['backend']}")
+            continue
+        for i, (want, have) in enumerate(zip(reference["loads"], got["loads"])):
+            if want != have:
+                line = FALLBACK_LINES[i // 2]
+                failures.append(f"{name}: loads({'bytes' if i % 2 else 'str'} {line!r}) -> {have}, json -> {want}")
+        for key, want in reference["records"].items():
+            if got["records"][key] != want:
+                failures.append(f"{name}: analyze_session({key}) differs from json")
+        print(f"{name}: {len(got['loads'])} fallback decodes, {len(got['records'])} records checked")
+    return failures
+
+
+def _row(seconds, nbytes, nlines, rss):
+    return {
+        "seconds": round(seconds, 4),
+        "mb_per_s": round(nbytes / 1e6 / seconds, 2) if seconds else None,
+        "lines_per_s": round(nlines / seconds) if seconds else None,
+        "peak_rss_mb": round(rss, 1) if rss is not None else None,
+    }
+
+
+def _count_lines(paths):
+    total = 0
+    for p in paths:
+        with open(p, "rb") as f:
+            total += sum(1 for _ in f)
+    return total
+
+
+def check_baseline(results, baseline, tolerance):
+    """Return a list of regression messages (empty if none)."""
+    failures = []
+    for name, base in baseline.get("cases", {}).items():
+        cur = results["cases"].get(name)
+        if cur is None:
+            continue
+        if base.get("mb_per_s") and cur["mb_per_s"] < base["mb_per_s"] * (1 - tolerance):
+            failures.append(f"{name}: throughput {cur['mb_per_s']} MB/s < baseline {base['mb_per_s']} MB/s")
+        if base.get("peak_rss_mb") and cur.get("peak_rss_mb") and \
+                cur["peak_rss_mb"] > base["peak_rss_mb"] * (1 + tolerance):
+            failures.append(f"{name}: peak RSS {cur['peak_rss_mb']} MB > baseline {base['peak_rss_mb']} MB")
+    return failures
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark the compaction diagnostics tool.")
+    ap.add_argument("--size", default="20M", help="Large transcript size for analyze_session (default: 20M)")
+    ap.add_argument("--sessions", type=int, default=50, help="Session count for report/summary (default: 50)")
+    ap.add_argument("--session-size", default="512K", help="Size per session for report/summary (default: 512K)")
+    ap.add_argument("--compaction-density", type=float, default=0.5)
+    ap.add_argument("--malformed-rate", type=float, default=0.001)
+    ap.add_argument("--jobs", type=int, default=1, help="--jobs for the summary case (default: 1)")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--save-baseline", help="Write results to this baseline file")
+    ap.add_argument("--baseline", help="Compare against this baseline file")
+    ap.add_argument("--tolerance", type=float, default=0.20)
+    ap.add_argument("--json", action="store_true", help="Print results as JSON")
+    ap.add_argument("--backend-check", action="store_true",
+                    help="Check that every installed JSON backend gives the same records as stdlib json")
+    args = ap.parse_args()
+
+    if args.backend_check:
+        with tempfile.TemporaryDirectory() as tmp:
+            big = os.path.join(tmp, "big.jsonl")
+            gen.generate(big, gen.parse_size(args.size), seed=args.seed,
+                         compaction_density=args.compaction_density, malformed_rate=args.malformed_rate)
+            fallback = os.path.join(tmp, "fallback.jsonl")
+            with open(fallback, "w", encoding="utf-8") as f:
+                f.write("\n".join(FALLBACK_LINES) + "\n")
+            failures = check_backends([big, fallback])
+        if failures:
+            for msg in failures:
+                print(f"[FAIL] {msg}", file=sys.stderr)
+            return 1
+        print("[OK] All JSON backends match stdlib json.")
+        return 0
+
+    params = {
+        "size": args.size, "sessions": args.sessions, "session_size": args.session_size,
+        "compaction_density": args.compaction_density, "malformed_rate": args.malformed_rate,
+        "jobs": args.jobs, "seed": args.seed, "json_backend": diag.openclaw_json.BACKEND,
+    }
+    results = {"params": params, "cases": {}}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        big = os.path.join(tmp, "big.jsonl")
+        big_bytes, big_lines, _ = gen.generate(
+            big, gen.parse_size(args.size), seed=args.seed,
+            compaction_density=args.compaction_density, malformed_rate=args.malformed_rate)
+
+        sessions_dir = os.path.join(tmp, "sessions")
+        os.makedirs(sessions_dir)
+        per_session = gen.parse_size(args.session_size)
+        for i in range(args.sessions):
+            gen.generate(os.path.join(sessions_dir, f"s{i:05d}.jsonl"), per_session,
+                         seed=args.seed * 100003 + i + 1,
+                         compaction_density=args.compaction_density,
+                         malformed_rate=args.malformed_rate)
+        session_files = diag.find_session_files(sessions_dir)
+        dir_bytes = sum(os.path.getsize(p) for p in session_files)
+        dir_lines = _count_lines(session_files)
+
+        t, default_result, rss = _run_case(case_analyze_session, big, args.repeat, diag.PREFILTER_DEFAULT)
+        results["cases"]["analyze_session"] = _row(t, big_bytes, big_lines, rss)
+        t, other_result, rss = _run_case(case_analyze_session, big, args.repeat, not diag.PREFILTER_DEFAULT)
+        results["cases"]["analyze_session_full"] = _row(t, big_bytes, big_lines, rss)
+        if default_result != other_result:
+            print("[FAIL] prefilter changed analysis results", file=sys.stderr)
+            return 1
+
+        t, _, rss = _run_case(case_format_report, sessions_dir, args.repeat)
+        results["cases"]["format_report"] = _row(t, dir_bytes, dir_lines, rss)
+        t, summary_line, rss = _run_case(case_summary, sessions_dir, args.repeat, args.jobs)
+        results["cases"]["summary"] = _row(t, dir_bytes, dir_lines, rss)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"JSON backend: {params['json_backend']}  |  large transcript: {big_bytes / 1e6:.1f} MB, "
+              f"{big_lines:,} lines  |  sessions: {args.sessions} x {args.session_size}")
+        print(f"Summary: {summary_line}")
+        print(f"  {'case':<24}{'seconds':>10}{'MB/s':>10}{'lines/s':>12}{'peak RSS MB':>14}")
+        for name, row in results["cases"].items():
+            rss = "-" if row["peak_rss_mb"] is None else f"{row['peak_rss_mb']:.1f}"
+            print(f"  {name:<24}{row['seconds']:>10.3f}{row['mb_per_s']:>10.1f}"
+                  f"{row['lines_per_s']:>12,}{rss:>14}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("params") != params:
+            print("[WARN] Baseline was recorded with different parameters; comparison may be meaningless.")
+        failures = check_baseline(results, baseline, args.tolerance)
+        if failures:
+            for msg in failures:
+                print(f"[FAIL] Regression: {msg}", file=sys.stderr)
+            return 1
+        print(f"[OK] Within {args.tolerance:.0%} of baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
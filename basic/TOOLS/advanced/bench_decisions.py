@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+bench_decisions.py (v1.0)
+
+Benchmark for the [DECISION] block scanner shared by the resolver and the
+linter (openclaw_decisions.py). Generates a synthetic multi-MB
+GLOBAL-STATE.yaml and MEMORY.md and times, per file:
+
+  regex        whole-file read plus the previous DOTALL regex
+               (\\[DECISION\\](.*?)(?=\\n\\[|\\Z)), with line numbers counted
+               incrementally (counting from the start of the file for
+               every match, as the tools once did, is quadratic)
+  scan_blocks  the streaming single-pass scanner
+  parse_file   scan_blocks plus building Decision records
+
+The scanner's blocks and line spans must match the regex's. Each case
+reports wall time (best of --repeat), MB/s and peak RSS, and runs in a
+fresh worker process.
+
+Usage:
+  python3 TOOLS/advanced/bench_decisions.py
+  python3 TOOLS/advanced/bench_decisions.py --size 20M --repeat 1
+  python3 TOOLS/advanced/bench_decisions.py --json
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import openclaw_decisions  # noqa: E402
+from gen_session_transcripts import WORDS, parse_size  # noqa: E402
+
+LEGACY_RE = re.compile(r"\[DECISION\](.*?)(?=\n\[|\Z)", re.DOTALL)
+
+DOMAINS = ["infra", "product", "ops", "security", "unknown"]
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def _best_of(fn, repeat):
+    best = None
+    out = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best, out
+
+
+def _decision(rng, day):
+    lines = ["[DECISION]",
+             "Decision: " + " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 14))),
+             "Approved by: owner",
+             f"Date: 2026-{1 + day // 28 % 12:02d}-{1 + day % 28:02d}",
+             f"Status: {rng.choice(('ACTIVE', 'ACTIVE', 'SUPERSEDED'))}",
+             f"Domain: {rng.choice(DOMAINS)}"]
+    if rng.random() < 0.3:
+        lines.append("Rationale: " + " ".join(rng.choice(WORDS) for _ in range(rng.randint(10, 60))))
+    return "\n".join(lines) + "\n"
+
+
+def generate(path, size_bytes, seed, style):
+    """Write a GLOBAL-STATE.yaml-like ("yaml") or MEMORY.md-like ("md") file; returns (bytes, blocks)."""
+    rng = random.Random(seed)
+    written = blocks = 0
+    with open(path, "w", encoding="utf-8") as f:
+        while written < size_bytes:
+            if style == "yaml":
+                chunk = f"{rng.choice(WORDS)}_{rng.randint(0, 999)}: {' '.join(rng.choice(WORDS) for _ in range(6))}\n"
+            else:
+                chunk = f"\n## {rng.choice(WORDS).title()}\n" + " ".join(
+                    rng.choice(WORDS) for _ in range(rng.randint(20, 120))) + "\n\n"
+            if rng.random() < 0.25:
+                chunk += _decision(rng, blocks) + ("\n[notes]\n" if style == "yaml" else "\n")
+                blocks += 1
+            f.write(chunk)
+            written += len(chunk)
+    return written, blocks
+
+
+# ── Cases (each runs in its own worker process) ─────────────────────
+
+def _legacy_blocks(path):
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        text = f.read()
+    blocks = []
+    line, pos = 1, 0
+    for m in LEGACY_RE.finditer(text):
+        line_start = line + text.count("\n", pos, m.start())
+        line, pos = line_start + text.count("\n", m.start(), m.end()), m.end()
+        blocks.append(("[DECISION]" + m.group(1), line_start, line))
+    return blocks
+
+
+def _scanned_blocks(path):
+    with open(path, "rb") as f:
+        return [(b.text, b.line_start, b.line_end) for b in openclaw_decisions.scan_blocks(f)]
+
+
+def case_regex(path, repeat):
+    seconds, blocks = _best_of(lambda: _legacy_blocks(path), repeat)
+    return seconds, blocks, _peak_rss_mb()
+
+
+def case_scan_blocks(path, repeat):
+    seconds, blocks = _best_of(lambda: _scanned_blocks(path), repeat)
+    return seconds, blocks, _peak_rss_mb()
+
+
+def case_parse_file(path, repeat):
+    seconds, decisions = _best_of(lambda: openclaw_decisions.parse_file(path, "bench"), repeat)
+    return seconds, len(decisions), _peak_rss_mb()
+
+
+def _run_case(fn, *args):
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        return pool.submit(fn, *args).result()
+
+
+def _row(seconds, nbytes, rss):
+    return {
+        "seconds": round(seconds, 4),
+        "mb_per_s": round(nbytes / 1e6 / seconds, 2) if seconds else None,
+        "peak_rss_mb": round(rss, 1) if rss is not None else None,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark the [DECISION] block scanner.")
+    ap.add_argument("--size", default="8M", help="Size of each generated file (default: 8M)")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = ap.parse_args()
+
+    size = parse_size(args.size)
+    results = {"params": {"size": args.size, "seed": args.seed}, "files": {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, style in (("GLOBAL-STATE.yaml", "yaml"), ("MEMORY.md", "md")):
+            path = os.path.join(tmp, name)
+            nbytes, nblocks = generate(path, size, args.seed, style)
+            cases = {}
+            t, scanned, rss = _run_case(case_scan_blocks, path, args.repeat)
+            cases["scan_blocks"] = _row(t, nbytes, rss)
+            t, _, rss = _run_case(case_parse_file, path, args.repeat)
+            cases["parse_file"] = _row(t, nbytes, rss)
+            t, legacy, rss = _run_case(case_regex, path, args.repeat)
+            cases["regex"] = _row(t, nbytes, rss)
+            if legacy != scanned:
+                print(f"[FAIL] {name}: scanner blocks differ from the regex", file=sys.stderr)
+                return 1
+            results["files"][name] = {"bytes": nbytes, "blocks": nblocks, "cases": cases}
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+    for name, info in results["files"].items():
+        print(f"{name}: {info['bytes'] / 1e6:.1f} MB, {info['blocks']:,} blocks")
+        print(f"  {'case':<16}{'seconds':>10}{'MB/s':>10}{'peak RSS MB':>14}")
+        for case, row in info["cases"].items():
+            rss = "-" if row["peak_rss_mb"] is None else f"{row['peak_rss_mb']:.1f}"
+            print(f"  {case:<16}{row['seconds']:>10.3f}{row['mb_per_s']:>10.1f}{rss:>14}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+gen_session_transcripts.py (v1.0)
+
+Synthetic OpenClaw session transcript generator, for benchmarking and
+exercising the compaction diagnostics tool without real (private) logs.
+
+Each transcript is a sequence of turns: user message, assistant reply with
+usage, tool calls and tool results. Context tokens grow turn by turn.
+Compactions are inserted at the requested density, most of them preceded
+by a pre-compaction flush (flush prompt, memory/state writes, NO_REPLY)
+and followed by a recovery sequence (state reads, memory_search,
+announcement), so every detector in the diagnostics tool gets exercised.
+
+Usage:
+  # One 50 MB transcript
+  python3 TOOLS/advanced/gen_session_transcripts.py --out /tmp/sessions --size 50M
+
+  # 200 small sessions, dense compactions, heavy reads, 1% malformed lines
+  python3 TOOLS/advanced/gen_session_transcripts.py --out /tmp/sessions \\
+      --count 200 --size 2M --compaction-density 2 --tool-mix read=8,exec=2 \\
+      --malformed-rate 0.01
+
+Privacy: Output is entirely synthetic.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import random
+from datetime import datetime, timedelta, timezone
+
+DEFAULT_TOOL_MIX = {"read": 4, "exec": 4, "write": 2, "edit": 2, "web_search": 1, "memory_search": 1}
+
+WORDS = (
+    "the agent reads file writes update config session memory state decision "
+    "function return value error path test build deploy review schedule note "
+    "customer meeting draft plan release owner budget risk follow up summary"
+).split()
+
+CODE_LINES = [
+    'def load(path):',
+    '    with open(path, "r") as f:',
+    '        return json.load(f)',
+    '\tif not data.get("status"):',
+    '        raise ValueError(f"missing field: {key!r}")',
+    '    print(\'ok\', len(rows), "rows")',
+]
+
+PATHS = ["src/app.py", "README.md", "notes/plan.md", "docs/api.md", "tests/test_app.py"]
+
+CONTEXT_CEILING = 195000   # tokens; growth saturates here if compactions are sparse
+
+FLUSH_PROMPT = "Pre-compaction memory flush. Session nearing compaction. Store durable memories now."
+RECOVERY_TEXT = "Picking up where we left off: re-read GLOBAL-STATE.yaml and today's memory log."
+
+
+def parse_size(text: str) -> int:
+    """Parse sizes like 500K, 20M, 2G (powers of 1024) or plain bytes."""
+    text = text.strip().upper()
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def parse_tool_mix(text: str) -> dict:
+    """Parse 'read=4,exec=2' into {'read': 4, 'exec': 2}."""
+    mix = {}
+    for part in text.split(","):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+class _Session:
+    def __init__(self, rng, tool_mix):
+        self.rng = rng
+        self.tools = list(tool_mix)
+        self.weights = [tool_mix[t] for t in self.tools]
+        self.tokens = rng.randint(8000, 20000)
+        self.clock = datetime(2026, 2, 1, 9, 0, tzinfo=timezone.utc)
+        self.day = self.clock.strftime("%Y-%m-%d")
+
+    def ts(self):
+        self.clock += timedelta(seconds=self.rng.randint(2, 90))
+        return self.clock.isoformat().replace("+00:00", "Z")
+
+    def text(self, lo, hi):
+        return " ".join(self.rng.choice(WORDS) for _ in range(self.rng.randint(lo, hi)))
+
+    def code(self, lo, hi):
+        return "\n".join(self.rng.choice(CODE_LINES) for _ in range(self.rng.randint(lo, hi)))
+
+    def grow(self, tokens):
+        self.tokens = min(self.tokens + tokens, CONTEXT_CEILING)
+
+    def usage(self):
+        self.grow(self.rng.randint(300, 4000))
+        return {"input_tokens": self.tokens, "output_tokens": self.rng.randint(20, 1500)}
+
+    def message(self, role, content, usage=False):
+        msg = {"role": role, "content": content}
+        if usage:
+            msg["usage"] = self.usage()
+        return {"type": "message", "timestamp": self.ts(), "message": msg}
+
+    def tool_use(self, name, path=None):
+        # Tool calls use the flat Anthropic-style entry (content block list
+        # and usage at the top level).
+        args = {"path": path} if path else {"query": self.text(2, 6)}
+        return {"type": "message", "timestamp": self.ts(), "role": "assistant", "content": [
+            {"type": "text", "text": self.text(3, 20)},
+            {"type": "tool_use", "name": name, "input": args},
+        ], "usage": self.usage()}
+
+    def tool_result(self, name):
+        body = self.code(10, 300) if name in ("read", "exec") else self.text(5, 60)
+        self.grow(len(body) // 4)
+        return {"type": "tool_result", "timestamp": self.ts(), "tool_name": name, "content": body}
+
+    def turn(self):
+        """One ordinary user/assistant exchange, possibly with tool calls."""
+        out = [self.message("user", self.text(5, 60))]
+        for _ in range(self.rng.choice((0, 0, 1, 1, 2, 3))):
+            name = self.rng.choices(self.tools, self.weights)[0]
+            path = None
+            if name in ("read", "write", "edit"):
+                path = self.rng.choice(PATHS)
+            out.append(self.tool_use(name, path))
+            out.append(self.tool_result(name))
+        out.append(self.message("assistant", [{"type": "text", "text": self.text(10, 250)}], usage=True))
+        if self.rng.random() < 0.05:
+            out.append({"type": "session_status", "timestamp": self.ts(), "totalTokens": self.tokens,
+                        "contextTokens": self.tokens})
+        return out
+
+    def compaction(self, flush, recover):
+        out = []
+        if flush:
+            out.append(self.message("user", FLUSH_PROMPT))
+            out.append(self.tool_use("write", f"memory/{self.day}.md"))
+            out.append(self.tool_result("write"))
+            if self.rng.random() < 0.6:
+                out.append(self.tool_use("edit", "GLOBAL-STATE.yaml"))
+                out.append(self.tool_result("edit"))
+            out.append(self.message("assistant", "NO_REPLY", usage=True))
+        before = self.tokens
+        self.tokens = self.rng.randint(15000, 40000)
+        out.append({"type": "compaction", "timestamp": self.ts(), "summary": self.text(40, 200),
+                    "tokensBefore": before, "deletedCount": self.rng.randint(50, 400)})
+        if recover:
+            out.append(self.message("user", self.text(5, 30)))
+            out.append(self.tool_use("read", "GLOBAL-STATE.yaml"))
+            out.append(self.tool_result("read"))
+            if self.rng.random() < 0.7:
+                out.append(self.tool_use("read", f"memory/{self.day}.md"))
+                out.append(self.tool_result("read"))
+            if self.rng.random() < 0.5:
+                out.append(self.tool_use("memory_search"))
+                out.append(self.tool_result("memory_search"))
+            out.append(self.message("assistant", RECOVERY_TEXT, usage=True))
+        return out
+
+
+def generate(path, size_bytes, seed=0, compaction_density=0.5, tool_mix=None,
+             malformed_rate=0.0, flush_rate=0.8, recovery_rate=0.7):
+    """
+    Write one transcript of roughly size_bytes to path.
+
+    compaction_density is compactions per 1000 lines. Returns
+    (bytes_written, lines_written, compactions).
+    """
+    rng = random.Random(seed)
+    session = _Session(rng, tool_mix or DEFAULT_TOOL_MIX)
+    written = lines = compactions = 0
+    per_line = compaction_density / 1000.0
+    with open(path, "w", encoding="utf-8") as f:
+        while written < size_bytes:
+            if rng.random() < per_line * 6:  # a turn averages ~6 lines
+                entries = session.compaction(rng.random() < flush_rate, rng.random() < recovery_rate)
+                compactions += 1
+            else:
+                entries = session.turn()
+            for e in entries:
+                line = json.dumps(e)
+                if malformed_rate and rng.random() < malformed_rate:
+                    if rng.random() < 0.5:
+                        line = line[: rng.randint(1, max(1, len(line) - 1))]
+                    else:  # still braced, so it passes a cheap {...} shape check
+                        line = line[:-1] + ", oops}"
+                f.write(line + "\n")
+                written += len(line) + 1
+                lines += 1
+    return written, lines, compactions
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Generate synthetic OpenClaw session transcripts.")
+    ap.add_argument("--out", required=True, help="Output directory")
+    ap.add_argument("--count", type=int, default=1, help="Number of session files (default: 1)")
+    ap.add_argument("--size", default="10M", help="Approximate size per file, e.g. 1M, 500M, 2G (default: 10M)")
+    ap.add_argument("--compaction-density", type=float, default=0.5,
+                    help="Compactions per 1000 lines (default: 0.5)")
+    ap.add_argument("--tool-mix", default="", help="Tool weights, e.g. read=4,exec=4,write=2")
+    ap.add_argument("--malformed-rate", type=float, default=0.0,
+                    help="Fraction of lines emitted as malformed JSON, half truncated and half "
+                         "still braced (default: 0)")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    size = parse_size(args.size)
+    mix = parse_tool_mix(args.tool_mix) if args.tool_mix else None
+    for i in range(args.count):
+        path = os.path.join(args.out, f"synthetic-{args.seed:04d}-{i:05d}.jsonl")
+        nbytes, nlines, ncomp = generate(path, size, seed=args.seed * 100003 + i,
+                                         compaction_density=args.compaction_density,
+                                         tool_mix=mix, malformed_rate=args.malformed_rate)
+        print(f"{path}: {nbytes / 1e6:.1f} MB, {nlines:,} lines, {ncomp} compactions")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
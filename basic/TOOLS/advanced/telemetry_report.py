@@ -5,11 +5,15 @@ telemetry_report.py (v3.1)
 Generates a local summary of telemetry metrics.jsonl.
 """
 from __future__ import annotations
-import json
+import os
+import sys
 from collections import Counter, defaultdict
 from pathlib import Path
 import argparse
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import openclaw_json  # noqa: E402
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--workspace", required=True)
@@ -27,7 +31,7 @@ def main():
             if not line: 
                 continue
             try:
-                events.append(json.loads(line))
+                events.append(openclaw_json.loads(line))
             except Exception:
                 continue
 
@@ -49,6 +53,22 @@ def main():
     if lint_runs:
         print(f"Linter runs: {lint_runs}")
 
+    # --profile runs (openclaw_profile): latest per tool
+    latest = {}
+    for e in events:
+        if e.get("event") == "tool_profile":
+            latest[e.get("tool", "unknown")] = e
+    if latest:
+        print("")
+        print("Latest --profile run per tool:")
+        for tool, e in sorted(latest.items()):
+            phases = e.get("phases") or {}
+            line = f"- {tool}: {e.get('wall_ms', 0):.1f} ms"
+            if phases:
+                name, top = max(phases.items(), key=lambda kv: kv[1].get("wall_ms", 0))
+                line += f" (slowest phase: {name}, {top.get('wall_ms', 0):.1f} ms)"
+            print(line)
+
     return 0
 
 if __name__ == "__main__":
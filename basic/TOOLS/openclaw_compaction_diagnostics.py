@@ -29,50 +29,300 @@ Usage:
   # JSON output (for telemetry ingestion)
   python3 openclaw_compaction_diagnostics.py report --json
 
+  # Streaming NDJSON: one line per session as it is analyzed, then a summary
+  python3 openclaw_compaction_diagnostics.py report --ndjson
+
+  # Every agent under ~/.openclaw/agents: per-agent rollups plus a fleet total
+  python3 openclaw_compaction_diagnostics.py summary --all-agents
+
   # Quick summary (one-liner)
   python3 openclaw_compaction_diagnostics.py summary
+
+  # Follow sessions live; logs compaction_detected telemetry events
+  python3 openclaw_compaction_diagnostics.py watch
+
+  # Sessions stored in dated subdirectories (YYYY/MM/DD or YYYY-MM-DD)
+  python3 openclaw_compaction_diagnostics.py summary --days 30 --partitioned
+
+  # Limit parallelism (default: one worker process per CPU)
+  python3 openclaw_compaction_diagnostics.py summary --days 30 --jobs 4
+
+  # Bypass the per-session result cache (<workspace>/.cache/)
+  python3 openclaw_compaction_diagnostics.py report --no-cache
+
+  # Large transcripts: inspect only the windows around compactions via mmap
+  python3 openclaw_compaction_diagnostics.py report --engine mmap
+
+  # Build/update the SQLite event index, then report from it without rescans
+  python3 openclaw_compaction_diagnostics.py index
+  python3 openclaw_compaction_diagnostics.py report --from-index --days 90
+
+  # Where the time goes: per-phase and per-detector-rule profile on stderr
+  python3 openclaw_compaction_diagnostics.py summary --profile
 """
 
 import argparse
+import ctypes
+import ctypes.util
+import functools
 import json
 import os
+import select
+import sqlite3
+import struct
 import sys
-import glob
+import gzip
+import itertools
+import mmap
 import re
+import time
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from collections import defaultdict
+from collections import OrderedDict, defaultdict, deque, namedtuple
+from array import array
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+
+import openclaw_json
+import openclaw_profile
+
+# xz and bz2 support are optional in some Python builds
+try:
+    import bz2
+except ImportError:
+    bz2 = None
+try:
+    import lzma
+except ImportError:
+    lzma = None
 
 
 # ── Defaults ─────────────────────────────────────────────────────────
 
-DEFAULT_SESSIONS_DIR = os.path.expanduser("~/.openclaw/agents/main/sessions")
+DEFAULT_AGENTS_ROOT = os.path.expanduser("~/.openclaw/agents")
+DEFAULT_SESSIONS_DIR = os.path.join(DEFAULT_AGENTS_ROOT, "main", "sessions")
 DEFAULT_WORKSPACE = os.path.expanduser("~/.openclaw/workspace")
+DEFAULT_JOBS = os.cpu_count() or 1
+# Below both thresholds, analyzing in-process beats starting workers.
+POOL_MIN_FILES = 16
+POOL_MIN_BYTES = 64 << 20
 
 
 # ── JSONL Parsing ────────────────────────────────────────────────────
 
+# Archived transcripts (sessions.jsonl.gz etc.) are decompressed on the fly.
+COMPRESSED_OPENERS = {".gz": gzip.open}
+if bz2 is not None:
+    COMPRESSED_OPENERS[".bz2"] = bz2.open
+if lzma is not None:
+    COMPRESSED_OPENERS[".xz"] = lzma.open
+TRANSCRIPT_SUFFIXES = (".jsonl",) + tuple(".jsonl" + ext for ext in COMPRESSED_OPENERS)
+
+_DECOMPRESS_ERRORS = (EOFError, OSError) + ((lzma.LZMAError,) if lzma is not None else ())
+
+
+def _is_compressed(filepath):
+    return filepath.endswith(tuple(COMPRESSED_OPENERS))
+
+
+def _read_lines(filepath):
+    """
+    Yield the raw lines (bytes) of a plain or compressed transcript.
+    Archives are streamed, so memory stays bounded by the longest line. A
+    truncated or corrupt archive yields the lines before the damage and
+    prints a warning.
+    """
+    ext = os.path.splitext(filepath)[1]
+    opener = COMPRESSED_OPENERS.get(ext)
+    if opener is None:
+        with open(filepath, "rb") as f:
+            yield from f
+        return
+    n = 0
+    try:
+        with opener(filepath, "rb") as f:
+            for raw in f:
+                yield raw
+                n += 1
+    except _DECOMPRESS_ERRORS as exc:
+        print(f"[WARN] {filepath}: unreadable after line {n} ({exc})", file=sys.stderr)
+
+
 def parse_jsonl(filepath):
-    """Parse a JSONL session transcript. Yields (line_number, entry) tuples."""
-    with open(filepath, "r", encoding="utf-8", errors="replace") as f:
-        for i, line in enumerate(f):
-            line = line.strip()
-            if not line:
+    """Parse a JSONL session transcript (plain or compressed). Yields (line_number, entry) tuples."""
+    for i, raw in enumerate(_read_lines(filepath)):
+        entry = _parse_line(raw)
+        if entry is not None:
+            yield (i, entry)
+
+
+def _parse_line(raw):
+    """Decode one raw transcript line. Returns None for blank or malformed lines."""
+    line = raw.decode("utf-8", errors="replace").strip()
+    if not line:
+        return None
+    try:
+        return openclaw_json.loads(line)
+    except json.JSONDecodeError:
+        return None
+
+
+# Raw-byte markers (matched against the lowercased line) for the only checks
+# that apply to every entry: compaction detection and peak tokens. All other
+# detectors run inside the windows around a compaction, which decode lazily.
+# Compaction markers come from the detector rules (DETECTORS.prefilter_markers).
+PREFILTER_MARKERS = (b'tokens"', b'"usage"')
+
+# A \u escape of an ASCII letter (e.g. "\u0063ompaction") hides a marker from
+# any byte search. Encoders never emit these, so such lines are just decoded.
+_ESCAPED_LETTER_RE = re.compile(rb"\\u00[4-7][0-9a-fA-F]")
+
+# The byte scan beats stdlib json.loads, but not orjson/msgspec decoding.
+PREFILTER_DEFAULT = openclaw_json.BACKEND == "json"
+
+
+def _needs_decode(stripped):
+    """
+    Prefilter for a stripped raw line. False means the line is a JSON object
+    that cannot be a compaction or carry token counts, so decoding can wait
+    until (and unless) a compaction window needs it. Lines that do not look
+    like a complete object are always decoded, so truncated writes are still
+    dropped as malformed.
+    """
+    if not (stripped.startswith(b"{") and stripped.endswith(b"}")):
+        return True
+    lowered = stripped.lower()
+    for marker in DETECTORS.prefilter_markers:
+        if marker in lowered:
+            return True
+    return b"\\u" in stripped and _ESCAPED_LETTER_RE.search(stripped) is not None
+
+
+# Dates in file and directory names bound a transcript's last activity for
+# --days pruning: a name dated D (or a partition for day/month/year D) is
+# assumed to hold no writes later than NAME_DATE_SLACK_DAYS after D ends.
+NAME_DATE_SLACK_DAYS = 2
+_NAME_DATE_RE = re.compile(r"(?<!\d)(\d{4})-(\d{2})-(\d{2})(?!\d)")
+_PARTITION_RE = re.compile(r"(\d{4})(?:-(\d{2})(?:-(\d{2}))?)?")
+
+# Stats taken during discovery, reused once by SessionCache.stat_key so a
+# discovered transcript is stat'ed once per run.
+_DISCOVERED_STATS = {}
+
+
+def _period_end(year, month=None, day=None):
+    """Local timestamp at the end of a year, month or day (None if not a real date)."""
+    if month is not None and not 1 <= month <= 12:
+        return None
+    try:
+        if day is not None:
+            return (datetime(year, month, day) + timedelta(days=1)).timestamp()
+        if month is not None:
+            return datetime(year + month // 12, month % 12 + 1, 1).timestamp()
+        return datetime(year + 1, 1, 1).timestamp()
+    except (ValueError, OverflowError):
+        return None
+
+
+def _partition(name, parent):
+    """
+    Date parts of a partition directory below one dated `parent` (an empty
+    tuple at the top): YYYY, YYYY-MM, YYYY-MM-DD, or MM / DD nested under a
+    year / month. None if `name` is not a partition.
+    """
+    if not parent:
+        m = _PARTITION_RE.fullmatch(name)
+        return tuple(int(g) for g in m.groups() if g) if m else None
+    if len(parent) < 3 and len(name) == 2 and name.isdigit():
+        return parent + (int(name),)
+    return None
+
+
+def _scan_session_files(sessions_dir, cutoff=None, partitioned=False, parent=()):
+    """
+    Yield (path, stat_result) for transcripts directly in sessions_dir (and,
+    if partitioned, in date-named subdirectories), in directory order. Names
+    and partitions dated before the cutoff are pruned without a stat; every
+    other candidate is stat'ed exactly once. An archive is skipped while its
+    uncompressed original is present, so archives are yielded after the
+    directory's plain transcripts.
+    """
+    archives = []
+    plain = set()
+    subdirs = []
+    try:
+        it = os.scandir(sessions_dir)
+    except OSError:
+        return
+    with it:
+        for entry in it:
+            name = entry.name
+            if not name.endswith(TRANSCRIPT_SUFFIXES):
+                if partitioned:
+                    part = _partition(name, parent)
+                    end = _period_end(*part) if part is not None else None
+                    if end is not None and entry.is_dir() and (
+                            cutoff is None or end + NAME_DATE_SLACK_DAYS * 86400 >= cutoff):
+                        subdirs.append((entry.path, part))
+                continue
+            if cutoff is not None:
+                m = _NAME_DATE_RE.search(name)
+                if m:
+                    end = _period_end(*map(int, m.groups()))
+                    if end is not None and end + NAME_DATE_SLACK_DAYS * 86400 < cutoff:
+                        continue
+            if not name.endswith(".jsonl"):
+                archives.append(entry)
                 continue
+            plain.add(name)
             try:
-                yield (i, json.loads(line))
-            except json.JSONDecodeError:
+                st = entry.stat()
+            except OSError:
                 continue
+            if cutoff is None or st.st_mtime >= cutoff:
+                yield entry.path, st
+    for entry in archives:
+        name = entry.name
+        if name[:name.rindex(".jsonl")] + ".jsonl" in plain:
+            continue
+        try:
+            st = entry.stat()
+        except OSError:
+            continue
+        if cutoff is None or st.st_mtime >= cutoff:
+            yield entry.path, st
+    for path, part in subdirs:
+        yield from _scan_session_files(path, cutoff, partitioned, part)
+
 
+def _days_cutoff(days):
+    return None if days is None else datetime.now().timestamp() - (days * 86400)
 
-def find_session_files(sessions_dir, days=None):
-    """Find .jsonl session files, optionally filtered by modification time."""
-    pattern = os.path.join(sessions_dir, "*.jsonl")
-    files = glob.glob(pattern)
-    if days is not None:
-        cutoff = datetime.now().timestamp() - (days * 86400)
-        files = [f for f in files if os.path.getmtime(f) >= cutoff]
-    return sorted(files, key=os.path.getmtime, reverse=True)
+
+def iter_session_files(sessions_dir, days=None, partitioned=False):
+    """
+    Lazily yield session transcripts (.jsonl and compressed .jsonl.gz/.xz/
+    .bz2) in directory order, so analysis can start while a large
+    directory is still being listed. See find_session_files for filtering.
+    """
+    for path, st in _scan_session_files(sessions_dir, _days_cutoff(days), partitioned):
+        _DISCOVERED_STATS[path] = st
+        yield path
+
+
+def find_session_files(sessions_dir, days=None, partitioned=False):
+    """
+    Find session transcripts (.jsonl and compressed .jsonl.gz/.xz/.bz2),
+    newest first, optionally filtered by modification time (days). An
+    archive is skipped while its uncompressed original is still present.
+    With days, names carrying an older YYYY-MM-DD date are skipped without
+    a stat; with partitioned, date-named subdirectories (YYYY, YYYY-MM,
+    YYYY-MM-DD, YYYY/MM/DD) are searched too and pruned the same way.
+    """
+    found = list(_scan_session_files(sessions_dir, _days_cutoff(days), partitioned))
+    found.sort(key=lambda item: item[1].st_mtime, reverse=True)
+    _DISCOVERED_STATS.update(found)
+    return [path for path, _ in found]
 
 
 # ── Analysis Engine ──────────────────────────────────────────────────
@@ -94,139 +344,672 @@ class CompactionEvent:
         self.tokens_after = None
         self.summary_available = False
 
+    # Plain-dict form: picklable for worker processes, JSON-safe for storage.
+    # The raw transcript entry is dropped; nothing downstream reads it.
+    _RECORD_FIELDS = (
+        "timestamp", "pre_flush_detected", "memory_writes_before",
+        "state_writes_before", "state_reads_after", "memory_reads_after",
+        "memory_search_after", "recovery_announced", "tokens_before",
+        "tokens_after", "summary_available",
+    )
 
-def analyze_session(filepath, workspace=None):
-    """
-    Analyze a single session transcript for compaction health.
+    def to_record(self):
+        rec = {"line_num": self.line_num}
+        for field in self._RECORD_FIELDS:
+            value = getattr(self, field)
+            rec[field] = list(value) if isinstance(value, list) else value
+        return rec
+
+    @classmethod
+    def from_record(cls, rec):
+        ce = cls(rec["line_num"], None)
+        for field in cls._RECORD_FIELDS:
+            setattr(ce, field, rec[field])
+        return ce
+
+    @property
+    def flush_ok(self):
+        return bool(self.pre_flush_detected or self.memory_writes_before or self.state_writes_before)
+
+    @property
+    def recovery_ok(self):
+        return bool(self.state_reads_after or self.memory_reads_after or self.memory_search_after)
+
+
+# ── Token Series ─────────────────────────────────────────────────────
+#
+# Every entry carrying a token count becomes a (line, timestamp, tokens)
+# point. Points live in typed arrays; once SERIES_BUFFER points accumulate
+# the buffer is halved with LTTB (largest-triangle-three-buckets), so
+# memory per session is fixed however long the transcript. Records keep
+# SERIES_RECORD_POINTS points; report --json downsamples further to
+# --series-points.
+
+SERIES_BUFFER = 1024
+SERIES_RECORD_POINTS = 128
+DEFAULT_SERIES_POINTS = 64
+_SERIES_MAX_TOKENS = 2 ** 64 - 1
+
+
+def _parse_timestamp(value):
+    """ISO-8601 transcript timestamp -> Unix seconds (NaN if absent or unparseable)."""
+    if not isinstance(value, str):
+        return float("nan")
+    try:
+        ts = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return float("nan")
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.timestamp()
+
+
+def lttb_indices(xs, ys, n):
+    """Indices of the n points LTTB keeps from the series (xs, ys); all if n >= len."""
+    size = len(xs)
+    if n >= size:
+        return list(range(size))
+    if n < 3:
+        return [0, size - 1][:max(n, 0)]
+    every = (size - 2) / (n - 2)
+    keep = [0]
+    a = 0
+    for i in range(n - 2):
+        avg_start = int((i + 1) * every) + 1
+        avg_end = min(int((i + 2) * every) + 1, size)
+        span = avg_end - avg_start
+        avg_x = sum(xs[avg_start:avg_end]) / span
+        avg_y = sum(ys[avg_start:avg_end]) / span
+
+        ax, ay = xs[a], ys[a]
+        best, best_area = None, -1.0
+        for j in range(int(i * every) + 1, int((i + 1) * every) + 1):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        keep.append(best)
+        a = best
+    keep.append(size - 1)
+    return keep
+
+
+class TokenSeries:
+    """Bounded, array-backed token-count series for one session."""
+
+    def __init__(self):
+        self.lines = array("Q")
+        self.times = array("d")             # Unix seconds, NaN when missing
+        self.tokens = array("Q")
+
+    def __len__(self):
+        return len(self.lines)
+
+    def add(self, line_num, timestamp, tokens):
+        self.lines.append(line_num)
+        self.times.append(timestamp)
+        self.tokens.append(min(tokens, _SERIES_MAX_TOKENS))
+        if len(self.lines) > SERIES_BUFFER:
+            self._keep(lttb_indices(self.lines, self.tokens, SERIES_BUFFER // 2))
+
+    def _keep(self, indices):
+        self.lines = array("Q", (self.lines[i] for i in indices))
+        self.times = array("d", (self.times[i] for i in indices))
+        self.tokens = array("Q", (self.tokens[i] for i in indices))
+
+    def to_record(self, points=SERIES_RECORD_POINTS):
+        """Columnar, JSON-safe form downsampled to at most `points` points."""
+        indices = lttb_indices(self.lines, self.tokens, points)
+        return {
+            "line": [self.lines[i] for i in indices],
+            "ts": [None if self.times[i] != self.times[i] else self.times[i] for i in indices],
+            "tokens": [self.tokens[i] for i in indices],
+        }
 
-    Returns a dict with:
-      - session_file: filename
-      - compaction_events: list of CompactionEvent analysis results
-      - total_compactions: int
-      - flush_successes: int
-      - flush_failures: int
-      - recovery_successes: int
-      - recovery_failures: int
-      - peak_tokens: highest token count seen
-      - recommendations: list of strings
+    @classmethod
+    def from_record(cls, rec):
+        series = cls()
+        series.lines.extend(rec["line"])
+        series.times.extend(float("nan") if t is None else t for t in rec["ts"])
+        series.tokens.extend(rec["tokens"])
+        return series
+
+
+def downsample_series(rec, points):
+    """Downsample a token series record (as stored in results) to `points` points."""
+    return TokenSeries.from_record(rec).to_record(points)
+
+
+# Window sizes, in parsed entries, around each compaction.
+LOOKBACK_WINDOW = 30      # entries before compaction scanned for flush activity
+LOOKFORWARD_WINDOW = 40   # entries after compaction scanned for recovery
+# Deferred (undecoded) lines the lookback ring may hold beyond the window
+# before it is settled: one in LOOKBACK_SLACK deferred lines gets decoded.
+LOOKBACK_SLACK = 256
+
+RECOVERY_PHRASES = [
+    "picking up", "where we left off", "recovered", "recovering",
+    "resuming", "continuing from", "last state", "working on",
+]
+
+
+# Case-insensitive phrases, matched on the lowercased text content.
+FLUSH_PHRASES = ["nearing compaction", "store durable"]
+
+
+# ── Detector Registry ────────────────────────────────────────────────
+#
+# Compaction, flush and recovery detection run as named rules in three
+# stages. A stage stops at its first matching rule:
+#
+#   compaction  rule(entry) -> is this entry a compaction?
+#   flush       rule(entry, content, lowered) -> pre-compaction flush marker?
+#   recovery    rule(entry, content, lowered) -> recovery announcement?
+#
+# content is the entry's text (see _extract_text_content), lowered its
+# lowercase form. Each rule counts calls and hits; with a profiler attached it
+# also accumulates CPU time. Workspaces add or disable rules in
+# compaction-detectors.json (see load_detector_config).
+
+DETECTOR_STAGES = ("compaction", "flush", "recovery")
+DETECTORS_FILENAME = "compaction-detectors.json"
+
+
+class DetectorRule:
     """
-    entries = list(parse_jsonl(filepath))
-    if not entries:
-        return None
+    One named detection rule. markers are the lowercase byte strings a raw
+    line must contain for a compaction rule to possibly match (used by the
+    prefilter), or None if the rule cannot be prefiltered.
+    """
+    __slots__ = ("name", "stage", "match", "markers", "builtin", "calls", "hits", "cpu_ns")
+
+    def __init__(self, name, stage, match, markers=(), builtin=False):
+        self.name = name
+        self.stage = stage
+        self.match = match
+        self.markers = markers
+        self.builtin = builtin
+        self.calls = 0
+        self.hits = 0
+        self.cpu_ns = 0
 
-    compaction_indices = []
-    for idx, (line_num, entry) in enumerate(entries):
-        # Detect compaction entries
-        entry_type = entry.get("type", "")
+
+def _builtin_rules():
+    def compaction_type(entry):
         # Compaction entries appear as type: "compaction" in the transcript
-        if entry_type == "compaction":
-            compaction_indices.append(idx)
-            continue
+        return entry.get("type", "") == "compaction"
+
+    def compaction_summary_type(entry):
         # Also detect via summary field (some versions)
-        if "summary" in entry and "compaction" in str(entry.get("type", "")):
-            compaction_indices.append(idx)
-            continue
+        return "summary" in entry and "compaction" in str(entry.get("type", ""))
+
+    def compaction_log_message(entry):
         # Detect compaction log messages
-        if isinstance(entry.get("message"), str):
-            msg = entry["message"]
-            if "compaction" in msg.lower() and ("summary" in msg.lower() or "truncated" in msg.lower()):
-                compaction_indices.append(idx)
+        msg = entry.get("message")
+        if not isinstance(msg, str):
+            return False
+        msg = msg.lower()
+        return "compaction" in msg and ("summary" in msg or "truncated" in msg)
+
+    def flush_no_reply(entry, content, lowered):
+        # NO_REPLY (silent flush turn)
+        return "NO_REPLY" in content or "no_reply" in content
+
+    def flush_prompt(entry, content, lowered):
+        # Pre-compaction flush system prompt
+        return any(phrase in lowered for phrase in FLUSH_PHRASES)
+
+    def recovery_phrase(entry, content, lowered):
+        # Agent told the user what it recovered
+        return any(phrase in lowered for phrase in RECOVERY_PHRASES)
+
+    return [
+        DetectorRule("compaction.type", "compaction", compaction_type, (b"compaction",), True),
+        DetectorRule("compaction.summary_type", "compaction", compaction_summary_type, (b"compaction",), True),
+        DetectorRule("compaction.log_message", "compaction", compaction_log_message, (b"compaction",), True),
+        DetectorRule("flush.no_reply", "flush", flush_no_reply, builtin=True),
+        DetectorRule("flush.prompt", "flush", flush_prompt, builtin=True),
+        DetectorRule("recovery.phrase", "recovery", recovery_phrase, builtin=True),
+    ]
+
+
+def _field_value(entry, dotted):
+    value = entry
+    for part in dotted.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def _literal_marker(text):
+    """Prefilter marker for a literal, or None if JSON escaping could hide it in the raw line."""
+    if not text or any(ch in text for ch in '"\\/') or not all(" " <= ch <= "~" for ch in text):
+        return None
+    return text.lower().encode("ascii")
+
+
+def _compile_rule(spec):
+    """Build a DetectorRule from one config entry (raises ValueError if invalid)."""
+    if not isinstance(spec, dict):
+        raise ValueError(f"rule must be an object: {spec!r}")
+    name, stage, field = spec.get("name"), spec.get("stage"), spec.get("field")
+    if not isinstance(name, str) or not name:
+        raise ValueError(f"rule needs a name: {spec!r}")
+    if stage not in DETECTOR_STAGES:
+        raise ValueError(f"rule {name}: stage must be one of {', '.join(DETECTOR_STAGES)}")
+    if field is not None and not isinstance(field, str):
+        raise ValueError(f"rule {name}: field must be a string")
+    kinds = [k for k in ("equals", "phrases", "regex") if k in spec]
+    if len(kinds) != 1:
+        raise ValueError(f"rule {name}: needs exactly one of equals, phrases, regex")
+    kind = kinds[0]
+
+    if kind == "equals":
+        if field is None:
+            raise ValueError(f"rule {name}: equals needs a field")
+        expected = spec["equals"]
+
+        def test(entry, _field=field, _expected=expected):
+            return _field_value(entry, _field) == _expected
+        markers = (_literal_marker(expected),) if isinstance(expected, str) else None
+    elif kind == "phrases":
+        phrases = spec["phrases"]
+        if not isinstance(phrases, list) or not phrases or not all(isinstance(p, str) and p for p in phrases):
+            raise ValueError(f"rule {name}: phrases must be a non-empty list of strings")
+        phrases = tuple(p.lower() for p in phrases)
+
+        def test(text):
+            text = text.lower()
+            return any(p in text for p in phrases)
+        markers = tuple(_literal_marker(p) for p in phrases)
+    else:
+        try:
+            pattern = re.compile(spec["regex"])
+        except (re.error, TypeError) as exc:
+            raise ValueError(f"rule {name}: bad regex: {exc}")
+
+        def test(text):
+            return pattern.search(text) is not None
+        markers = None
+    if markers is not None and None in markers:
+        markers = None
+
+    if kind == "equals":
+        text_test = None
+        entry_test = test
+    elif field is not None:
+        def entry_test(entry, _field=field, _test=test):
+            value = _field_value(entry, _field)
+            return isinstance(value, str) and _test(value)
+        text_test = None
+    else:
+        text_test = test
+        entry_test = None
+
+    if stage == "compaction":
+        if entry_test is None:
+            def entry_test(entry, _test=text_test):
+                return _test(_extract_text_content(entry))
+        match = entry_test
+    elif text_test is not None:
+        def match(entry, content, lowered, _test=text_test):
+            return _test(content)
+    else:
+        def match(entry, content, lowered, _test=entry_test):
+            return _test(entry)
+    return DetectorRule(name, stage, match, markers if stage == "compaction" else ())
+
+
+class DetectorRegistry:
+    """Ordered detector rules per stage, with hit counts and optional CPU timing."""
+
+    def __init__(self, rules, config=None):
+        self.rules = list(rules)
+        self.config = config
+        self.profiler = None                # openclaw_profile.Profiler for --profile
+        self.stages = {stage: [r for r in self.rules if r.stage == stage] for stage in DETECTOR_STAGES}
+        custom = [r for r in self.rules if not r.builtin]
+        disabled = (config or {}).get("disable", [])
+        # Cache and index entries computed under other rules are invalid.
+        self.fingerprint = openclaw_json.dumps(config, compact=True) if custom or disabled else ""
+        # The mmap engine finds compaction candidates by its own byte search,
+        # which only knows the built-in compaction rules.
+        self.mmap_ok = all(r.builtin for r in self.stages["compaction"])
+        markers = []
+        for rule in self.stages["compaction"]:
+            if rule.markers is None:
+                markers = None
+                break
+            markers.extend(m for m in rule.markers if m not in markers)
+        # Byte markers a line needs to possibly be a compaction, or None
+        # (every line must be decoded)
+        self.compaction_markers = tuple(markers) if markers is not None else None
+        self.prefilter_markers = PREFILTER_MARKERS + self.compaction_markers if markers is not None else None
+
+    @classmethod
+    def from_config(cls, config=None):
+        """Built-in rules, minus config["disable"], plus config["rules"] (appended per stage)."""
+        rules = _builtin_rules()
+        if not config:
+            return cls(rules)
+        if not isinstance(config, dict):
+            raise ValueError("detector config must be a JSON object")
+        disable = config.get("disable", [])
+        unknown = set(disable) - {r.name for r in rules}
+        if unknown:
+            raise ValueError(f"cannot disable unknown rule(s): {', '.join(sorted(unknown))}")
+        rules = [r for r in rules if r.name not in disable]
+        names = {r.name for r in rules}
+        for spec in config.get("rules", []):
+            rule = _compile_rule(spec)
+            if rule.name in names:
+                raise ValueError(f"duplicate rule name: {rule.name}")
+            names.add(rule.name)
+            rules.append(rule)
+        return cls(rules, config)
+
+    def first_hit(self, stage, *args):
+        """Run a stage's rules in order; True at the first match."""
+        for rule in self.stages[stage]:
+            rule.calls += 1
+            if self.profiler is not None:
+                # Timed as the profiler's "rules" phase, so the clock
+                # overhead is excluded from both the rule and its caller.
+                self.profiler.start("rules")
+                hit = rule.match(*args)
+                rule.cpu_ns += self.profiler.stop()[1]
+            else:
+                hit = rule.match(*args)
+            if hit:
+                rule.hits += 1
+                return True
+        return False
 
-    if not compaction_indices:
-        return {
-            "session_file": os.path.basename(filepath),
-            "compaction_events": [],
-            "total_compactions": 0,
-            "flush_successes": 0,
-            "flush_failures": 0,
-            "recovery_successes": 0,
-            "recovery_failures": 0,
-            "peak_tokens": _find_peak_tokens(entries),
-            "recommendations": [],
-        }
+    def reset_stats(self):
+        for rule in self.rules:
+            rule.calls = rule.hits = rule.cpu_ns = 0
 
-    events = []
-    for ci in compaction_indices:
-        line_num, entry = entries[ci]
-        ce = CompactionEvent(line_num, entry)
 
-        # Extract token info from the compaction entry
-        if isinstance(entry.get("summary"), str) and "token" in entry.get("summary", ""):
-            ce.summary_available = True
-        if "deletedCount" in entry:
-            ce.summary_available = True
+DETECTORS = DetectorRegistry.from_config()
 
-        # ── Look backwards for pre-compaction flush and memory writes ──
-        lookback_window = min(ci, 30)  # Look at up to 30 entries before compaction
-        for bi in range(ci - 1, ci - lookback_window - 1, -1):
-            if bi < 0:
-                break
-            _, b_entry = entries[bi]
-
-            # Detect NO_REPLY (silent flush turn)
-            content = _extract_text_content(b_entry)
-            if "NO_REPLY" in content or "no_reply" in content:
-                ce.pre_flush_detected = True
-
-            # Detect memory file writes (tool calls)
-            tool_name, tool_args = _extract_tool_call(b_entry)
-            if tool_name in ("write", "edit", "apply_patch"):
-                path_arg = tool_args.get("path", "") or tool_args.get("file", "") or ""
-                if "memory/" in path_arg or "MEMORY.md" in path_arg:
-                    ce.memory_writes_before.append(path_arg)
-                if "GLOBAL-STATE" in path_arg:
-                    ce.state_writes_before.append(path_arg)
-
-            # Detect pre-compaction flush system prompt
-            if "nearing compaction" in content.lower() or "store durable" in content.lower():
-                ce.pre_flush_detected = True
-
-        # ── Look forwards for post-compaction recovery ──
-        lookforward_window = min(len(entries) - ci - 1, 40)
-        for fi in range(ci + 1, ci + lookforward_window + 1):
-            if fi >= len(entries):
-                break
-            _, f_entry = entries[fi]
-
-            # Detect state/memory reads after compaction
-            tool_name, tool_args = _extract_tool_call(f_entry)
-            if tool_name in ("read",):
-                path_arg = tool_args.get("path", "") or tool_args.get("file", "") or ""
-                if "GLOBAL-STATE" in path_arg:
-                    ce.state_reads_after.append(path_arg)
-                if "memory/" in path_arg or "MEMORY.md" in path_arg:
-                    ce.memory_reads_after.append(path_arg)
-
-            # Detect memory_search usage
-            if tool_name in ("memory_search", "memory_get"):
-                ce.memory_search_after = True
-
-            # Detect recovery announcement
-            content = _extract_text_content(f_entry)
-            recovery_phrases = [
-                "picking up", "where we left off", "recovered", "recovering",
-                "resuming", "continuing from", "last state", "working on",
-            ]
-            if any(phrase in content.lower() for phrase in recovery_phrases):
-                ce.recovery_announced = True
+# Phase timings for --profile (see enable_profiling)
+PROFILE = openclaw_profile.Profiler("compaction_diagnostics")
 
-            # Stop looking if we hit another compaction
-            if f_entry.get("type") == "compaction":
-                break
 
-        events.append(ce)
+def default_detectors_path(workspace):
+    return os.path.join(workspace, DETECTORS_FILENAME)
+
+
+def load_detector_config(path):
+    """
+    Read a detector config file; returns None if it does not exist. Format:
+
+      {
+        "rules": [
+          {"name": "compaction.v2", "stage": "compaction", "field": "event", "equals": "context_compacted"},
+          {"name": "flush.custom", "stage": "flush", "phrases": ["saving memory now"]},
+          {"name": "recovery.resume", "stage": "recovery", "regex": "(?i)resumed from checkpoint"}
+        ],
+        "disable": ["compaction.log_message"]
+      }
+
+    phrases match case-insensitively and regex with re.search, against the
+    entry's text content or, with "field" (dotted path), that string field.
+    equals compares a field's value exactly. Raises ValueError if invalid.
+    """
+    try:
+        with open(path, "rb") as f:
+            config = openclaw_json.loads(f.read())
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as exc:
+        raise ValueError(f"{path}: {exc}")
+    DetectorRegistry.from_config(config)    # validate
+    return config
+
+
+def configure_detectors(config):
+    """Install the registry for `config` (also the process pool initializer)."""
+    global DETECTORS
+    DETECTORS = DetectorRegistry.from_config(config)
+
+
+def _is_compaction_entry(entry):
+    """Return True if a transcript entry marks a compaction."""
+    return DETECTORS.first_hit("compaction", entry)
+
+
+# Path classes of a tool call's path argument (bit flags)
+PATH_MEMORY = 1
+PATH_STATE = 2
+
+# Everything the flush/recovery windows need from one entry, extracted once.
+# JSON-safe (it is a tuple), so it can be stored in resume checkpoints.
+EntryFeatures = namedtuple(
+    "EntryFeatures", "flush_marker recovery_phrase tool_name path path_class is_compaction")
+
+def _entry_features(entry):
+    """Reduce a transcript entry to the EntryFeatures the window scans read."""
+    content = _extract_text_content(entry)
+    lowered = content.lower()
+    flush_marker = DETECTORS.first_hit("flush", entry, content, lowered)
+    recovery_phrase = DETECTORS.first_hit("recovery", entry, content, lowered)
+
+    tool_name, tool_args = _extract_tool_call(entry)
+    if not isinstance(tool_name, str):
+        tool_name = ""
+    path, path_class = "", 0
+    if tool_name in ("write", "edit", "apply_patch", "read") and isinstance(tool_args, dict):
+        path = tool_args.get("path", "") or tool_args.get("file", "") or ""
+        if not isinstance(path, str):
+            path = ""
+        if "memory/" in path or "MEMORY.md" in path:
+            path_class |= PATH_MEMORY
+        if "GLOBAL-STATE" in path:
+            path_class |= PATH_STATE
+
+    return EntryFeatures(flush_marker, recovery_phrase, tool_name, path, path_class,
+                         entry.get("type") == "compaction")
+
+
+def _scan_before(ce, feat):
+    """Apply one pre-compaction entry's features to a CompactionEvent (flush detection)."""
+    # NO_REPLY (silent flush turn) or the pre-compaction flush system prompt
+    if feat.flush_marker:
+        ce.pre_flush_detected = True
+
+    # Memory / state file writes (tool calls)
+    if feat.tool_name in ("write", "edit", "apply_patch"):
+        if feat.path_class & PATH_MEMORY:
+            ce.memory_writes_before.append(feat.path)
+        if feat.path_class & PATH_STATE:
+            ce.state_writes_before.append(feat.path)
+
+
+def _scan_after(ce, feat):
+    """
+    Apply one post-compaction entry's features to a CompactionEvent
+    (recovery detection). Returns True when the recovery window should
+    close at this entry.
+    """
+    # State/memory reads after compaction
+    if feat.tool_name == "read":
+        if feat.path_class & PATH_STATE:
+            ce.state_reads_after.append(feat.path)
+        if feat.path_class & PATH_MEMORY:
+            ce.memory_reads_after.append(feat.path)
 
+    # memory_search usage
+    if feat.tool_name in ("memory_search", "memory_get"):
+        ce.memory_search_after = True
+
+    # Recovery announcement
+    if feat.recovery_phrase:
+        ce.recovery_announced = True
+
+    # Stop looking if we hit another compaction
+    return feat.is_compaction
+
+
+class SessionAnalyzer:
+    """
+    Single forward pass over a session transcript.
+
+    Entries are fed in file order. The last LOOKBACK_WINDOW entries are kept
+    in a ring buffer for flush detection, and each compaction keeps an open
+    forward window until LOOKFORWARD_WINDOW entries have passed (or the next
+    compaction closes it). Peak memory is bounded by the window sizes plus
+    the compaction events themselves, not by transcript length.
+
+    feed_raw() takes undecoded lines: lines the prefilter rules out sit in
+    the ring as raw bytes and are only decoded if a compaction looks back
+    over them. A deferred line may still be malformed, so it cannot take a
+    window slot on trust: the ring keeps up to LOOKBACK_SLACK deferred lines
+    beyond the window, and settling it decodes newest first until
+    LOOKBACK_WINDOW valid entries are found, dropping malformed lines and
+    everything older. Each entry is reduced to EntryFeatures at most once,
+    the first time a window needs it, however many windows it falls into.
+    """
+
+    def __init__(self):
+        self.lookback = deque()             # EntryFeatures, entries or deferred raw lines
+        self.deferred = 0                   # raw lines in lookback
+        self.open_windows = []              # [CompactionEvent, entries_remaining]
+        self.events = []
+        self.peak_tokens = 0
+        self.series = TokenSeries()
+        # Valid entries, plus deferred lines dropped from the ring unchecked
+        # (only ever behind LOOKBACK_WINDOW valid ones, so zero stays exact)
+        self.entries_seen = 0
+
+    def feed_raw(self, line_num, raw, prefilter=PREFILTER_DEFAULT):
+        """Process the next raw transcript line (bytes, newline included)."""
+        stripped = raw.strip()
+        if not stripped:
+            return
+        if (not prefilter or self.open_windows or DETECTORS.prefilter_markers is None
+                or _needs_decode(stripped)):
+            entry = _parse_line(stripped)
+            if entry is not None:
+                self.feed(line_num, entry)
+            return
+        # Nothing to record yet; whether it fills a lookback slot is settled later.
+        self.lookback.append(stripped)
+        self.deferred += 1
+        if len(self.lookback) > LOOKBACK_WINDOW + LOOKBACK_SLACK:
+            self._lookback_features()
+
+    def _lookback_features(self):
+        """
+        EntryFeatures of the last LOOKBACK_WINDOW valid entries, newest
+        first. Settles the ring: deferred lines are decoded (malformed ones
+        dropped) until the window is full, and older items are discarded.
+        """
+        ring = self.lookback
+        kept = []
+        while ring and len(kept) < LOOKBACK_WINDOW:
+            item = ring.pop()
+            if isinstance(item, bytes):
+                self.deferred -= 1
+                item = _parse_line(item)
+                if item is None:
+                    continue
+                self.entries_seen += 1
+            kept.append(item if isinstance(item, EntryFeatures) else _entry_features(item))
+        self.entries_seen += self.deferred
+        self.deferred = 0
+        ring.clear()
+        ring.extend(reversed(kept))
+        return kept
+
+    def seen_entries(self):
+        """Whether the transcript held any valid entry (decodes deferred lines only if still undecided)."""
+        if not self.entries_seen and self.deferred:
+            self._lookback_features()
+        return self.entries_seen > 0
+
+    def feed(self, line_num, entry):
+        """Process the next parsed transcript entry."""
+        self.entries_seen += 1
+        tokens = _entry_peak_tokens(entry)
+        if tokens:
+            self.series.add(line_num, _parse_timestamp(entry.get("timestamp")), tokens)
+            if tokens > self.peak_tokens:
+                self.peak_tokens = tokens
+
+        # ── Feed open recovery windows (this entry follows their compaction) ──
+        feat = None
+        if self.open_windows:
+            feat = _entry_features(entry)
+            still_open = []
+            for ce, remaining in self.open_windows:
+                stop = _scan_after(ce, feat)
+                remaining -= 1
+                if not stop and remaining > 0:
+                    still_open.append([ce, remaining])
+            self.open_windows = still_open
+
+        if _is_compaction_entry(entry):
+            ce = CompactionEvent(line_num, entry)
+
+            # Extract token info from the compaction entry
+            if isinstance(entry.get("summary"), str) and "token" in entry.get("summary", ""):
+                ce.summary_available = True
+            if "deletedCount" in entry:
+                ce.summary_available = True
+
+            # ── Look backwards for pre-compaction flush and memory writes ──
+            for b_feat in self._lookback_features():
+                _scan_before(ce, b_feat)
+
+            self.events.append(ce)
+            self.open_windows.append([ce, LOOKFORWARD_WINDOW])
+
+        self.lookback.append(feat if feat is not None else entry)
+        if len(self.lookback) > LOOKBACK_WINDOW:
+            if not self.deferred:
+                self.lookback.popleft()
+            elif len(self.lookback) > LOOKBACK_WINDOW + LOOKBACK_SLACK:
+                self._lookback_features()
+
+    def result(self, filepath, workspace=None):
+        """Build the per-session result dict (see analyze_session)."""
+        return _build_result(filepath, self.events, self.peak_tokens, workspace,
+                             self.series.to_record())
+
+    def snapshot(self):
+        """JSON-safe copy of the analyzer state, for resuming later."""
+        index = {id(ce): i for i, ce in enumerate(self.events)}
+        return {
+            "lookback": list(reversed(self._lookback_features())),
+            "events": [ce.to_record() for ce in self.events],
+            "open_windows": [[index[id(ce)], remaining] for ce, remaining in self.open_windows],
+            "peak_tokens": self.peak_tokens,
+            "series": self.series.to_record(SERIES_BUFFER),
+            "entries_seen": self.entries_seen,
+        }
+
+    @classmethod
+    def from_snapshot(cls, state):
+        analyzer = cls()
+        analyzer.lookback.extend(EntryFeatures(*f) for f in state["lookback"])
+        analyzer.events = [CompactionEvent.from_record(r) for r in state["events"]]
+        analyzer.open_windows = [
+            [analyzer.events[i], remaining] for i, remaining in state["open_windows"]
+        ]
+        analyzer.peak_tokens = state["peak_tokens"]
+        analyzer.series = TokenSeries.from_record(state["series"])
+        analyzer.entries_seen = state["entries_seen"]
+        return analyzer
+
+
+def _build_result(filepath, events, peak_tokens, workspace, token_series=None):
+    """Compute metrics and recommendations for a session's compaction events."""
     # ── Compute metrics ──
-    flush_successes = sum(
-        1 for e in events
-        if e.pre_flush_detected or e.memory_writes_before or e.state_writes_before
-    )
+    flush_successes = sum(1 for e in events if e.flush_ok)
     flush_failures = len(events) - flush_successes
 
-    recovery_successes = sum(
-        1 for e in events
-        if e.state_reads_after or e.memory_reads_after or e.memory_search_after
-    )
+    recovery_successes = sum(1 for e in events if e.recovery_ok)
     recovery_failures = len(events) - recovery_successes
 
     # ── Generate recommendations ──
@@ -243,11 +1026,510 @@ def analyze_session(filepath, workspace=None):
         "flush_failures": flush_failures,
         "recovery_successes": recovery_successes,
         "recovery_failures": recovery_failures,
-        "peak_tokens": _find_peak_tokens(entries),
+        "peak_tokens": peak_tokens,
+        "token_series": token_series,
         "recommendations": recommendations,
     }
 
 
+def analyze_session(filepath, workspace=None, prefilter=PREFILTER_DEFAULT):
+    """
+    Analyze a single session transcript for compaction health.
+
+    Streams the transcript in one forward pass (see SessionAnalyzer), so
+    memory use does not grow with file size. prefilter selects lazy decoding
+    behind the raw-byte prefilter (default: on for the stdlib JSON backend);
+    results are the same either way.
+
+    Returns a dict with:
+      - session_file: filename
+      - compaction_events: list of CompactionEvent analysis results
+      - total_compactions: int
+      - flush_successes: int
+      - flush_failures: int
+      - recovery_successes: int
+      - recovery_failures: int
+      - peak_tokens: highest token count seen
+      - recommendations: list of strings
+    """
+    analyzer = SessionAnalyzer()
+    for line_num, raw in enumerate(_read_lines(filepath)):
+        analyzer.feed_raw(line_num, raw, prefilter)
+    if not analyzer.seen_entries():
+        return None
+    return analyzer.result(filepath, workspace)
+
+
+# ── Windowed mmap Engine ─────────────────────────────────────────────
+#
+# Decodes only the lines that can matter: compaction candidates, the
+# lookback/lookforward windows around real compactions, and lines holding a
+# token count key (for peak tokens and the token series). Cost scales with
+# the number of compactions and token observations rather than file size,
+# so it pays off on transcripts dominated by lines without usage data
+# (tool output, messages). Results match the streaming engine: compaction
+# candidates are the lines holding a compaction rule's marker in any case,
+# or an escaped letter, which is every line the rules could accept.
+
+_NEWLINE_RE = re.compile(rb"\n")
+# Any key _entry_peak_tokens reads, at any depth; the decoded line decides.
+_TOKEN_VALUE_RE = re.compile(
+    rb'"(?:totalTokens|contextTokens|inputTokens|input_tokens|output_tokens)"\s*:\s*(-?[0-9][0-9.eE+-]*|true)')
+# Bytes lowercased at a time when searching for compaction markers.
+FOLD_CHUNK = 1 << 24
+
+
+class _LineIndex:
+    """Line-offset index over a memory-mapped transcript, with decode memo."""
+
+    def __init__(self, mm):
+        self.mm = mm
+        self.starts = array("Q", [0])
+        self.starts.extend(m.end() for m in _NEWLINE_RE.finditer(mm))
+        if self.starts[-1] == len(mm):
+            self.starts.pop()               # no line after the final newline
+        self.decoded = {}
+        self.feats = {}
+
+    def __len__(self):
+        return len(self.starts)
+
+    def line_of(self, pos):
+        return bisect_right(self.starts, pos) - 1
+
+    def entry(self, i):
+        """Decoded entry for line i, or None for a blank or malformed line."""
+        if i in self.decoded:
+            return self.decoded[i]
+        end = self.starts[i + 1] if i + 1 < len(self.starts) else len(self.mm)
+        entry = self.decoded[i] = _parse_line(self.mm[self.starts[i]:end])
+        return entry
+
+    def features(self, i):
+        """EntryFeatures for line i, or None for a blank or malformed line."""
+        if i not in self.feats:
+            entry = self.entry(i)
+            self.feats[i] = None if entry is None else _entry_features(entry)
+        return self.feats[i]
+
+
+def _find_folded(mm, markers):
+    """Yield the offset of every match of the lowercase markers in mm, ignoring ASCII case."""
+    overlap = max(len(m) for m in markers) - 1
+    for base in range(0, len(mm), FOLD_CHUNK):
+        lowered = mm[base:base + FOLD_CHUNK + overlap].lower()
+        for marker in markers:
+            pos = lowered.find(marker)
+            while pos != -1 and pos < FOLD_CHUNK:
+                yield base + pos
+                pos = lowered.find(marker, pos + 1)
+
+
+def _analyze_windowed(filepath):
+    """
+    Analyze a transcript through mmap and a line-offset index. Returns the
+    same record as _analyze_record (or None for an empty transcript).
+    """
+    with open(filepath, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return _windowed_record(_LineIndex(mm))
+
+
+def _windowed_record(index):
+    mm = index.mm
+    n = len(index)
+    if not any(index.entry(i) is not None for i in range(n)):
+        return None
+
+    # Lines where an escaped letter could spell a token key or a marker
+    escaped = {index.line_of(m.start()) for m in _ESCAPED_LETTER_RE.finditer(mm)}
+
+    # Token series and peak: decode only lines holding a token key.
+    peak = 0
+    series = TokenSeries()
+    token_lines = {index.line_of(m.start()) for m in _TOKEN_VALUE_RE.finditer(mm)}
+    for i in sorted(token_lines | escaped):
+        end = index.starts[i + 1] if i + 1 < n else len(mm)
+        entry = _parse_line(mm[index.starts[i]:end])
+        if not isinstance(entry, dict):
+            continue
+        tokens = _entry_peak_tokens(entry)
+        if tokens:
+            series.add(i, _parse_timestamp(entry.get("timestamp")), tokens)
+            peak = max(peak, tokens)
+
+    candidates = set(escaped)
+    for pos in _find_folded(mm, DETECTORS.compaction_markers):
+        candidates.add(index.line_of(pos))
+
+    events = []
+    for ci in sorted(candidates):
+        entry = index.entry(ci)
+        if entry is None or not _is_compaction_entry(entry):
+            continue
+        ce = CompactionEvent(ci, entry)
+        if isinstance(entry.get("summary"), str) and "token" in entry.get("summary", ""):
+            ce.summary_available = True
+        if "deletedCount" in entry:
+            ce.summary_available = True
+
+        seen = 0
+        bi = ci - 1
+        while bi >= 0 and seen < LOOKBACK_WINDOW:
+            b_feat = index.features(bi)
+            if b_feat is not None:
+                _scan_before(ce, b_feat)
+                seen += 1
+            bi -= 1
+
+        seen = 0
+        fi = ci + 1
+        while fi < n and seen < LOOKFORWARD_WINDOW:
+            f_feat = index.features(fi)
+            fi += 1
+            if f_feat is None:
+                continue
+            seen += 1
+            if _scan_after(ce, f_feat):
+                break
+
+        events.append(ce)
+        # Keep the decode memo bounded to the neighbourhood still ahead.
+        for memo in (index.decoded, index.feats):
+            for i in [i for i in memo if i < bi]:
+                del memo[i]
+
+    return {
+        "events": [e.to_record() for e in events],
+        "peak_tokens": peak,
+        "token_series": series.to_record(),
+    }
+
+
+# Bytes before a checkpoint offset that must still match for a resume.
+CHECKPOINT_TAIL_BYTES = 64
+
+
+def _resume_point(f, checkpoint):
+    """
+    Validate a checkpoint against an open transcript. Returns True if the
+    file is the same append-only file the checkpoint was taken from, False
+    if it was truncated, rotated or rewritten (full rescan needed).
+    """
+    st = os.fstat(f.fileno())
+    offset = checkpoint["offset"]
+    if st.st_ino != checkpoint["inode"] or st.st_size < offset:
+        return False
+    tail = bytes.fromhex(checkpoint["tail"])
+    f.seek(offset - len(tail))
+    return f.read(len(tail)) == tail
+
+
+def _analyze_record(filepath, checkpoint=None, prefilter=PREFILTER_DEFAULT, engine="stream"):
+    """
+    Worker entry point: analyze one transcript and return a compact,
+    picklable (record, checkpoint) pair. The record is None for an empty
+    transcript. Workspace-dependent metrics and recommendations are
+    computed by the caller.
+
+    With a checkpoint from an earlier run, only bytes appended since then
+    are read. The returned checkpoint covers every complete line; a final
+    line still being written is analyzed but not checkpointed.
+
+    engine="mmap" uses the windowed engine instead; it always reads the
+    whole file and returns no checkpoint. Compressed archives are always
+    streamed in full and never checkpointed.
+    """
+    if _is_compressed(filepath):
+        analyzer = SessionAnalyzer()
+        for line_num, raw in enumerate(_read_lines(filepath)):
+            analyzer.feed_raw(line_num, raw, prefilter)
+        return _analyzer_record(analyzer), None
+    if engine == "mmap" and DETECTORS.mmap_ok:
+        return _analyze_windowed(filepath), None
+    with open(filepath, "rb") as f:
+        if checkpoint and _resume_point(f, checkpoint):
+            analyzer = SessionAnalyzer.from_snapshot(checkpoint["state"])
+            offset, line_num = checkpoint["offset"], checkpoint["line_num"]
+            tail = bytes.fromhex(checkpoint["tail"])
+        else:
+            analyzer = SessionAnalyzer()
+            offset, line_num, tail = 0, 0, b""
+        f.seek(offset)
+
+        partial = None
+        for raw in PROFILE.iter_bytes("read", f) if PROFILE.enabled else f:
+            if not raw.endswith(b"\n"):
+                partial = raw
+                break
+            offset += len(raw)
+            tail = raw[-CHECKPOINT_TAIL_BYTES:]
+            analyzer.feed_raw(line_num, raw, prefilter)
+            line_num += 1
+
+        new_checkpoint = {
+            "inode": os.fstat(f.fileno()).st_ino,
+            "offset": offset,
+            "line_num": line_num,
+            "tail": tail.hex(),
+            "state": analyzer.snapshot(),
+        }
+        if partial is not None:
+            analyzer.feed_raw(line_num, partial, prefilter)
+
+    return _analyzer_record(analyzer), new_checkpoint
+
+
+def _analyzer_record(analyzer):
+    if not analyzer.seen_entries():
+        return None
+    return {
+        "events": [e.to_record() for e in analyzer.events],
+        "peak_tokens": analyzer.peak_tokens,
+        "token_series": analyzer.series.to_record(),
+    }
+
+
+def _result_from_record(filepath, record, workspace):
+    events = [CompactionEvent.from_record(r) for r in record["events"]]
+    return _build_result(filepath, events, record["peak_tokens"], workspace, record["token_series"])
+
+
+def _unread_bytes(files, checkpoints):
+    """Bytes _analyze_record will read for these files, past any checkpoint."""
+    total = 0
+    for f, cp in zip(files, checkpoints):
+        try:
+            total += os.stat(f).st_size - (cp["offset"] if cp else 0)
+        except OSError:
+            pass
+    return total
+
+
+def _map_records(files, checkpoints, jobs, engine="stream"):
+    """
+    Yield _analyze_record results for each file, in order, optionally in a
+    process pool. files and checkpoints may be lazy iterables: a serial run
+    consumes them as it goes, while the pool (whose map submits everything
+    up front) collects them first so it can size its chunks. The pool is
+    only started for at least POOL_MIN_FILES files or POOL_MIN_BYTES of
+    unread transcript.
+    """
+    analyze = functools.partial(_analyze_record, engine=engine)
+    if jobs > 1:
+        files, checkpoints = list(files), list(checkpoints)
+    if jobs <= 1 or len(files) < 2 or (len(files) < POOL_MIN_FILES
+                                       and _unread_bytes(files, checkpoints) < POOL_MIN_BYTES):
+        for f, cp in zip(files, checkpoints):
+            yield analyze(f, cp)
+        return
+
+    workers = min(jobs, len(files))
+    chunksize = max(1, len(files) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=configure_detectors,
+                             initargs=(DETECTORS.config,)) as pool:
+        yield from pool.map(analyze, files, checkpoints, chunksize=chunksize)
+
+
+def analyze_sessions(files, workspace=None, jobs=1, cache=None, engine="stream"):
+    """
+    Analyze many transcripts, yielding results in the order of `files`.
+
+    With jobs > 1 sessions are analyzed in a process pool; workers return
+    compact records and results are merged back in input order, so output
+    is identical to a serial run. With a SessionCache, unchanged transcripts
+    are served from the cache, transcripts that only grew are resumed from
+    their checkpoint, and only new or rewritten ones are parsed in full.
+    Empty transcripts are skipped. engine selects the streaming analyzer
+    ("stream") or the windowed mmap engine ("mmap"); results are the same.
+    files may be a lazy iterable (see iter_session_files); it is consumed
+    as analysis proceeds.
+    """
+    for _, result in _analyze_indexed(files, workspace, jobs, cache, engine):
+        yield result
+
+
+def _analyze_indexed(files, workspace, jobs, cache, engine):
+    """analyze_sessions, yielding (position in files, result) pairs."""
+    order = deque()                         # (i, path, stat key, cached record or _CACHE_MISS)
+
+    def misses():
+        # Feeds the analysis of cache misses; queues every file in input order.
+        for i, f in enumerate(files):
+            key, record = None, _CACHE_MISS
+            if cache is None:
+                _DISCOVERED_STATS.pop(f, None)
+            else:
+                try:
+                    key = SessionCache.stat_key(f)
+                except OSError:
+                    pass
+                else:
+                    record = cache.get(f, key)
+            order.append((i, f, key, record))
+            if record is _CACHE_MISS:
+                yield f, cache.checkpoint(f) if cache is not None else None
+
+    queued, checkpointed = itertools.tee(misses())
+    fresh = _map_records((f for f, _ in queued), (cp for _, cp in checkpointed), jobs, engine)
+    ahead = None                            # a fresh record fetched while the queue was empty
+    while True:
+        if not order:
+            ahead = next(fresh, None)
+            if not order:
+                return
+        i, f, key, record = order.popleft()
+        if record is _CACHE_MISS:
+            if ahead is None:
+                ahead = next(fresh)
+            (record, checkpoint), ahead = ahead, None
+            if cache is not None and key is not None:
+                cache.put(f, key, record, checkpoint)
+        if record:
+            yield i, _result_from_record(f, record, workspace)
+
+
+def find_agent_session_dirs(agents_root=DEFAULT_AGENTS_ROOT):
+    """(agent, sessions_dir) for every agent under agents_root that has a sessions directory."""
+    try:
+        names = sorted(os.listdir(agents_root))
+    except OSError:
+        return []
+    dirs = []
+    for name in names:
+        sessions_dir = os.path.join(agents_root, name, "sessions")
+        if os.path.isdir(sessions_dir):
+            dirs.append((name, sessions_dir))
+    return dirs
+
+
+def analyze_fleet(agent_files, workspace=None, jobs=1, cache=None, engine="stream"):
+    """
+    Analyze several agents' transcripts in one process pool, so small and
+    large agents share the workers. agent_files is a list of (agent, files);
+    yields (agent, result) in that order.
+    """
+    owners = []
+    files = []
+    for agent, agent_paths in agent_files:
+        owners.extend([agent] * len(agent_paths))
+        files.extend(agent_paths)
+    for i, result in _analyze_indexed(files, workspace, jobs, cache, engine):
+        yield owners[i], result
+
+
+# ── Result Cache ─────────────────────────────────────────────────────
+
+CACHE_VERSION = 4
+DEFAULT_CACHE_ENTRIES = 10000
+# Resume checkpoints are kept only for recently written (likely still
+# active) transcripts, and only for the most recently written few of those;
+# finished sessions just keep their record.
+CHECKPOINT_MAX_IDLE = 2 * 86400
+CHECKPOINT_MAX_SESSIONS = 16
+
+_CACHE_MISS = object()
+
+
+def default_cache_path(workspace):
+    return os.path.join(workspace, ".cache", "compaction-diagnostics.json")
+
+
+class SessionCache:
+    """
+    On-disk cache of per-session analysis records.
+
+    Entries are keyed by absolute session path and validated against the
+    file's (inode, size, mtime_ns), so a changed or replaced transcript is
+    re-analyzed. Only the workspace-independent record is stored; metrics
+    and recommendations are recomputed on every run. The cache holds at most
+    `max_entries` sessions and evicts the least recently used.
+
+    Recently modified transcripts also keep a resume checkpoint (byte
+    offset, lookback ring, open recovery windows, peak tokens) so that a
+    growing session is re-analyzed from where the last run stopped. Only
+    the CHECKPOINT_MAX_SESSIONS most recently modified ones keep theirs.
+
+    A cache hit only reorders the in-memory LRU; the file is rewritten
+    only when an entry is added, replaced or evicted, so a run where every
+    session hits writes nothing.
+    """
+
+    def __init__(self, path, max_entries=DEFAULT_CACHE_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.entries = OrderedDict()        # abspath -> {"key", "record", "checkpoint"}
+        self.dirty = False
+        self._load()
+
+    @staticmethod
+    def stat_key(filepath):
+        st = _DISCOVERED_STATS.pop(filepath, None) or os.stat(filepath)
+        return [st.st_ino, st.st_size, st.st_mtime_ns]
+
+    def _load(self):
+        try:
+            with open(self.path, "rb") as f:
+                data = openclaw_json.loads(f.read())
+        except (OSError, ValueError):
+            return
+        if not isinstance(data, dict) or data.get("version") != CACHE_VERSION:
+            return
+        if data.get("detectors", "") != DETECTORS.fingerprint:
+            return
+        # Stored least recently used first
+        for path, entry in data.get("sessions", []):
+            self.entries[path] = entry
+
+    def get(self, filepath, key):
+        path = os.path.abspath(filepath)
+        entry = self.entries.get(path)
+        if entry is None or entry["key"] != key:
+            return _CACHE_MISS
+        self.entries.move_to_end(path)
+        return entry["record"]
+
+    def checkpoint(self, filepath):
+        """Resume checkpoint stored for a path, regardless of its current key."""
+        entry = self.entries.get(os.path.abspath(filepath))
+        return entry.get("checkpoint") if entry else None
+
+    def put(self, filepath, key, record, checkpoint=None):
+        path = os.path.abspath(filepath)
+        mtime = key[2] / 1e9
+        if datetime.now().timestamp() - mtime > CHECKPOINT_MAX_IDLE:
+            checkpoint = None
+        self.entries[path] = {"key": key, "record": record, "checkpoint": checkpoint}
+        self.entries.move_to_end(path)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        self.dirty = True
+
+    def save(self):
+        """Write the cache atomically. Best-effort: I/O errors are ignored."""
+        if not self.dirty:
+            return
+        checkpointed = sorted((e["key"][2], path) for path, e in self.entries.items() if e.get("checkpoint"))
+        for _, path in checkpointed[:-CHECKPOINT_MAX_SESSIONS]:
+            self.entries[path]["checkpoint"] = None
+        data = {"version": CACHE_VERSION, "detectors": DETECTORS.fingerprint,
+                "sessions": list(self.entries.items())}
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(openclaw_json.dumps(data, compact=True))
+            os.replace(tmp, self.path)
+            self.dirty = False
+        except OSError:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+
+
 def _extract_text_content(entry):
     """Extract readable text from a transcript entry."""
     # Direct message content
@@ -291,17 +1573,26 @@ def _find_peak_tokens(entries):
     """Find the highest token count in a session."""
     peak = 0
     for _, entry in entries:
-        for key in ("totalTokens", "contextTokens", "inputTokens"):
-            val = entry.get(key)
+        val = _entry_peak_tokens(entry)
+        if val > peak:
+            peak = val
+    return peak
+
+
+def _entry_peak_tokens(entry):
+    """Highest token count recorded on a single transcript entry (0 if none)."""
+    peak = 0
+    for key in ("totalTokens", "contextTokens", "inputTokens"):
+        val = entry.get(key)
+        if isinstance(val, (int, float)) and val > peak:
+            peak = int(val)
+    # Check nested usage
+    usage = entry.get("usage", {})
+    if isinstance(usage, dict):
+        for key in ("input_tokens", "output_tokens"):
+            val = usage.get(key, 0)
             if isinstance(val, (int, float)) and val > peak:
                 peak = int(val)
-        # Check nested usage
-        usage = entry.get("usage", {})
-        if isinstance(usage, dict):
-            for key in ("input_tokens", "output_tokens"):
-                val = usage.get(key, 0)
-                if isinstance(val, (int, float)) and val > peak:
-                    peak = int(val)
     return peak
 
 
@@ -371,29 +1662,350 @@ def _generate_recommendations(events, flush_ok, flush_fail, recov_ok, recov_fail
     return recs
 
 
+# ── Event Index ──────────────────────────────────────────────────────
+#
+# A local SQLite database answering cross-session questions without
+# re-parsing transcripts. Tables:
+#
+#   sessions            one row per transcript (path, mtime, peak_tokens,
+#                       entry count, stat key and resume checkpoint)
+#   compactions         one row per compaction event (ts, flushed,
+#                       recovered, summary excerpt, full event record)
+#   tool_calls          one row per tool_use / tool_result entry
+#   token_observations  one row per entry carrying a token count
+#
+# Example: flush success rate per week over the last 90 days
+#
+#   SELECT strftime('%Y-%W', ts) AS week, AVG(flushed), COUNT(*)
+#   FROM compactions WHERE ts >= date('now', '-90 days') GROUP BY week;
+#
+# Only complete lines are indexed; a line still being written is picked
+# up on the next `index` run.
+
+INDEX_SCHEMA_VERSION = 4
+INDEX_BATCH_ROWS = 5000
+INDEX_SUMMARY_CHARS = 200
+
+_INDEX_SCHEMA = """
+CREATE TABLE sessions (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    session_file TEXT NOT NULL,
+    mtime REAL NOT NULL,
+    stat_key TEXT NOT NULL,
+    entries INTEGER NOT NULL,
+    peak_tokens INTEGER NOT NULL,
+    token_series TEXT,
+    checkpoint TEXT
+);
+CREATE INDEX sessions_mtime ON sessions(mtime);
+CREATE INDEX sessions_peak_tokens ON sessions(peak_tokens);
+
+CREATE TABLE compactions (
+    session_id INTEGER NOT NULL,
+    line_num INTEGER NOT NULL,
+    ts TEXT,
+    flushed INTEGER NOT NULL,
+    recovered INTEGER NOT NULL,
+    summary TEXT,
+    record TEXT NOT NULL,
+    PRIMARY KEY (session_id, line_num)
+);
+CREATE INDEX compactions_ts ON compactions(ts);
+
+CREATE TABLE tool_calls (
+    session_id INTEGER NOT NULL,
+    line_num INTEGER NOT NULL,
+    ts TEXT,
+    kind TEXT NOT NULL,
+    tool TEXT NOT NULL,
+    path TEXT
+);
+CREATE INDEX tool_calls_session ON tool_calls(session_id);
+CREATE INDEX tool_calls_tool ON tool_calls(tool, ts);
+
+CREATE TABLE token_observations (
+    session_id INTEGER NOT NULL,
+    line_num INTEGER NOT NULL,
+    ts TEXT,
+    tokens INTEGER NOT NULL
+);
+CREATE INDEX token_observations_session ON token_observations(session_id);
+CREATE INDEX token_observations_tokens ON token_observations(tokens);
+
+CREATE TABLE meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+_INDEX_TABLES = ("sessions", "compactions", "tool_calls", "token_observations")
+
+
+def default_index_path(workspace):
+    return os.path.join(workspace, ".cache", "compaction-index.sqlite")
+
+
+class _IndexingAnalyzer(SessionAnalyzer):
+    """SessionAnalyzer that also collects per-entry rows for the event index."""
+
+    def __init__(self):
+        super().__init__()
+        self.tool_calls = []                # (line_num, ts, kind, tool, path)
+        self.tokens = []                    # (line_num, ts, tokens)
+        self.compaction_meta = {}           # line_num -> (ts, summary excerpt)
+
+    def feed(self, line_num, entry):
+        ts = entry.get("timestamp")
+        ts = ts if isinstance(ts, str) else None
+        tool_name, tool_args = _extract_tool_call(entry)
+        if not isinstance(tool_name, str):
+            tool_name = ""
+        if tool_name:
+            path = None
+            if isinstance(tool_args, dict):
+                path = tool_args.get("path") or tool_args.get("file") or None
+                if not isinstance(path, str):
+                    path = None
+            kind = "result" if entry.get("type") == "tool_result" else "use"
+            self.tool_calls.append((line_num, ts, kind, tool_name, path))
+        tokens = _entry_peak_tokens(entry)
+        if tokens:
+            self.tokens.append((line_num, ts, tokens))
+
+        n_events = len(self.events)
+        super().feed(line_num, entry)
+        if len(self.events) > n_events:
+            summary = _extract_text_content(entry)[:INDEX_SUMMARY_CHARS]
+            self.compaction_meta[line_num] = (ts, summary)
+
+
+class EventIndex:
+    """
+    SQLite index of sessions, compactions, tool calls and token observations.
+
+    update() brings the index up to date with a list of transcripts: files
+    whose (inode, size, mtime_ns) is unchanged are skipped, files that only
+    grew resume from their stored checkpoint and append rows for the new
+    lines, and rewritten files are re-indexed from scratch. results()
+    rebuilds analyze_sessions-style results from the index alone.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self._ensure_schema()
+
+    def close(self):
+        self.conn.close()
+
+    def _ensure_schema(self):
+        (version,) = self.conn.execute("PRAGMA user_version").fetchone()
+        if version != INDEX_SCHEMA_VERSION:
+            with self.conn:
+                for table in _INDEX_TABLES + ("meta",):
+                    self.conn.execute(f"DROP TABLE IF EXISTS {table}")
+                self.conn.executescript(_INDEX_SCHEMA)
+                self.conn.execute(f"PRAGMA user_version = {INDEX_SCHEMA_VERSION}")
+        # Rows extracted under different detector rules are stale.
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'detectors'").fetchone()
+        if (row[0] if row else "") != DETECTORS.fingerprint:
+            self.rebuild()
+            with self.conn:
+                self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('detectors', ?)",
+                                  (DETECTORS.fingerprint,))
+
+    def rebuild(self):
+        """Drop every indexed row; the next update() re-indexes all files."""
+        with self.conn:
+            for table in _INDEX_TABLES:
+                self.conn.execute(f"DELETE FROM {table}")
+
+    def _delete_rows(self, session_id):
+        for table in _INDEX_TABLES[1:]:
+            self.conn.execute(f"DELETE FROM {table} WHERE session_id = ?", (session_id,))
+
+    def update(self, files):
+        """Index new and changed transcripts. Returns (indexed, unchanged)."""
+        indexed = unchanged = 0
+        for filepath in files:
+            path = os.path.abspath(filepath)
+            try:
+                key = SessionCache.stat_key(filepath)
+            except OSError:
+                continue
+            row = self.conn.execute(
+                "SELECT id, stat_key, checkpoint FROM sessions WHERE path = ?", (path,)
+            ).fetchone()
+            if row and openclaw_json.loads(row[1]) == key:
+                unchanged += 1
+                continue
+            try:
+                with self.conn:
+                    self._index_file(path, row)
+            except OSError:
+                continue
+            indexed += 1
+        return indexed, unchanged
+
+    def prune(self):
+        """Remove sessions whose transcript no longer exists. Returns the count."""
+        gone = [(sid,) for sid, path in self.conn.execute("SELECT id, path FROM sessions")
+                if not os.path.exists(path)]
+        with self.conn:
+            for (sid,) in gone:
+                self._delete_rows(sid)
+            self.conn.executemany("DELETE FROM sessions WHERE id = ?", gone)
+        return len(gone)
+
+    def _index_file(self, path, row):
+        conn = self.conn
+        compressed = _is_compressed(path)
+        with open(path, "rb") as f:
+            checkpoint = openclaw_json.loads(row[2]) if row and row[2] and not compressed else None
+            if checkpoint and _resume_point(f, checkpoint):
+                analyzer = _IndexingAnalyzer.from_snapshot(checkpoint["state"])
+                offset, line_num = checkpoint["offset"], checkpoint["line_num"]
+                tail = bytes.fromhex(checkpoint["tail"])
+            else:
+                analyzer = _IndexingAnalyzer()
+                offset, line_num, tail = 0, 0, b""
+            f.seek(offset)
+
+            if row:
+                session_id = row[0]
+                if offset == 0:
+                    self._delete_rows(session_id)
+                else:
+                    # Rows from a partial last line indexed past the checkpoint
+                    for table in _INDEX_TABLES[1:]:
+                        conn.execute(f"DELETE FROM {table} WHERE session_id = ? AND line_num >= ?",
+                                     (session_id, line_num))
+            else:
+                session_id = conn.execute(
+                    "INSERT INTO sessions (path, session_file, mtime, stat_key, entries, peak_tokens) "
+                    "VALUES (?, ?, 0, '', 0, 0)", (path, os.path.basename(path))
+                ).lastrowid
+
+            partial = b""
+            for raw in _read_lines(path) if compressed else f:
+                if not raw.endswith(b"\n") and not compressed:
+                    partial = raw
+                    break
+                offset += len(raw)
+                tail = raw[-CHECKPOINT_TAIL_BYTES:]
+                analyzer.feed_raw(line_num, raw, prefilter=False)
+                line_num += 1
+                if len(analyzer.tool_calls) + len(analyzer.tokens) >= INDEX_BATCH_ROWS:
+                    self._flush_rows(session_id, analyzer)
+
+            st = os.fstat(f.fileno())
+            new_checkpoint = None if compressed else {
+                "inode": st.st_ino,
+                "offset": offset,
+                "line_num": line_num,
+                "tail": tail.hex(),
+                "state": analyzer.snapshot(),
+            }
+            # A final line without a newline is indexed (as a rescan would
+            # analyze it) but not checkpointed; a resume re-reads it.
+            if partial:
+                analyzer.feed_raw(line_num, partial, prefilter=False)
+            self._flush_rows(session_id, analyzer)
+
+        rows = []
+        for ce in analyzer.events:
+            ts, summary = analyzer.compaction_meta.get(ce.line_num, (None, None))
+            rows.append((session_id, ce.line_num, ts, int(ce.flush_ok), int(ce.recovery_ok),
+                         summary, openclaw_json.dumps(ce.to_record(), compact=True)))
+        # Events from before a resume keep their ts/summary; their recovery
+        # windows may have been completed by the new lines.
+        conn.executemany(
+            "INSERT INTO compactions (session_id, line_num, ts, flushed, recovered, summary, record) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (session_id, line_num) DO UPDATE SET "
+            "flushed = excluded.flushed, recovered = excluded.recovered, record = excluded.record",
+            rows,
+        )
+        # A file that grew while read gets a key that never matches, so the
+        # next run resumes it from the checkpoint.
+        if compressed or st.st_size == offset + len(partial):
+            key = [st.st_ino, st.st_size, st.st_mtime_ns]
+        else:
+            key = [st.st_ino, offset, 0]
+        conn.execute(
+            "UPDATE sessions SET mtime = ?, stat_key = ?, entries = ?, peak_tokens = ?, token_series = ?, "
+            "checkpoint = ? WHERE id = ?",
+            (st.st_mtime, openclaw_json.dumps(key, compact=True), analyzer.entries_seen,
+             analyzer.peak_tokens, openclaw_json.dumps(analyzer.series.to_record(), compact=True),
+             new_checkpoint and openclaw_json.dumps(new_checkpoint, compact=True),
+             session_id),
+        )
+
+    def _flush_rows(self, session_id, analyzer):
+        self.conn.executemany(
+            "INSERT INTO tool_calls (session_id, line_num, ts, kind, tool, path) VALUES (?, ?, ?, ?, ?, ?)",
+            [(session_id, *r) for r in analyzer.tool_calls],
+        )
+        self.conn.executemany(
+            "INSERT INTO token_observations (session_id, line_num, ts, tokens) VALUES (?, ?, ?, ?)",
+            [(session_id, *r) for r in analyzer.tokens],
+        )
+        analyzer.tool_calls.clear()
+        analyzer.tokens.clear()
+
+    def results(self, workspace=None, days=None, session=None):
+        """
+        Yield per-session results (as analyze_sessions does) from the index,
+        newest first. Filter by `days` of file mtime, or to one `session` path.
+        """
+        query = "SELECT id, path, peak_tokens, token_series FROM sessions WHERE entries > 0"
+        params = []
+        if session is not None:
+            query += " AND path = ?"
+            params.append(os.path.abspath(session))
+        if days is not None:
+            query += " AND mtime >= ?"
+            params.append(datetime.now().timestamp() - days * 86400)
+        query += " ORDER BY mtime DESC"
+
+        for session_id, path, peak_tokens, token_series in self.conn.execute(query, params).fetchall():
+            events = [
+                openclaw_json.loads(rec) for (rec,) in self.conn.execute(
+                    "SELECT record FROM compactions WHERE session_id = ? ORDER BY line_num",
+                    (session_id,))
+            ]
+            record = {"events": events, "peak_tokens": peak_tokens,
+                      "token_series": openclaw_json.loads(token_series)}
+            yield _result_from_record(path, record, workspace)
+
+
 # ── Report Formatting ────────────────────────────────────────────────
 
+def _serializable_result(r):
+    """JSON-safe copy of a per-session result (events reduced to counts)."""
+    s = dict(r)
+    s["compaction_events"] = [
+        {
+            "line": e.line_num,
+            "pre_flush": e.pre_flush_detected,
+            "memory_writes_before": len(e.memory_writes_before),
+            "state_writes_before": len(e.state_writes_before),
+            "state_reads_after": len(e.state_reads_after),
+            "memory_reads_after": len(e.memory_reads_after),
+            "memory_search_after": e.memory_search_after,
+            "recovery_announced": e.recovery_announced,
+        }
+        for e in s["compaction_events"]
+    ]
+    return s
+
+
 def format_report(results, output_json=False):
     """Format analysis results as human-readable report or JSON."""
     if output_json:
-        serializable = []
-        for r in results:
-            s = dict(r)
-            s["compaction_events"] = [
-                {
-                    "line": e.line_num,
-                    "pre_flush": e.pre_flush_detected,
-                    "memory_writes_before": len(e.memory_writes_before),
-                    "state_writes_before": len(e.state_writes_before),
-                    "state_reads_after": len(e.state_reads_after),
-                    "memory_reads_after": len(e.memory_reads_after),
-                    "memory_search_after": e.memory_search_after,
-                    "recovery_announced": e.recovery_announced,
-                }
-                for e in s["compaction_events"]
-            ]
-            serializable.append(s)
-        return json.dumps(serializable, indent=2)
+        return json.dumps([_serializable_result(r) for r in results], indent=2)
 
     lines = []
     lines.append("=" * 64)
@@ -475,12 +2087,96 @@ def format_report(results, output_json=False):
     return "\n".join(lines)
 
 
+def write_ndjson(results, out, series_points=DEFAULT_SERIES_POINTS):
+    """
+    Stream results as NDJSON: one compact {"type": "session", ...} line per
+    session, written and flushed as soon as it is available, then one
+    {"type": "summary", ...} line with fleet totals. Memory stays flat:
+    results are not retained. Returns the totals.
+    """
+    totals = _new_totals()
+    for r in results:
+        _add_totals(totals, r)
+        _limit_series(r, series_points)
+        out.write(openclaw_json.dumps({"type": "session", **_serializable_result(r)}, compact=True) + "\n")
+        out.flush()
+    out.write(openclaw_json.dumps({"type": "summary", **totals}, compact=True) + "\n")
+    out.flush()
+    return totals
+
+
+def _new_totals():
+    return {
+        "sessions_analyzed": 0,
+        "total_compactions": 0,
+        "flush_successes": 0,
+        "flush_failures": 0,
+        "recovery_successes": 0,
+        "recovery_failures": 0,
+    }
+
+
+def _add_totals(totals, r):
+    totals["sessions_analyzed"] += 1
+    for key in ("total_compactions", "flush_successes", "flush_failures",
+                "recovery_successes", "recovery_failures"):
+        totals[key] += r[key]
+
+
+def format_fleet(rollups, fleet, output_json=False, sessions=None):
+    """
+    Format per-agent rollups (agent -> totals plus peak_tokens) and the
+    fleet total. With output_json, `sessions` (agent -> results) adds the
+    per-session detail under each agent.
+    """
+    if output_json:
+        agents = []
+        for agent, totals in rollups.items():
+            row = {"agent": agent, **totals}
+            if sessions is not None:
+                row["sessions"] = [_serializable_result(r) for r in sessions.get(agent, [])]
+            agents.append(row)
+        return json.dumps({"agents": agents, "fleet": fleet}, indent=2)
+
+    def pct(ok, total):
+        return f"{ok / total * 100:.0f}%" if total else "-"
+
+    lines = []
+    lines.append("=" * 64)
+    lines.append("  FLEET COMPACTION HEALTH")
+    lines.append("  OpenClaw Cognitive Upgrade Kit")
+    lines.append(f"  Generated: {datetime.now().strftime('%Y-%m-%d %H:%M')}")
+    lines.append("=" * 64)
+    lines.append("")
+    lines.append(f"  {'agent':<20}{'sessions':>9}{'compactions':>13}{'flush':>8}{'recovery':>10}{'peak tokens':>13}")
+    for agent, t in list(rollups.items()) + [("FLEET", fleet)]:
+        if agent == "FLEET":
+            lines.append("  " + "-" * 73)
+        lines.append(
+            f"  {agent:<20}{t['sessions_analyzed']:>9}{t['total_compactions']:>13}"
+            f"{pct(t['flush_successes'], t['total_compactions']):>8}"
+            f"{pct(t['recovery_successes'], t['total_compactions']):>10}"
+            f"{t['peak_tokens']:>13,}"
+        )
+    lines.append("")
+    lines.append("  Run `report --sessions-dir <agents>/<agent>/sessions` for per-session detail.")
+    lines.append("=" * 64)
+    return "\n".join(lines)
+
+
 def format_summary(results):
     """One-line summary for quick checks."""
-    total_c = sum(r["total_compactions"] for r in results)
-    total_fok = sum(r["flush_successes"] for r in results)
-    total_rok = sum(r["recovery_successes"] for r in results)
-    sessions = len(results)
+    totals = _new_totals()
+    for r in results:
+        _add_totals(totals, r)
+    return _summary_line(totals)
+
+
+def _summary_line(totals):
+    total_c = totals["total_compactions"]
+    total_fok = totals["flush_successes"]
+    total_rok = totals["recovery_successes"]
+    sessions = totals["sessions_analyzed"]
 
     if total_c == 0:
         return f"{sessions} sessions, 0 compactions. No compaction events to analyze."
@@ -494,6 +2190,17 @@ def format_summary(results):
     )
 
 
+def format_profile(registry):
+    """Per-rule table for --profile: calls, hits and CPU time, slowest rule first."""
+    total_ns = sum(r.cpu_ns for r in registry.rules) or 1
+    lines = ["Detector profile (CPU time inside each rule)",
+             f"  {'rule':<32}{'stage':<12}{'calls':>12}{'hits':>10}{'cpu ms':>10}{'share':>8}"]
+    for r in sorted(registry.rules, key=lambda r: r.cpu_ns, reverse=True):
+        lines.append(f"  {r.name:<32}{r.stage:<12}{r.calls:>12,}{r.hits:>10,}"
+                     f"{r.cpu_ns / 1e6:>10.1f}{r.cpu_ns / total_ns:>8.0%}")
+    return "\n".join(lines)
+
+
 # ── Telemetry Integration ────────────────────────────────────────────
 
 def log_to_telemetry(results, workspace):
@@ -501,35 +2208,209 @@ def log_to_telemetry(results, workspace):
     Append compaction diagnostic results to the kit's telemetry log.
     Only runs if telemetry is enabled (OPENCLAW_TELEMETRY_ENABLED=1).
     """
-    if os.environ.get("OPENCLAW_TELEMETRY_ENABLED") != "1":
-        return
+    totals = _new_totals()
+    for r in results:
+        _add_totals(totals, r)
+    log_totals_to_telemetry(totals, workspace)
 
-    telemetry_dir = os.path.join(workspace, "telemetry")
-    os.makedirs(telemetry_dir, exist_ok=True)
-    telemetry_file = os.path.join(telemetry_dir, "metrics.jsonl")
 
-    total_c = sum(r["total_compactions"] for r in results)
-    total_fok = sum(r["flush_successes"] for r in results)
-    total_rok = sum(r["recovery_successes"] for r in results)
+def log_totals_to_telemetry(totals, workspace, agent=None):
+    """log_to_telemetry for totals already accumulated (see write_ndjson)."""
+    if not telemetry_enabled():
+        return
 
     event = {
         "event": "compaction_diagnostic",
         "timestamp": datetime.now(timezone.utc).isoformat(),
-        "sessions_analyzed": len(results),
-        "total_compactions": total_c,
-        "flush_successes": total_fok,
-        "flush_failures": total_c - total_fok,
-        "recovery_successes": total_rok,
-        "recovery_failures": total_c - total_rok,
     }
+    if agent is not None:
+        event["agent"] = agent
+    event.update(totals)
+    append_telemetry(workspace, event)
+
+
+def telemetry_enabled():
+    return os.environ.get("OPENCLAW_TELEMETRY_ENABLED") == "1"
 
+
+def append_telemetry(workspace, event):
+    """Append one event to <workspace>/telemetry/metrics.jsonl (best-effort)."""
     try:
-        with open(telemetry_file, "a", encoding="utf-8") as f:
-            f.write(json.dumps(event) + "\n")
+        telemetry_dir = os.path.join(workspace, "telemetry")
+        os.makedirs(telemetry_dir, exist_ok=True)
+        with open(os.path.join(telemetry_dir, "metrics.jsonl"), "a", encoding="utf-8") as f:
+            f.write(openclaw_json.dumps(event) + "\n")
     except OSError:
         pass  # Telemetry is best-effort
 
 
+# ── Live Watch ───────────────────────────────────────────────────────
+
+# inotify(7) constants (Linux)
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_Q_OVERFLOW = 0x00004000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_INOTIFY_EVENT = struct.Struct("iIII")
+
+WATCH_READ_CHUNK = 1 << 20
+
+
+def _inotify_open(directory):
+    """
+    Return an inotify fd watching `directory` for writes and new files, or
+    None where inotify is unavailable (non-Linux, no libc, watch limit hit).
+    """
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if fd < 0:
+            return None
+        mask = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+        if libc.inotify_add_watch(fd, os.fsencode(directory), mask) < 0:
+            os.close(fd)
+            return None
+        return fd
+    except (OSError, AttributeError):
+        return None
+
+
+class SessionWatcher:
+    """
+    Follows every *.jsonl transcript in a sessions directory and reports
+    compaction entries as they are appended.
+
+    Files present at startup are followed from their current end; files
+    created later are read from the start. A truncated or replaced file
+    (size shrank or inode changed) is re-read from the start, and one that
+    vanishes mid-pass (deleted, rotated or compressed) is dropped. Only lines
+    holding one of the detectors' compaction markers (or an escaped letter)
+    are decoded.
+    """
+
+    def __init__(self, sessions_dir, on_compaction):
+        self.sessions_dir = sessions_dir
+        self.on_compaction = on_compaction
+        self.files = {}                     # path -> [inode, offset, partial line]
+
+    def _entries(self):
+        try:
+            with os.scandir(self.sessions_dir) as it:
+                for entry in it:
+                    if entry.name.endswith(".jsonl") and entry.is_file():
+                        yield entry
+        except OSError:
+            return
+
+    def prime(self):
+        """Start following existing transcripts at their current end."""
+        for entry in self._entries():
+            try:
+                st = entry.stat()
+            except OSError:             # removed or rotated since the listing
+                continue
+            self.files[entry.path] = [st.st_ino, st.st_size, b""]
+
+    def scan(self):
+        """One polling pass: a single stat per transcript, read only what grew."""
+        seen = set()
+        for entry in self._entries():
+            try:
+                st = entry.stat()
+            except OSError:             # removed or rotated since the listing
+                continue
+            seen.add(entry.path)
+            state = self.files.get(entry.path)
+            if state is None or state[0] != st.st_ino or state[1] != st.st_size:
+                self.process(entry.path)
+        for path in set(self.files) - seen:
+            del self.files[path]
+
+    def process(self, path):
+        """Read bytes appended to `path` since the last call."""
+        try:
+            f = open(path, "rb")
+        except OSError:
+            self.files.pop(path, None)
+            return
+        with f:
+            st = os.fstat(f.fileno())
+            state = self.files.get(path)
+            if state is None or state[0] != st.st_ino or st.st_size < state[1]:
+                state = self.files[path] = [st.st_ino, 0, b""]
+            f.seek(state[1])
+            while True:
+                try:
+                    chunk = f.read(WATCH_READ_CHUNK)
+                except OSError:
+                    self.files.pop(path, None)
+                    return
+                if not chunk:
+                    break
+                state[1] += len(chunk)
+                lines = (state[2] + chunk).split(b"\n")
+                state[2] = lines.pop()
+                markers = DETECTORS.compaction_markers
+                for raw in lines:
+                    if (markers is None or any(m in raw.lower() for m in markers)
+                            or _ESCAPED_LETTER_RE.search(raw)):
+                        entry = _parse_line(raw)
+                        if entry is not None and _is_compaction_entry(entry):
+                            self.on_compaction(path, entry)
+
+    def run(self, interval=1.0, use_inotify=True):
+        """Follow transcripts until interrupted (inotify if available, else polling)."""
+        self.prime()
+        fd = _inotify_open(self.sessions_dir) if use_inotify else None
+        if fd is None:
+            while True:
+                time.sleep(interval)
+                self.scan()
+        try:
+            while True:
+                select.select([fd], [], [])
+                try:
+                    buf = os.read(fd, 64 * 1024)
+                except BlockingIOError:
+                    continue
+                changed = set()
+                overflow = False
+                pos = 0
+                while pos + _INOTIFY_EVENT.size <= len(buf):
+                    _, mask, _, name_len = _INOTIFY_EVENT.unpack_from(buf, pos)
+                    name = buf[pos + _INOTIFY_EVENT.size:pos + _INOTIFY_EVENT.size + name_len].rstrip(b"\0")
+                    pos += _INOTIFY_EVENT.size + name_len
+                    if mask & _IN_Q_OVERFLOW:
+                        overflow = True
+                    elif name.endswith(b".jsonl"):
+                        changed.add(os.path.join(self.sessions_dir, os.fsdecode(name)))
+                if overflow:
+                    self.scan()
+                for path in sorted(changed):
+                    self.process(path)
+        finally:
+            os.close(fd)
+
+
+def compaction_detected_event(path, entry):
+    """Telemetry row for a live compaction, matching the session:compacted hook stub."""
+    summary = entry.get("summary")
+    return {
+        "event": "compaction_detected",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "sessionKey": os.path.splitext(os.path.basename(path))[0],
+        "preCompactTokens": entry.get("tokensBefore"),
+        "postCompactTokens": entry.get("tokensAfter"),
+        "summaryLength": len(summary) if isinstance(summary, str) else 0,
+        "source": "watch",
+    }
+
+
 # ── Hook Stub ────────────────────────────────────────────────────────
 
 HOOK_STUB = """\
@@ -539,6 +2420,8 @@ HOOK_STUB = """\
 //
 // Until then, use the diagnostic tool for retroactive analysis:
 //   python3 TOOLS/openclaw_compaction_diagnostics.py report
+// or follow sessions live (logs the same compaction_detected event):
+//   python3 TOOLS/openclaw_compaction_diagnostics.py watch
 //
 // When the hook is available, this script will:
 // 1. Log the compaction event to kit telemetry
@@ -589,6 +2472,142 @@ module.exports = {
 
 # ── CLI ──────────────────────────────────────────────────────────────
 
+def _open_cache(args):
+    if args.no_cache:
+        return None
+    return SessionCache(default_cache_path(args.workspace), args.cache_entries)
+
+
+def _limit_series(result, points):
+    """Downsample (or with points <= 0, drop) a result's token series."""
+    if points <= 0:
+        result.pop("token_series", None)
+    elif result.get("token_series"):
+        result["token_series"] = downsample_series(result["token_series"], points)
+
+
+def _run_fleet(args):
+    """report/summary --all-agents: one pool across agents, per-agent rollups plus a fleet total."""
+    agent_dirs = find_agent_session_dirs(args.agents_root)
+    if not agent_dirs:
+        print(f"No agent session directories found under {args.agents_root}", file=sys.stderr)
+        sys.exit(1)
+    agent_files = [(agent, find_session_files(d, args.days, args.partitioned)) for agent, d in agent_dirs]
+    if not any(files for _, files in agent_files):
+        if args.command == "summary":
+            print(f"No sessions found in last {args.days} days.")
+            sys.exit(0)
+        print(f"No session files found under {args.agents_root}", file=sys.stderr)
+        sys.exit(1)
+
+    rollups = OrderedDict((agent, dict(_new_totals(), peak_tokens=0)) for agent, _ in agent_files)
+    fleet = dict(_new_totals(), peak_tokens=0)
+    ndjson = args.command == "report" and args.ndjson
+    detail = defaultdict(list) if args.command == "report" and args.json else None
+
+    cache = _open_cache(args)
+    for agent, r in analyze_fleet(agent_files, args.workspace, args.jobs, cache, args.engine):
+        for totals in (rollups[agent], fleet):
+            _add_totals(totals, r)
+            totals["peak_tokens"] = max(totals["peak_tokens"], r["peak_tokens"])
+        if ndjson:
+            _limit_series(r, args.series_points)
+            row = {"type": "session", "agent": agent, **_serializable_result(r)}
+            print(openclaw_json.dumps(row, compact=True), flush=True)
+        elif detail is not None:
+            _limit_series(r, args.series_points)
+            detail[agent].append(r)
+    if cache is not None:
+        cache.save()
+
+    if ndjson:
+        for agent, totals in rollups.items():
+            print(openclaw_json.dumps({"type": "agent", "agent": agent, **totals}, compact=True))
+        print(openclaw_json.dumps({"type": "summary", **fleet}, compact=True))
+    elif args.command == "report":
+        print(format_fleet(rollups, fleet, output_json=args.json, sessions=detail))
+    else:
+        for agent, totals in rollups.items():
+            print(f"{agent}: {_summary_line(totals)}")
+        print(f"fleet: {_summary_line(fleet)}")
+
+    for agent, totals in rollups.items():
+        if totals["sessions_analyzed"]:
+            log_totals_to_telemetry(totals, args.workspace, agent)
+
+
+def _load_detectors(args):
+    """Install the workspace's detector rules; --profile also forces a serial, uncached run."""
+    path = args.detectors or default_detectors_path(args.workspace)
+    try:
+        config = load_detector_config(path)
+    except ValueError as exc:
+        print(f"Invalid detector config: {exc}", file=sys.stderr)
+        sys.exit(2)
+    if config is None and args.detectors:
+        print(f"Detector config not found: {path}", file=sys.stderr)
+        sys.exit(2)
+    configure_detectors(config)
+    if getattr(args, "profile", False):
+        # Counters live in this process: no worker pool, no cached results.
+        enable_profiling()
+        args.jobs = 1
+        args.no_cache = True
+
+
+def enable_profiling():
+    """
+    Instrument this process for --profile: per-rule detector CPU time and
+    per-phase timing (discovery, read, decode, detect, rules, analyze,
+    results, format). The hot-path functions are wrapped in place, so runs without
+    --profile pay nothing. Counters are per process; profile serial runs.
+    """
+    global _read_lines, _parse_line, _entry_features, _is_compaction_entry, _analyze_record
+    global _result_from_record, find_session_files, iter_session_files, find_agent_session_dirs
+    global format_report, format_summary, format_fleet, write_ndjson
+    DETECTORS.profiler = PROFILE
+    PROFILE.enabled = True
+
+    def read_lines(filepath, _read=_read_lines):
+        return PROFILE.iter_bytes("read", _read(filepath))
+
+    _read_lines = read_lines
+    _parse_line = PROFILE.timed("decode", _parse_line)
+    _is_compaction_entry = PROFILE.timed("detect", _is_compaction_entry)
+    _entry_features = PROFILE.timed("detect", _entry_features, items=0)
+    _analyze_record = PROFILE.timed("analyze", _analyze_record)
+    _result_from_record = PROFILE.timed("results", _result_from_record)
+    find_session_files = PROFILE.timed("discovery", find_session_files, items=len)
+
+    def iter_files(*args, _iter=iter_session_files):
+        return PROFILE.iter_items("discovery", _iter(*args))
+
+    iter_session_files = iter_files
+    find_agent_session_dirs = PROFILE.timed("discovery", find_agent_session_dirs, items=0)
+    format_report = PROFILE.timed("format", format_report)
+    format_summary = PROFILE.timed("format", format_summary)
+    format_fleet = PROFILE.timed("format", format_fleet)
+    write_ndjson = PROFILE.timed("format", write_ndjson)
+
+
+def _print_profile(args):
+    """--profile: phase and detector tables to stderr, plus a tool_profile telemetry event."""
+    print(PROFILE.format(), file=sys.stderr)
+    print(format_profile(DETECTORS), file=sys.stderr)
+    rules = {r.name: {"calls": r.calls, "hits": r.hits, "cpu_ms": round(r.cpu_ns / 1e6, 3)}
+             for r in DETECTORS.rules}
+    openclaw_profile.log_event(args.workspace, PROFILE, command=args.command, detectors=rules)
+
+
+def _open_index(args):
+    """Open the event index for report/summary --from-index, or exit if missing."""
+    db = args.index_db or default_index_path(args.workspace)
+    if not os.path.exists(db):
+        print(f"No event index at {db}; run the `index` command first.", file=sys.stderr)
+        sys.exit(1)
+    return EventIndex(db)
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="OpenClaw Cognitive Upgrade Kit — Compaction Diagnostics"
@@ -603,13 +2622,85 @@ def main():
     report_p.add_argument("--workspace", default=DEFAULT_WORKSPACE,
                           help=f"Workspace directory (default: {DEFAULT_WORKSPACE})")
     report_p.add_argument("--days", type=int, help="Only analyze sessions from last N days")
-    report_p.add_argument("--json", action="store_true", help="Output as JSON")
+    report_p.add_argument("--partitioned", action="store_true",
+                          help="Also search date-named subdirectories (YYYY, YYYY-MM, YYYY-MM-DD, YYYY/MM/DD)")
+    report_output = report_p.add_mutually_exclusive_group()
+    report_output.add_argument("--json", action="store_true", help="Output as JSON")
+    report_output.add_argument("--ndjson", action="store_true",
+                               help="Stream one JSON line per session as it is analyzed, then a summary line")
+    report_p.add_argument("--series-points", type=int, default=DEFAULT_SERIES_POINTS,
+                          help=f"Token series points per session in --json output, 0 to omit "
+                               f"(default: {DEFAULT_SERIES_POINTS}, max: {SERIES_RECORD_POINTS})")
+    report_p.add_argument("--jobs", type=int, default=DEFAULT_JOBS,
+                          help=f"Parallel worker processes (default: {DEFAULT_JOBS})")
+    report_p.add_argument("--no-cache", action="store_true",
+                          help="Ignore and do not update the per-session result cache")
+    report_p.add_argument("--cache-entries", type=int, default=DEFAULT_CACHE_ENTRIES,
+                          help=f"Max sessions kept in the cache (default: {DEFAULT_CACHE_ENTRIES})")
+    report_p.add_argument("--engine", choices=("stream", "mmap"), default="stream",
+                          help="stream: one forward pass; mmap: decode only compaction windows "
+                               "(faster on large transcripts with few compactions)")
+    report_p.add_argument("--from-index", action="store_true",
+                          help="Answer from the event index (see `index`) instead of parsing transcripts")
+    report_p.add_argument("--index-db", help="Event index path (default: <workspace>/.cache/compaction-index.sqlite)")
+    report_p.add_argument("--all-agents", action="store_true",
+                          help="Scan every agent's sessions directory and report per-agent rollups")
+    report_p.add_argument("--agents-root", default=DEFAULT_AGENTS_ROOT,
+                          help=f"Agents directory for --all-agents (default: {DEFAULT_AGENTS_ROOT})")
+    report_p.add_argument("--detectors",
+                          help=f"Detector rules file (default: <workspace>/{DETECTORS_FILENAME} if present)")
+    report_p.add_argument("--profile", action="store_true",
+                          help="Print per-phase and per-detector-rule timings to stderr (runs serially, no cache)")
 
     # Summary command
     summary_p = subparsers.add_parser("summary", help="One-line summary")
     summary_p.add_argument("--sessions-dir", default=DEFAULT_SESSIONS_DIR)
     summary_p.add_argument("--workspace", default=DEFAULT_WORKSPACE)
     summary_p.add_argument("--days", type=int, default=7, help="Days to look back (default: 7)")
+    summary_p.add_argument("--partitioned", action="store_true",
+                           help="Also search date-named subdirectories (YYYY, YYYY-MM, YYYY-MM-DD, YYYY/MM/DD)")
+    summary_p.add_argument("--jobs", type=int, default=DEFAULT_JOBS,
+                           help=f"Parallel worker processes (default: {DEFAULT_JOBS})")
+    summary_p.add_argument("--no-cache", action="store_true",
+                           help="Ignore and do not update the per-session result cache")
+    summary_p.add_argument("--cache-entries", type=int, default=DEFAULT_CACHE_ENTRIES,
+                           help=f"Max sessions kept in the cache (default: {DEFAULT_CACHE_ENTRIES})")
+    summary_p.add_argument("--engine", choices=("stream", "mmap"), default="stream",
+                           help="stream: one forward pass; mmap: decode only compaction windows "
+                                "(faster on large transcripts with few compactions)")
+    summary_p.add_argument("--from-index", action="store_true",
+                           help="Answer from the event index (see `index`) instead of parsing transcripts")
+    summary_p.add_argument("--index-db", help="Event index path (default: <workspace>/.cache/compaction-index.sqlite)")
+    summary_p.add_argument("--all-agents", action="store_true",
+                           help="Scan every agent's sessions directory and report per-agent rollups")
+    summary_p.add_argument("--agents-root", default=DEFAULT_AGENTS_ROOT,
+                           help=f"Agents directory for --all-agents (default: {DEFAULT_AGENTS_ROOT})")
+    summary_p.add_argument("--detectors",
+                           help=f"Detector rules file (default: <workspace>/{DETECTORS_FILENAME} if present)")
+    summary_p.add_argument("--profile", action="store_true",
+                           help="Print per-phase and per-detector-rule timings to stderr (runs serially, no cache)")
+
+    # Index command
+    index_p = subparsers.add_parser("index", help="Build or update the SQLite event index")
+    index_p.add_argument("--sessions-dir", default=DEFAULT_SESSIONS_DIR)
+    index_p.add_argument("--workspace", default=DEFAULT_WORKSPACE)
+    index_p.add_argument("--days", type=int, help="Only index sessions modified in the last N days")
+    index_p.add_argument("--partitioned", action="store_true",
+                         help="Also search date-named subdirectories (YYYY, YYYY-MM, YYYY-MM-DD, YYYY/MM/DD)")
+    index_p.add_argument("--index-db", help="Event index path (default: <workspace>/.cache/compaction-index.sqlite)")
+    index_p.add_argument("--rebuild", action="store_true", help="Discard the index and re-index every session")
+    index_p.add_argument("--detectors",
+                         help=f"Detector rules file (default: <workspace>/{DETECTORS_FILENAME} if present)")
+
+    # Watch command
+    watch_p = subparsers.add_parser("watch", help="Follow session transcripts and log compactions live")
+    watch_p.add_argument("--sessions-dir", default=DEFAULT_SESSIONS_DIR)
+    watch_p.add_argument("--workspace", default=DEFAULT_WORKSPACE)
+    watch_p.add_argument("--interval", type=float, default=1.0,
+                         help="Polling interval in seconds when inotify is unavailable (default: 1.0)")
+    watch_p.add_argument("--poll", action="store_true", help="Force stat polling instead of inotify")
+    watch_p.add_argument("--detectors",
+                         help=f"Detector rules file (default: <workspace>/{DETECTORS_FILENAME} if present)")
 
     # Hook stub command
     hook_p = subparsers.add_parser("hook-stub", help="Print the session:compacted hook stub")
@@ -617,45 +2708,124 @@ def main():
 
     args = parser.parse_args()
 
+    if getattr(args, "profile", False) and args.from_index:
+        parser.error("--profile cannot be combined with --from-index")
+    if args.command in ("report", "summary", "index", "watch"):
+        _load_detectors(args)
+
+    if getattr(args, "all_agents", False):
+        if args.from_index:
+            parser.error("--all-agents cannot be combined with --from-index")
+        if getattr(args, "session", None):
+            parser.error("--all-agents cannot be combined with --session")
+        _run_fleet(args)
+        if args.profile:
+            _print_profile(args)
+        return
+
     if args.command == "report":
-        if args.session:
-            files = [args.session]
+        cache = index = None
+        if args.from_index:
+            index = _open_index(args)
+            results = index.results(args.workspace, args.days, args.session)
+            empty_msg = "No indexed sessions found."
+        else:
+            if args.session:
+                files = [args.session]
+            else:
+                files = find_session_files(args.sessions_dir, args.days, args.partitioned)
+                if not files:
+                    print(f"No session files found in {args.sessions_dir}", file=sys.stderr)
+                    if args.days:
+                        print(f"(filtered to last {args.days} days)", file=sys.stderr)
+                    sys.exit(1)
+            cache = _open_cache(args)
+            results = analyze_sessions(files, args.workspace, args.jobs, cache, args.engine)
+            empty_msg = "No analyzable sessions found."
+
+        if args.ndjson:
+            totals = write_ndjson(results, sys.stdout, args.series_points)
         else:
-            files = find_session_files(args.sessions_dir, args.days)
-            if not files:
-                print(f"No session files found in {args.sessions_dir}", file=sys.stderr)
-                if args.days:
-                    print(f"(filtered to last {args.days} days)", file=sys.stderr)
+            results = list(results)
+        if cache is not None:
+            cache.save()
+        if index is not None:
+            index.close()
+
+        if args.ndjson:
+            if not totals["sessions_analyzed"]:
+                print(empty_msg, file=sys.stderr)
+                sys.exit(1)
+            log_totals_to_telemetry(totals, args.workspace)
+        else:
+            if not results:
+                print(empty_msg, file=sys.stderr)
                 sys.exit(1)
 
-        results = []
-        for f in files:
-            r = analyze_session(f, args.workspace)
-            if r:
-                results.append(r)
+            for r in results:
+                _limit_series(r, args.series_points)
+            print(format_report(results, output_json=args.json))
+            log_to_telemetry(results, args.workspace)
 
+    elif args.command == "summary" and args.from_index:
+        index = _open_index(args)
+        results = list(index.results(args.workspace, args.days))
+        index.close()
         if not results:
-            print("No analyzable sessions found.", file=sys.stderr)
-            sys.exit(1)
+            print(f"No indexed sessions in last {args.days} days.")
+            sys.exit(0)
 
-        print(format_report(results, output_json=args.json))
+        print(format_summary(results))
         log_to_telemetry(results, args.workspace)
 
     elif args.command == "summary":
-        files = find_session_files(args.sessions_dir, args.days)
-        if not files:
+        # Order does not matter for a summary: analyze while listing.
+        files = iter_session_files(args.sessions_dir, args.days, args.partitioned)
+        first = next(files, None)
+        if first is None:
             print(f"No sessions found in last {args.days} days.")
             sys.exit(0)
+        files = itertools.chain((first,), files)
 
-        results = []
-        for f in files:
-            r = analyze_session(f, args.workspace)
-            if r:
-                results.append(r)
+        cache = _open_cache(args)
+        results = list(analyze_sessions(files, args.workspace, args.jobs, cache, args.engine))
+        if cache is not None:
+            cache.save()
 
         print(format_summary(results))
         log_to_telemetry(results, args.workspace)
 
+    elif args.command == "index":
+        if not os.path.isdir(args.sessions_dir):
+            print(f"Sessions directory not found: {args.sessions_dir}", file=sys.stderr)
+            sys.exit(1)
+        db = args.index_db or default_index_path(args.workspace)
+        index = EventIndex(db)
+        if args.rebuild:
+            index.rebuild()
+        indexed, unchanged = index.update(iter_session_files(args.sessions_dir, args.days, args.partitioned))
+        removed = index.prune()
+        index.close()
+        print(f"Indexed {indexed} session(s), {unchanged} unchanged, {removed} removed -> {db}")
+
+    elif args.command == "watch":
+        if not os.path.isdir(args.sessions_dir):
+            print(f"Sessions directory not found: {args.sessions_dir}", file=sys.stderr)
+            sys.exit(1)
+
+        def on_compaction(path, entry):
+            event = compaction_detected_event(path, entry)
+            print(openclaw_json.dumps(event), flush=True)
+            if telemetry_enabled():
+                append_telemetry(args.workspace, event)
+
+        watcher = SessionWatcher(args.sessions_dir, on_compaction)
+        print(f"Watching {args.sessions_dir} for compactions (Ctrl-C to stop)", file=sys.stderr)
+        try:
+            watcher.run(interval=args.interval, use_inotify=not args.poll)
+        except KeyboardInterrupt:
+            pass
+
     elif args.command == "hook-stub":
         if args.output:
             with open(args.output, "w") as f:
@@ -668,6 +2838,9 @@ def main():
         parser.print_help()
         sys.exit(1)
 
+    if getattr(args, "profile", False):
+        _print_profile(args)
+
 
 if __name__ == "__main__":
     main()
@@ -25,6 +25,9 @@ Usage:
   # Custom context window size (default: 200000 tokens)
   python3 TOOLS/openclaw_context_monitor.py check --context-window 128000
 
+  # Per-phase timings on stderr
+  python3 TOOLS/openclaw_context_monitor.py report --profile
+
 How it works:
   Estimates token usage from files that get injected or loaded per turn:
   - Auto-injected files (AGENTS.md, SOUL.md, IDENTITY.md, USER.md, TOOLS.md,
@@ -55,6 +58,10 @@ import sys
 from datetime import datetime, timedelta
 from pathlib import Path
 
+import openclaw_profile
+
+PROFILE = openclaw_profile.Profiler("context_monitor")
+
 
 def estimate_tokens(char_count: int) -> int:
     """Conservative estimate: ~4 chars per token for English markdown."""
@@ -63,6 +70,7 @@ def estimate_tokens(char_count: int) -> int:
 
 def file_size_chars(path: str) -> int:
     """Return file size in characters, 0 if missing."""
+    PROFILE.add("scan", items=1)
     try:
         return os.path.getsize(path)
     except (OSError, FileNotFoundError):
@@ -119,7 +127,9 @@ def scan_workspace(workspace: str) -> dict:
         active_agent = None
         if gs_path.exists():
             try:
-                content = gs_path.read_text()
+                with PROFILE.phase("read"):
+                    content = gs_path.read_text()
+                    PROFILE.add("read", nbytes=len(content), items=1)
                 for line in content.splitlines():
                     if line.strip().startswith("active_agent:"):
                         active_agent = line.split(":", 1)[1].strip().strip('"').strip("'")
@@ -176,7 +186,9 @@ def scan_workspace(workspace: str) -> dict:
 def check(workspace: str, context_window: int, warn_pct: int, critical_pct: int,
           output_json: bool) -> int:
     """Run a pressure check. Returns exit code."""
-    breakdown = scan_workspace(workspace)
+    with PROFILE.phase("scan"):
+        breakdown = scan_workspace(workspace)
+    PROFILE.start("format")
     total_tokens = breakdown["_total"]["tokens"]
     usage_pct = (total_tokens * 100) // context_window if context_window > 0 else 0
 
@@ -212,12 +224,15 @@ def check(workspace: str, context_window: int, warn_pct: int, critical_pct: int,
         else:
             print("   Healthy. No action needed.")
 
+    PROFILE.stop()
     return exit_code
 
 
 def report(workspace: str, context_window: int) -> int:
     """Detailed breakdown report."""
-    breakdown = scan_workspace(workspace)
+    with PROFILE.phase("scan"):
+        breakdown = scan_workspace(workspace)
+    PROFILE.start("format")
     total_tokens = breakdown["_total"]["tokens"]
     usage_pct = (total_tokens * 100) // context_window if context_window > 0 else 0
 
@@ -256,6 +271,7 @@ def report(workspace: str, context_window: int) -> int:
     print("conversation history, tool outputs, and model overhead — which this tool cannot measure.")
     print("Use /context detail or session_status for live context window usage.")
 
+    PROFILE.stop()
     return 0
 
 
@@ -275,8 +291,11 @@ def main():
                         help="Critical threshold percent of context window (default: 25)")
     parser.add_argument("--json", action="store_true",
                         help="JSON output (for heartbeat scripts)")
+    parser.add_argument("--profile", action="store_true",
+                        help="Print per-phase timings to stderr")
 
     args = parser.parse_args()
+    PROFILE.enabled = args.profile
 
     # Resolve workspace
     workspace = args.workspace
@@ -289,9 +308,13 @@ def main():
         sys.exit(1)
 
     if args.command == "check":
-        sys.exit(check(workspace, args.context_window, args.warn, args.critical, args.json))
-    elif args.command == "report":
-        sys.exit(report(workspace, args.context_window))
+        code = check(workspace, args.context_window, args.warn, args.critical, args.json)
+    else:
+        code = report(workspace, args.context_window)
+    if args.profile:
+        print(PROFILE.format(), file=sys.stderr)
+        openclaw_profile.log_event(workspace, PROFILE, command=args.command)
+    sys.exit(code)
 
 
 if __name__ == "__main__":
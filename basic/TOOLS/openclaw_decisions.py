@@ -0,0 +1,383 @@
+"""
+openclaw_decisions.py (v1.0)
+
+Shared [DECISION] block parsing for the resolver and the linter.
+
+A decision block looks like:
+
+  [DECISION]
+  Decision: Use Postgres for the event store
+  Approved by: owner
+  Date: 2026-02-01
+  Status: ACTIVE
+  Domain: infra
+  Superseded by: <key>        (SUPERSEDED decisions only)
+
+A block runs from its [DECISION] marker to the next line that starts with
+"[" (or the end of the file). scan_blocks() finds blocks in one forward
+pass over a binary stream, read in chunks, and reports each block's exact
+byte span and line span; memory is bounded by the chunk size plus the
+longest block. Lines end at "\n"; a "\r\n" ending is normalized in the
+block text (as text-mode reads do) but a lone "\r" does not end a line.
+
+parse_file() and parse_decisions() reduce each block to a compact Decision
+once. The fields the tools compare are computed when the block is parsed:
+the token set used for similarity, the parsed date, the required fields
+that are missing, and the normalized key. Domain, status and token strings
+are interned, because thousands of decisions share a small vocabulary.
+
+DecisionCache keeps parsed decisions on disk between runs, keyed by each
+file's stat and content hash, so tools run from heartbeats re-parse only
+the files that changed.
+
+Usage:
+  import openclaw_decisions
+  for d in openclaw_decisions.parse_file(path, "GLOBAL-STATE.yaml"):
+      print(d.key, d.status, d.day, d.line_start, d.byte_start, sorted(d.tokens))
+
+  cache = openclaw_decisions.DecisionCache(openclaw_decisions.default_cache_path(workspace))
+  decisions = cache.parse_file(path, "GLOBAL-STATE.yaml")    # one stat if unchanged
+  cache.save()
+"""
+from __future__ import annotations
+import datetime
+import hashlib
+import io
+import os
+import re
+import sys
+from collections import OrderedDict
+from typing import BinaryIO, Dict, FrozenSet, Iterator, List, NamedTuple, Optional, Tuple
+
+import openclaw_json
+
+MARKER = b"[DECISION]"
+BLOCK_END = b"\n["           # a block ends before the newline of the next "[" line
+CHUNK_SIZE = 1 << 20
+
+DATE_RE = re.compile(r"(\d{4})-(\d{2})-(\d{2})")
+
+REQ_FIELDS = ["Decision:", "Approved by:", "Date:", "Status:"]
+STATUS_OK = {"ACTIVE", "SUPERSEDED"}
+
+STOPWORDS = {
+    "the","a","an","to","of","and","or","for","in","on","at","with","we","our","is","are","be","this","that","it","as"
+}
+
+def norm_text(s: str) -> str:
+    s = s.lower()
+    s = re.sub(r"[^a-z0-9\s]+", " ", s)
+    s = re.sub(r"\s+", " ", s).strip()
+    return s
+
+def tokens(s: str) -> List[str]:
+    t = [w for w in norm_text(s).split(" ") if w and w not in STOPWORDS]
+    return t
+
+def sha10(s: str) -> str:
+    return hashlib.sha1(s.encode("utf-8")).hexdigest()[:10]
+
+def extract_field(block: str, prefix: str) -> Optional[str]:
+    for line in block.splitlines():
+        line_s = line.strip()
+        if line_s.startswith(prefix):
+            return line_s.split(prefix, 1)[1].strip()
+    return None
+
+FIELDS = ("Decision:", "Approved by:", "Date:", "Status:", "Domain:", "Superseded by:")
+
+def extract_fields(block: str, prefixes=FIELDS) -> Dict[str, str]:
+    """extract_field for several "Name:" prefixes in one pass over the block's lines (prefix -> value)."""
+    wanted = set(prefixes)
+    out = {}
+    for line in block.splitlines():
+        head, colon, value = line.strip().partition(":")
+        # A line starts with "Name:" exactly when its text up to the first colon is "Name"
+        p = head + colon
+        if p in wanted:
+            wanted.discard(p)
+            out[p] = value.strip()
+            if not wanted:
+                break
+    return out
+
+def extract_multifield(block: str) -> Dict[str, str]:
+    return {p[:-1]: v for p, v in extract_fields(block).items() if v}
+
+def parse_date(s: Optional[str]) -> Optional[datetime.date]:
+    """The leading YYYY-MM-DD of a Date: field, or None if it has none or it is not a real date."""
+    m = DATE_RE.match(s or "")
+    if not m:
+        return None
+    try:
+        return datetime.date(int(m.group(1)), int(m.group(2)), int(m.group(3)))
+    except ValueError:
+        return None
+
+class Block(NamedTuple):
+    text: str           # from the marker up to (not including) the terminating newline
+    byte_start: int
+    byte_end: int
+    line_start: int
+    line_end: int
+
+def block_text(raw: bytes) -> str:
+    """Decode a block's bytes the way the tools read text files (UTF-8, universal newlines)."""
+    text = raw.decode("utf-8", "ignore")
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+def scan_blocks(f: BinaryIO, chunk_size: int = CHUNK_SIZE) -> Iterator[Block]:
+    """
+    Yield every [DECISION] block in binary stream f, in one pass.
+
+    The scanner has two states. Outside a block it searches for the marker
+    (anywhere on a line); inside one it searches for the next newline
+    followed by "[". Both are bytes.find over the buffered chunk. Newlines
+    are counted once, between successive block boundaries, so line numbers
+    cost one pass too. Consumed bytes are dropped before each read.
+    """
+    buf = b""
+    base = 0            # offset of buf[0] in the stream
+    line, lpos = 1, 0   # line number at buf[lpos]
+    start = -1          # start of the open block in buf, or -1 outside one
+    pos = 0             # where the next search in buf begins
+    eof = False
+    while True:
+        if start < 0:
+            k = buf.find(MARKER, pos)
+            if k >= 0:
+                start, pos = k, k + len(MARKER)
+                line += buf.count(b"\n", lpos, k)
+                lpos = k
+        if start >= 0:
+            e = buf.find(BLOCK_END, pos)
+            if e >= 0 or eof:
+                ended = e >= 0
+                if not ended:
+                    e = len(buf)
+                raw = buf[start:e]
+                line_end = line + raw.count(b"\n")
+                if ended and raw.endswith(b"\r"):
+                    raw = raw[:-1]
+                yield Block(block_text(raw), base + start, base + start + len(raw), line, line_end)
+                line, lpos = line_end, e
+                start, pos = -1, e
+                continue
+            # The terminator may straddle the read: resume at the last byte
+            pos = max(pos, len(buf) - 1)
+            drop = start
+        elif eof:
+            return
+        else:
+            # A marker may straddle the read: keep its possible prefix
+            pos = max(pos, len(buf) - len(MARKER) + 1)
+            drop = pos
+        line += buf.count(b"\n", lpos, drop)
+        chunk = f.read(chunk_size)
+        buf = buf[drop:] + chunk
+        base += drop
+        pos -= drop
+        lpos = 0
+        if start >= 0:
+            start -= drop
+        eof = not chunk
+
+class Decision:
+    """One [DECISION] block, with the fields the tools compare precomputed."""
+
+    __slots__ = ("source", "block", "decision", "approved_by", "date", "status", "domain",
+                 "superseded_by", "key", "key_norm", "tokens", "day", "missing",
+                 "line_start", "line_end", "byte_start", "byte_end")
+
+    def __init__(self, source: str, block: Block):
+        self.source = source
+        self.block = block.text
+        self.line_start = block.line_start
+        self.line_end = block.line_end
+        self.byte_start = block.byte_start
+        self.byte_end = block.byte_end
+        block = block.text
+        fields = extract_fields(block)
+        self.decision = fields.get("Decision:") or ""
+        self.approved_by = fields.get("Approved by:")
+        self.date = fields.get("Date:")
+        self.status = sys.intern((fields.get("Status:") or "").upper())
+        self.domain = sys.intern((fields.get("Domain:") or "unknown").strip().lower())
+        self.superseded_by = fields.get("Superseded by:")
+        words = [sys.intern(w) for w in tokens(self.decision)]
+        self.key_norm = " ".join(words)
+        self.key = sha10(self.key_norm) if self.key_norm else sha10(norm_text(self.decision))
+        self.tokens: FrozenSet[str] = frozenset(words)
+        self.day = parse_date(self.date)
+        self.missing: Tuple[str, ...] = tuple(f for f in REQ_FIELDS if f not in block)
+
+    def to_record(self) -> list:
+        """The block and its parsed fields as a JSON-able list (the source is not stored)."""
+        return [self.block, self.decision, self.approved_by, self.date, self.status, self.domain,
+                self.superseded_by, self.key, self.key_norm, list(self.missing),
+                self.line_start, self.line_end, self.byte_start, self.byte_end]
+
+    @classmethod
+    def from_record(cls, source: str, rec: list) -> "Decision":
+        """Rebuild a Decision from to_record() output without re-parsing its block."""
+        d = cls.__new__(cls)
+        (d.block, d.decision, d.approved_by, d.date, status, domain, d.superseded_by, d.key,
+         d.key_norm, missing, d.line_start, d.line_end, d.byte_start, d.byte_end) = rec
+        d.source = source
+        d.status = sys.intern(status)
+        d.domain = sys.intern(domain)
+        # key_norm is the decision's tokens joined by single spaces
+        d.tokens = frozenset(sys.intern(w) for w in d.key_norm.split(" ")) if d.key_norm else frozenset()
+        d.day = parse_date(d.date)
+        d.missing = tuple(missing)
+        return d
+
+    def __repr__(self):
+        return f"Decision(key={self.key!r}, status={self.status!r}, domain={self.domain!r}, lines={self.line_start}-{self.line_end})"
+
+def parse_file(path, source: str) -> List[Decision]:
+    """Decisions in the file at path, read incrementally."""
+    with open(path, "rb") as f:
+        return [Decision(source, b) for b in scan_blocks(f)]
+
+def parse_decisions(text: str, source: str) -> List[Decision]:
+    """Decisions in text; byte spans are offsets into its UTF-8 encoding."""
+    return [Decision(source, b) for b in scan_blocks(io.BytesIO(text.encode("utf-8")))]
+
+class _HashingReader:
+    """A binary stream wrapper that hashes everything read through it."""
+
+    def __init__(self, f: BinaryIO):
+        self.f = f
+        self.sha = hashlib.sha1()
+
+    def read(self, n: int = -1) -> bytes:
+        data = self.f.read(n)
+        self.sha.update(data)
+        return data
+
+def parse_file_hashed(path, source: str) -> Tuple[List[Decision], str]:
+    """parse_file() plus the SHA-1 of the file's content, from the same single read."""
+    with open(path, "rb") as f:
+        reader = _HashingReader(f)
+        decisions = [Decision(source, b) for b in scan_blocks(reader)]
+        # scan_blocks stops at end of file, so the hash covers all of it
+        return decisions, reader.sha.hexdigest()
+
+def file_sha1(path) -> str:
+    sha = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+# ── Parsed-decision cache ────────────────────────────────────────────
+
+CACHE_VERSION = 1
+DEFAULT_CACHE_ENTRIES = 100000
+
+def default_cache_path(workspace) -> str:
+    return os.path.join(workspace, ".cache", "decisions.json")
+
+class DecisionCache:
+    """
+    On-disk cache of parsed decisions per file.
+
+    Entries are keyed by absolute path and validated against the file's
+    (inode, size, mtime_ns), so an unchanged file costs one stat. When the
+    stat differs the content's SHA-1 is checked before re-parsing: a file
+    that was touched or rewritten with the same bytes is served from the
+    cache and its key refreshed. Decisions are stored with their parsed
+    fields (Decision.to_record), so a hit does no parsing at all. The cache
+    holds at most `max_entries` files and evicts the least recently used.
+
+    Tools may keep other derived state in `extra` (name -> JSON-able
+    value); it is saved with the entries and must be validated by its user.
+    """
+
+    def __init__(self, path, max_entries: int = DEFAULT_CACHE_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.entries = OrderedDict()        # abspath -> {"key", "sha1", "decisions"}
+        self.extra: Dict[str, object] = {}
+        self.hits = 0
+        self.dirty = False
+        self._load()
+
+    @staticmethod
+    def stat_key(path) -> List[int]:
+        st = os.stat(path)
+        return [st.st_ino, st.st_size, st.st_mtime_ns]
+
+    def _load(self):
+        try:
+            with open(self.path, "rb") as f:
+                data = openclaw_json.loads(f.read())
+        except (OSError, ValueError):
+            return
+        if not isinstance(data, dict) or data.get("version") != CACHE_VERSION:
+            return
+        # Stored least recently used first
+        for path, entry in data.get("files", []):
+            self.entries[path] = entry
+        self.extra = data.get("extra") or {}
+
+    def get(self, path, key: List[int], source: str) -> Optional[List[Decision]]:
+        """Cached decisions for path, or None if its content changed (or it was never cached)."""
+        apath = os.path.abspath(path)
+        entry = self.entries.get(apath)
+        if entry is None:
+            return None
+        if entry["key"] != key:
+            try:
+                if file_sha1(path) != entry["sha1"]:
+                    return None
+            except OSError:
+                return None
+            entry["key"] = key
+            self.dirty = True
+        # Recency is saved with the next write; a run with only hits writes nothing
+        self.entries.move_to_end(apath)
+        self.hits += 1
+        return [Decision.from_record(source, rec) for rec in entry["decisions"]]
+
+    def put(self, path, key: List[int], sha1: str, decisions: List[Decision]):
+        apath = os.path.abspath(path)
+        self.entries[apath] = {"key": key, "sha1": sha1, "decisions": [d.to_record() for d in decisions]}
+        self.entries.move_to_end(apath)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        self.dirty = True
+
+    def parse_file(self, path, source: str) -> List[Decision]:
+        """Like the module's parse_file(), served from the cache when the file is unchanged."""
+        key = self.stat_key(path)
+        decisions = self.get(path, key, source)
+        if decisions is None:
+            decisions, sha1 = parse_file_hashed(path, source)
+            self.put(path, key, sha1, decisions)
+        return decisions
+
+    def set_extra(self, name: str, value):
+        self.extra[name] = value
+        self.dirty = True
+
+    def save(self):
+        """Write the cache atomically. Best-effort: I/O errors are ignored."""
+        if not self.dirty:
+            return
+        data = {"version": CACHE_VERSION, "files": list(self.entries.items()), "extra": self.extra}
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(openclaw_json.dumps(data, compact=True))
+            os.replace(tmp, self.path)
+            self.dirty = False
+        except OSError:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
@@ -0,0 +1,93 @@
+"""
+openclaw_json.py (v1.0)
+
+Shared JSON backend for the kit's JSONL readers and writers.
+
+Decoding uses orjson or msgspec when one is installed and falls back to the
+standard library otherwise. Select explicitly with:
+
+  OPENCLAW_JSON_BACKEND=auto|orjson|msgspec|json   (default: auto)
+
+A backend that is requested but not installed falls back to stdlib json.
+
+Behavior is identical across backends:
+  - loads() retries with stdlib json whenever the fast decoder rejects
+    input that stdlib accepts (NaN/Infinity, lone surrogates), and raises
+    json.JSONDecodeError for malformed input. Input holding a run of 19 or
+    more digits goes straight to stdlib json: orjson decodes integers
+    beyond 64 bits as floats instead of rejecting them.
+  - dumps() always encodes with stdlib json. The fast encoders differ in
+    float formatting and non-ASCII escaping, and the kit's writers emit
+    small telemetry rows where the encoder is not the bottleneck.
+
+Usage:
+  import openclaw_json
+  entry = openclaw_json.loads(line)
+  print(openclaw_json.BACKEND)
+"""
+from __future__ import annotations
+import json
+import os
+
+BACKENDS = ("orjson", "msgspec", "json")
+
+# Digits map to "0" and everything else (below U+0100) to " ", so a long
+# digit run is one substring search; the cost is one translate per line.
+_DIGITS = bytes(48 if 48 <= i <= 57 else 32 for i in range(256))
+_DIGITS_STR = _DIGITS.decode("latin-1")
+_LONG_INT = b"0" * 19           # anything from -2**63 to 2**64 - 1 is shorter
+_LONG_INT_STR = _LONG_INT.decode("ascii")
+
+
+def _has_long_int(data) -> bool:
+    if isinstance(data, str):
+        return _LONG_INT_STR in data.translate(_DIGITS_STR)
+    return _LONG_INT in data.translate(_DIGITS)
+
+
+def _select(requested: str):
+    order = BACKENDS if requested in ("", "auto") else (requested, "json")
+    for name in order:
+        if name == "orjson":
+            try:
+                import orjson
+            except ImportError:
+                continue
+
+            def fast_loads(data, _loads=orjson.loads, _err=orjson.JSONDecodeError):
+                if _has_long_int(data):
+                    return json.loads(data)
+                try:
+                    return _loads(data)
+                except _err:
+                    return json.loads(data)
+
+            return name, fast_loads
+        if name == "msgspec":
+            try:
+                import msgspec
+            except ImportError:
+                continue
+
+            def fast_loads(data, _loads=msgspec.json.decode, _err=msgspec.DecodeError):
+                if _has_long_int(data):
+                    return json.loads(data)
+                try:
+                    return _loads(data)
+                except _err:
+                    return json.loads(data)
+
+            return name, fast_loads
+        if name == "json":
+            return name, json.loads
+    return "json", json.loads
+
+
+BACKEND, loads = _select(os.environ.get("OPENCLAW_JSON_BACKEND", "auto").strip().lower())
+
+
+def dumps(obj, compact: bool = False) -> str:
+    """Encode obj with stdlib json (compact=True drops whitespace after separators)."""
+    if compact:
+        return json.dumps(obj, separators=(",", ":"))
+    return json.dumps(obj)
@@ -5,53 +5,74 @@ openclaw_lint_decisions.py (v3.1)
 Advisory linter for decision records.
 - Detects DECISION blocks missing required fields
 - Flags multiple ACTIVE decisions with the same "Decision:" line (simple collision heuristic)
-Non-blocking: returns non-zero on issues, but does not modify files.
+Non-blocking: returns non-zero on issues, but never modifies the files it lints.
+--cache keeps parsed decisions in $XDG_CACHE_HOME/openclaw/lint-decisions.json
+(default ~/.cache) so unchanged files are not re-parsed; nothing is written
+without it. --profile prints per-phase timings to stderr and, with telemetry
+on, logs them to <workspace>/telemetry/metrics.jsonl (--workspace, default:
+the directory holding the first linted file).
 """
 from __future__ import annotations
-import re
+import argparse
+import os
 import sys
 from pathlib import Path
 
-REQ_FIELDS = ["Decision:", "Approved by:", "Date:", "Status:"]
+import openclaw_decisions
+import openclaw_profile
 
-DECISION_BLOCK_RE = re.compile(r"\[DECISION\](.*?)(?=\n\[|\Z)", re.DOTALL)
+PROFILE = openclaw_profile.Profiler("lint_decisions")
 
-def scan_text(text: str):
-    blocks = []
-    for m in DECISION_BLOCK_RE.finditer(text):
-        blk = m.group(0)
-        blocks.append(blk)
-    return blocks
+def default_cache_path() -> str:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "openclaw", "lint-decisions.json")
 
-def extract_field(block: str, prefix: str):
-    for line in block.splitlines():
-        if line.strip().startswith(prefix):
-            return line.split(prefix,1)[1].strip()
-    return None
+def default_workspace(paths) -> Path:
+    """Workspace of the linted files: the first one's directory, or its parent for memory/*.md."""
+    for p in paths:
+        if p.exists():
+            parent = p.resolve().parent
+            return parent.parent if parent.name == "memory" else parent
+    return Path(".")
 
 def main():
+    parser = argparse.ArgumentParser(description="Advisory linter for decision records.")
     # Default: lint MEMORY.md and GLOBAL-STATE.yaml if present in cwd.
-    paths = [Path("MEMORY.md"), Path("GLOBAL-STATE.yaml")]
-    # allow args
-    if len(sys.argv) > 1:
-        paths = [Path(a) for a in sys.argv[1:]]
+    parser.add_argument("paths", nargs="*", default=["MEMORY.md", "GLOBAL-STATE.yaml"],
+                        help="Files to lint (default: MEMORY.md GLOBAL-STATE.yaml)")
+    parser.add_argument("--cache", dest="cache", action="store_true", default=False,
+                        help="Cache parsed decisions in $XDG_CACHE_HOME/openclaw/lint-decisions.json")
+    parser.add_argument("--no-cache", dest="cache", action="store_false",
+                        help="Do not read or write the cache (default)")
+    parser.add_argument("--profile", action="store_true",
+                        help="Print per-phase timings to stderr")
+    parser.add_argument("--workspace",
+                        help="Workspace for --profile telemetry (default: directory of the first linted file)")
+    args = parser.parse_intermixed_args()
+    PROFILE.enabled = args.profile
+    paths = [Path(a) for a in args.paths]
+    cache = openclaw_decisions.DecisionCache(default_cache_path()) if args.cache else None
     issues = 0
     active_decisions = []
     for p in paths:
         if not p.exists():
             continue
-        text = p.read_text(encoding="utf-8", errors="ignore")
-        blocks = scan_text(text)
-        for b in blocks:
-            missing = [f for f in REQ_FIELDS if f not in b]
-            if missing:
+        with PROFILE.phase("parse"):
+            if cache is not None:
+                decisions = cache.parse_file(p, str(p))
+            else:
+                decisions = openclaw_decisions.parse_file(p, str(p))
+            PROFILE.add("parse", nbytes=p.stat().st_size, items=len(decisions))
+        PROFILE.start("check")
+        for d in decisions:
+            if d.missing:
                 issues += 1
-                print(f"[WARN] {p}: DECISION block missing fields: {', '.join(missing)}")
-            status = extract_field(b, "Status:")
-            decision = extract_field(b, "Decision:")
-            if status and status.upper() == "ACTIVE" and decision:
-                active_decisions.append((decision, p))
+                print(f"[WARN] {p}: DECISION block missing fields: {', '.join(d.missing)}")
+            if d.status == "ACTIVE" and d.decision:
+                active_decisions.append((d.decision, p))
+        PROFILE.stop(items=len(decisions))
     # collision heuristic: same decision string repeated ACTIVE
+    PROFILE.start("collisions")
     seen = {}
     for d, p in active_decisions:
         if d in seen:
@@ -59,11 +80,18 @@ def main():
             print(f"[WARN] ACTIVE decision appears multiple times: '{d}' in {seen[d]} and {p}")
         else:
             seen[d] = p
+    PROFILE.stop(items=len(active_decisions))
+    if cache is not None:
+        cache.save()
     if issues:
         print(f"\nLint complete: {issues} issue(s) found.")
-        return 2
-    print("Lint complete: no issues found.")
-    return 0
+    else:
+        print("Lint complete: no issues found.")
+    if PROFILE.enabled:
+        print(PROFILE.format(), file=sys.stderr)
+        workspace = Path(args.workspace).expanduser() if args.workspace else default_workspace(paths)
+        openclaw_profile.log_event(str(workspace), PROFILE)
+    return 2 if issues else 0
 
 if __name__ == "__main__":
     raise SystemExit(main())
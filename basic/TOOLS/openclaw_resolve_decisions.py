@@ -7,128 +7,149 @@ Decision collision resolver with GLOBAL-STATE.yaml as canonical authority.
 Features:
 - Scans GLOBAL-STATE.yaml for [DECISION] blocks
 - Optionally scans MEMORY.md and memory/*.md as advisory sources
+  (--include_memory; files parsed in parallel with --jobs) and
+  cross-checks them against GLOBAL-STATE: memory decisions that
+  contradict, duplicate, or were never promoted to canonical state
 - Detects:
   - duplicate ACTIVE decisions (exact normalized match)
-  - near-duplicate ACTIVE decisions (token Jaccard similarity)
+  - near-duplicate ACTIVE decisions (token Jaccard similarity; candidate
+    pairs come from a prefix-filtered inverted token index, not all pairs)
   - missing required fields
   - missing Superseded-by pointer on SUPERSEDED
 - Writes:
   - RESOLUTION-DRAFT.yaml (machine readable)
   - RESOLUTION-DRAFT.md  (human readable)
   - RESOLUTION-PATCH.diff (optional, for GLOBAL-STATE.yaml only)
+- Fleet mode (scan --fleet, multi-agent overlay):
+  - Scans GLOBAL-STATE.yaml, shared/decisions/*.yaml and every
+    agents/<id>/MEMORY.md and memory/*.md in one indexed pass
+  - Reports ACTIVE decisions duplicated or near-duplicated across owners,
+    and shared/MANIFEST.yaml cross_agent_decisions entries whose file is
+    missing or disagrees on status
+  - Writes FLEET-DRAFT.yaml and FLEET-DRAFT.md (proposals only)
 - Apply mode:
   - Applies SAFE changes automatically: exact duplicate ACTIVE -> keep newest ACTIVE, supersede older
   - Applies gated changes only with --approve "APPROVE STRUCTURAL CHANGE: DECISION-RESOLVE"
 
 This tool never edits memory files. It edits GLOBAL-STATE.yaml only.
+
+Parsed decisions and near-duplicate pairs are cached in
+<workspace>/.cache/decisions.json: unchanged files cost one stat, and
+only decisions whose tokens changed are probed for near duplicates
+(--no-cache bypasses the cache).
+
+--profile prints per-phase wall/CPU time, bytes read and items processed
+to stderr (and logs a tool_profile telemetry event when telemetry is on).
 """
 from __future__ import annotations
 import argparse
 import datetime
-import hashlib
 import json
+import math
 import os
 import re
+import stat
 import sys
-from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple
+from typing import AbstractSet, FrozenSet, List, Dict, Tuple
 
-DECISION_RE = re.compile(r"\[DECISION\](.*?)(?=\n\[|\Z)", re.DOTALL)
+import openclaw_decisions
+import openclaw_profile
 
-REQ_FIELDS = ["Decision:", "Approved by:", "Date:", "Status:"]
-STATUS_OK = {"ACTIVE", "SUPERSEDED"}
+PROFILE = openclaw_profile.Profiler("resolve_decisions")
 
-STOPWORDS = {
-    "the","a","an","to","of","and","or","for","in","on","at","with","we","our","is","are","be","this","that","it","as"
-}
+DEFAULT_JOBS = os.cpu_count() or 1
+POOL_MIN_FILES = 16     # below this, parsing in-process beats starting workers
 
-def norm_text(s: str) -> str:
-    s = s.lower()
-    s = re.sub(r"[^a-z0-9\s]+", " ", s)
-    s = re.sub(r"\s+", " ", s).strip()
-    return s
+Decision = openclaw_decisions.Decision
+norm_text = openclaw_decisions.norm_text
 
-def tokens(s: str) -> List[str]:
-    t = [w for w in norm_text(s).split(" ") if w and w not in STOPWORDS]
-    return t
-
-def jaccard(a: List[str], b: List[str]) -> float:
-    sa, sb = set(a), set(b)
+def jaccard_sets(sa: AbstractSet[str], sb: AbstractSet[str]) -> float:
     if not sa and not sb:
         return 0.0
     return len(sa & sb) / len(sa | sb)
 
-def sha10(s: str) -> str:
-    return hashlib.sha1(s.encode("utf-8")).hexdigest()[:10]
-
-def extract_field(block: str, prefix: str) -> Optional[str]:
-    for line in block.splitlines():
-        line_s = line.strip()
-        if line_s.startswith(prefix):
-            return line_s.split(prefix, 1)[1].strip()
-    return None
-
-def extract_multifield(block: str) -> Dict[str, str]:
-    out = {}
-    for p in ["Decision:", "Approved by:", "Date:", "Status:", "Domain:", "Superseded by:"]:
-        v = extract_field(block, p)
-        if v:
-            out[p[:-1]] = v
-    return out
-
-@dataclass
-class Decision:
-    source: str
-    block: str
-    decision: str
-    approved_by: Optional[str]
-    date: Optional[str]
-    status: str
-    domain: str
-    superseded_by: Optional[str]
-    key: str
-    key_norm: str
-    line_start: int
-    line_end: int
-
-def parse_decisions(text: str, source: str) -> List[Decision]:
-    decisions = []
-    # compute line positions by counting newlines up to match start/end
-    for m in DECISION_RE.finditer(text):
-        blk = "[DECISION]" + m.group(1)
-        # approximate line numbers in source text
-        start_idx = m.start()
-        end_idx = m.end()
-        line_start = text.count("\n", 0, start_idx) + 1
-        line_end = text.count("\n", 0, end_idx) + 1
-
-        decision = extract_field(blk, "Decision:") or ""
-        approved = extract_field(blk, "Approved by:")
-        date = extract_field(blk, "Date:")
-        status = (extract_field(blk, "Status:") or "").upper()
-        domain = (extract_field(blk, "Domain:") or "unknown").strip().lower()
-        superseded_by = extract_field(blk, "Superseded by:")
-        key_norm = " ".join(tokens(decision))
-        key = sha10(key_norm) if key_norm else sha10(norm_text(decision))
-        decisions.append(Decision(
-            source=source,
-            block=blk,
-            decision=decision,
-            approved_by=approved,
-            date=date,
-            status=status,
-            domain=domain,
-            superseded_by=superseded_by,
-            key=key,
-            key_norm=key_norm,
-            line_start=line_start,
-            line_end=line_end,
-        ))
+def parse_file(p: Path, source: str, cache=None) -> List[Decision]:
+    if cache is not None:
+        with PROFILE.phase("cache"):
+            key = cache.stat_key(p)
+            decisions = cache.get(p, key, source)
+            PROFILE.add("cache", items=int(decisions is not None))
+        if decisions is not None:
+            return decisions
+    # One streaming pass: reading and block scanning are a single phase
+    with PROFILE.phase("parse"):
+        if cache is None:
+            decisions = openclaw_decisions.parse_file(p, source)
+        else:
+            decisions, sha1 = openclaw_decisions.parse_file_hashed(p, source)
+            cache.put(p, key, sha1, decisions)
+        PROFILE.add("parse", nbytes=p.stat().st_size, items=len(decisions))
     return decisions
 
-def load_text(p: Path) -> str:
-    return p.read_text(encoding="utf-8", errors="ignore")
+def load_bytes(p: Path) -> bytes:
+    with PROFILE.phase("read"):
+        data = p.read_bytes()
+        PROFILE.add("read", nbytes=len(data), items=1)
+    return data
+
+def parse_files(paths: List[Path], sources: List[str], jobs: int = DEFAULT_JOBS, cache=None) -> List[List[Decision]]:
+    """
+    Decisions of each file, in order. Files the cache cannot serve are
+    parsed in a process pool when there are enough of them; Decisions
+    pickle by slots, so workers return them whole.
+    """
+    parsed: List[List[Decision]] = [None] * len(paths)
+    keys = [None] * len(paths)
+    if cache is not None:
+        with PROFILE.phase("cache"):
+            for k, p in enumerate(paths):
+                keys[k] = cache.stat_key(p)
+                parsed[k] = cache.get(p, keys[k], sources[k])
+            PROFILE.add("cache", items=sum(1 for r in parsed if r is not None))
+    todo = [k for k, r in enumerate(parsed) if r is None]
+
+    with PROFILE.phase("parse"):
+        todo_paths = [paths[k] for k in todo]
+        todo_sources = [sources[k] for k in todo]
+        if jobs <= 1 or len(todo) < POOL_MIN_FILES:
+            results = list(map(openclaw_decisions.parse_file_hashed, todo_paths, todo_sources))
+        else:
+            workers = min(jobs, len(todo))
+            chunksize = max(1, len(todo) // (workers * 4))
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(openclaw_decisions.parse_file_hashed, todo_paths, todo_sources,
+                                        chunksize=chunksize))
+        for k, (file_decisions, sha1) in zip(todo, results):
+            parsed[k] = file_decisions
+            if cache is not None:
+                cache.put(paths[k], keys[k], sha1, file_decisions)
+        if PROFILE.enabled:
+            PROFILE.add("parse", nbytes=sum(p.stat().st_size for p in todo_paths),
+                        items=sum(len(parsed[k]) for k in todo))
+    return parsed
+
+def parse_memory(kit_dir: Path, jobs: int = DEFAULT_JOBS, cache=None) -> Tuple[List[Decision], int]:
+    """
+    Decisions in MEMORY.md and memory/*.md, in that order, and the number of
+    files read.
+    """
+    paths, sources = [], []
+    mem_path = kit_dir / "MEMORY.md"
+    if mem_path.exists():
+        paths.append(mem_path)
+        sources.append("MEMORY.md")
+    mem_dir = kit_dir / "memory"
+    if mem_dir.is_dir():
+        with PROFILE.phase("discovery"):
+            mem_files = sorted(mem_dir.glob("*.md"))
+            PROFILE.add("discovery", items=len(mem_files))
+        paths.extend(mem_files)
+        sources.extend(f"memory/{p.name}" for p in mem_files)
+
+    decisions = [d for file_decisions in parse_files(paths, sources, jobs, cache) for d in file_decisions]
+    return decisions, len(paths)
 
 def ensure_workspace(ws: Path):
     ws.mkdir(parents=True, exist_ok=True)
@@ -170,31 +191,147 @@ def write_yaml(ws: Path, obj: dict, name: str):
 def write_md(ws: Path, txt: str, name: str):
     (ws / name).write_text(txt, encoding="utf-8")
 
-def build_patch(global_state_path: Path, replacements: List[Tuple[Decision, str]]) -> str:
+def block_spans(data: bytes, replacements: List[Tuple[Decision, str]]) -> List[Tuple[Decision, bytes]]:
     """
-    Build a unified diff patch for GLOBAL-STATE.yaml where each replacement is
-    (original decision, new block text).
+    (decision, new block bytes) for each replacement whose parse-time byte
+    span in data still holds its block, in file order. Blocks that moved or
+    changed since parsing are skipped. New blocks keep the file's CRLF line
+    endings if the original block had them.
     """
-    import difflib
-    original = load_text(global_state_path).splitlines(keepends=False)
-    modified = original[:]
-
-    # Apply replacements from bottom to top to keep line ranges stable
-    for dec, new_block in sorted(replacements, key=lambda x: x[0].line_start, reverse=True):
-        # replace the exact block lines (approx); safer: locate block text
-        # We will search for the block string in the file and replace first occurrence.
-        file_text = "\n".join(modified)
-        idx = file_text.find(dec.block)
-        if idx == -1:
-            # fallback: skip
+    spans = []
+    end = 0
+    for dec, new_block in sorted(replacements, key=lambda x: x[0].byte_start):
+        raw = data[dec.byte_start:dec.byte_end]
+        if dec.byte_start < end or openclaw_decisions.block_text(raw) != dec.block:
             continue
-        before = file_text[:idx]
-        after = file_text[idx+len(dec.block):]
-        file_text2 = before + new_block + after
-        modified = file_text2.splitlines(keepends=False)
+        if b"\r\n" in raw:
+            new_block = new_block.replace("\n", "\r\n")
+        spans.append((dec, new_block.encode("utf-8")))
+        end = dec.byte_end
+    return spans
 
-    diff = difflib.unified_diff(original, modified, fromfile=str(global_state_path), tofile=str(global_state_path), lineterm="")
-    return "\n".join(diff) + "\n"
+def rewrite(data: bytes, spans: List[Tuple[Decision, bytes]]) -> bytes:
+    """data with each span's block replaced, built in one pass."""
+    parts = []
+    pos = 0
+    for dec, new in spans:
+        parts.append(data[pos:dec.byte_start])
+        parts.append(new)
+        pos = dec.byte_end
+    parts.append(data[pos:])
+    return b"".join(parts)
+
+def _split_lines(text: str) -> List[str]:
+    # Lines as the block scanner numbers them: split on "\n" only
+    lines = text.split("\n")
+    if lines[-1] == "":
+        lines.pop()
+    return lines
+
+def _format_range(start: int, stop: int) -> str:
+    # unified diff range: 1-based start, length (omitted when 1)
+    length = stop - start
+    if length == 1:
+        return f"{start + 1}"
+    return f"{start if not length else start + 1},{length}"
+
+def build_patch(global_state_path: Path, data: bytes, spans: List[Tuple[Decision, bytes]], context: int = 3) -> str:
+    """
+    Unified diff for GLOBAL-STATE.yaml from the replacement spans. Only the
+    lines each block covers are compared (SequenceMatcher per block); the
+    rest of the file is known to be unchanged, so it is never diffed.
+    """
+    import difflib
+    # Lines keep any "\r", so the patch applies to CRLF files as they are
+    original = _split_lines(data.decode("utf-8", "ignore"))
+    modified = []
+    opcodes = []                  # over (original, modified), in order
+
+    def add(tag, i1, i2, j1, j2):
+        # Adjacent unchanged runs merge, so hunks split where difflib's would
+        if opcodes and tag == "equal" and opcodes[-1][0] == "equal":
+            _, i1, _, j1, _ = opcodes.pop()
+        opcodes.append((tag, i1, i2, j1, j2))
+
+    i = 0
+    for dec, new in spans:
+        # The whole lines the block covers, before and after
+        begin = data.rfind(b"\n", 0, dec.byte_start) + 1
+        end = data.find(b"\n", dec.byte_end)
+        stop = end if end >= 0 else len(data)
+        old_text = data[begin:stop].decode("utf-8", "ignore")
+        new_text = (data[begin:dec.byte_start] + new + data[dec.byte_end:stop]).decode("utf-8", "ignore")
+        if end < 0:
+            # Only at the end of the file is there no line after a final newline
+            old_lines, new_lines = _split_lines(old_text), _split_lines(new_text)
+        else:
+            old_lines, new_lines = old_text.split("\n"), new_text.split("\n")
+        first = dec.line_start - 1
+        modified.extend(original[i:first])
+        j = len(modified)
+        if first > i:
+            add("equal", i, first, j - (first - i), j)
+        for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, old_lines, new_lines).get_opcodes():
+            add(tag, first + i1, first + i2, j + j1, j + j2)
+        modified.extend(new_lines)
+        i = first + len(old_lines)
+    if i < len(original):
+        add("equal", i, len(original), len(modified), len(modified) + len(original) - i)
+        modified.extend(original[i:])
+
+    out = []
+    for group in _grouped_opcodes(opcodes, context):
+        if not out:
+            out += [f"--- {global_state_path}", f"+++ {global_state_path}"]
+        out.append(f"@@ -{_format_range(group[0][1], group[-1][2])} +{_format_range(group[0][3], group[-1][4])} @@")
+        for tag, i1, i2, j1, j2 in group:
+            if tag == "equal":
+                out.extend(" " + ln for ln in original[i1:i2])
+                continue
+            out.extend("-" + ln for ln in original[i1:i2])
+            out.extend("+" + ln for ln in modified[j1:j2])
+    return "\n".join(out) + "\n"
+
+def _grouped_opcodes(codes, n):
+    """difflib.SequenceMatcher.get_grouped_opcodes over a precomputed opcode list."""
+    if not any(tag != "equal" for tag, *_ in codes):
+        return
+    codes = list(codes)
+    if codes[0][0] == "equal":
+        tag, i1, i2, j1, j2 = codes[0]
+        codes[0] = tag, max(i1, i2 - n), i2, max(j1, j2 - n), j2
+    if codes[-1][0] == "equal":
+        tag, i1, i2, j1, j2 = codes[-1]
+        codes[-1] = tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n)
+    group = []
+    for tag, i1, i2, j1, j2 in codes:
+        # A long unchanged stretch closes the current hunk
+        if tag == "equal" and i2 - i1 > 2 * n:
+            group.append((tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n)))
+            yield group
+            group = []
+            i1, j1 = max(i1, i2 - n), max(j1, j2 - n)
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == "equal"):
+        yield group
+
+def write_atomic(path: Path, data: bytes):
+    """Replace path with data via a temp file and rename, keeping its permissions."""
+    path = Path(os.path.realpath(path))     # rename over a symlink's target, not the link
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, stat.S_IMODE(os.stat(path).st_mode))
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
 
 def safe_duplicate_resolution(active: List[Decision]) -> Tuple[List[Dict], List[Tuple[Decision, str]]]:
     """
@@ -212,20 +349,15 @@ def safe_duplicate_resolution(active: List[Decision]) -> Tuple[List[Dict], List[
     for gk, ds in groups.items():
         if len(ds) < 2:
             continue
-        # select winner
-        def date_key(d: Decision):
-            try:
-                return d.date or ""
-            except Exception:
-                return ""
-        # sort by date then line_start
-        ds_sorted = sorted(ds, key=lambda d: (date_key(d), d.line_start))
+        # select winner: sort by parsed date (undated first) then line_start
+        ds_sorted = sorted(ds, key=lambda d: (d.day or datetime.date.min, d.line_start))
         winner = ds_sorted[-1]
         losers = [d for d in ds_sorted if d is not winner]
 
         for lo in losers:
             # create superseded block by modifying Status and adding Superseded by
-            lines = lo.block.splitlines()
+            body = lo.block.rstrip("\n")
+            lines = body.splitlines()
             out_lines = []
             saw_status = False
             saw_sup = False
@@ -242,7 +374,8 @@ def safe_duplicate_resolution(active: List[Decision]) -> Tuple[List[Dict], List[
                 out_lines.append("Status: SUPERSEDED")
             if not saw_sup:
                 out_lines.append(f"Superseded by: {winner.key}")
-            new_block = "\n".join(out_lines)
+            # keep the newline(s) that separate the block from what follows
+            new_block = "\n".join(out_lines) + lo.block[len(body):]
             replacements.append((lo, new_block))
             actions.append({
                 "type": "auto_supersede_duplicate_active",
@@ -252,18 +385,187 @@ def safe_duplicate_resolution(active: List[Decision]) -> Tuple[List[Dict], List[
             })
     return actions, replacements
 
-def detect_collisions(global_decisions: List[Decision], similarity_threshold: float = 0.65) -> Dict:
+def _min_overlap(size: int, threshold: float) -> int:
+    # Fewest shared tokens a set of this size needs to reach the threshold
+    # against any other set (rounded down a hair so float error never
+    # shortens a prefix).
+    return math.ceil(threshold * size - 1e-9)
+
+def _prefix(ranked: List[str], threshold: float) -> List[str]:
+    # The rarest |x| - ceil(t*|x|) + 1 tokens of a set, ranked rarest first
+    return ranked[:max(0, len(ranked) - _min_overlap(len(ranked), threshold) + 1)]
+
+def _within_size(a: int, b: int, threshold: float) -> bool:
+    # Size filter: |small| >= t * |large| is necessary for Jaccard >= t
+    return min(a, b) >= _min_overlap(max(a, b), threshold)
+
+def similar_pairs(sets: List[AbstractSet[str]], threshold: float) -> Tuple[List[Tuple[int, int, float]], int]:
+    """
+    All (i, j, jaccard) with i < j and jaccard >= threshold, in (i, j) order,
+    plus the number of pairs scored exactly.
+
+    Prefix filtering over an inverted token index: tokens are ranked rarest
+    first, and each set is indexed under its first |x| - ceil(t*|x|) + 1
+    tokens. Two sets reaching Jaccard t share at least ceil(t*max(|x|, |y|))
+    tokens, so their prefixes must intersect; only pairs that meet in the
+    index (and pass the size filter) are scored. Results match comparing
+    every pair.
+    """
+    if threshold <= 0:
+        # Every pair qualifies, including ones with nothing in common
+        pairs = [(i, j, jaccard_sets(sets[i], sets[j]))
+                 for i in range(len(sets)) for j in range(i + 1, len(sets))]
+        return pairs, len(pairs)
+
+    freq: Dict[str, int] = {}
+    for s in sets:
+        for w in s:
+            freq[w] = freq.get(w, 0) + 1
+    index: Dict[str, List[int]] = {}
+    pairs = []
+    scored = 0
+    for j, sj in enumerate(sets):
+        if not sj:
+            continue
+        seen = set()
+        for w in _prefix(sorted(sj, key=lambda w: (freq[w], w)), threshold):
+            for i in index.get(w, ()):
+                if i in seen:
+                    continue
+                seen.add(i)
+                si = sets[i]
+                if not _within_size(len(si), len(sj), threshold):
+                    continue
+                scored += 1
+                sim = jaccard_sets(si, sj)
+                if sim >= threshold:
+                    pairs.append((i, j, sim))
+            index.setdefault(w, []).append(j)
+    pairs.sort()
+    return pairs, scored
+
+class TokenIndex:
+    """
+    Prefix-filtered inverted index over a fixed list of token sets (the
+    GLOBAL-STATE decisions), probed with sets from elsewhere. Uses the same
+    filters as similar_pairs, so matches() is exact: every indexed set with
+    Jaccard >= threshold against the probe, and no others.
+    """
+
+    def __init__(self, sets: List[AbstractSet[str]], threshold: float):
+        self.sets = sets
+        self.threshold = threshold
+        self.scored = 0
+        self.freq: Dict[str, int] = {}
+        for s in sets:
+            for w in s:
+                self.freq[w] = self.freq.get(w, 0) + 1
+        self.postings: Dict[str, List[int]] = {}
+        if threshold > 0:
+            for i, s in enumerate(sets):
+                for w in self._prefix(s):
+                    self.postings.setdefault(w, []).append(i)
+
+    def _prefix(self, s: AbstractSet[str]) -> List[str]:
+        # Tokens the index has never seen rank rarest; the order only has to be shared
+        return _prefix(sorted(s, key=lambda w: (self.freq.get(w, 0), w)), self.threshold)
+
+    def matches(self, s: AbstractSet[str]) -> List[Tuple[int, float]]:
+        """(position, jaccard) of each indexed set similar to s, by position."""
+        if self.threshold <= 0:
+            self.scored += len(self.sets)
+            return [(i, jaccard_sets(t, s)) for i, t in enumerate(self.sets)]
+        out = []
+        seen = set()
+        for w in self._prefix(s):
+            for i in self.postings.get(w, ()):
+                if i in seen:
+                    continue
+                seen.add(i)
+                t = self.sets[i]
+                if not _within_size(len(t), len(s), self.threshold):
+                    continue
+                self.scored += 1
+                sim = jaccard_sets(t, s)
+                if sim >= self.threshold:
+                    out.append((i, sim))
+        out.sort()
+        return out
+
+def distinct_similar_pairs(distinct: List[FrozenSet[str]], threshold: float, cache=None,
+                           name: str = "near_duplicates") -> Tuple[List[Tuple[int, int, float]], int]:
+    """
+    similar_pairs() over distinct token sets, reusing the pairs found by
+    earlier runs.
+
+    The cache's `name` entry holds the distinct token sets seen last time
+    and the similar pairs among them. Jaccard depends only on the two sets,
+    so those pairs still hold for sets that are still present; only sets
+    that are new since then are probed, against a TokenIndex over all
+    current sets.
+    """
+    if cache is None or threshold <= 0:
+        return similar_pairs(distinct, threshold)
+    names = [" ".join(sorted(s)) for s in distinct]
+    slot = {n: k for k, n in enumerate(names)}
+
+    found = []
+    fresh = set(range(len(distinct)))
+    prev = cache.extra.get(name)
+    if isinstance(prev, dict) and prev.get("threshold") == threshold:
+        old = prev["sets"]
+        fresh -= {slot[n] for n in old if n in slot}
+        for a, b, sim in prev["pairs"]:
+            ka, kb = slot.get(old[a]), slot.get(old[b])
+            if ka is not None and kb is not None:
+                found.append((min(ka, kb), max(ka, kb), sim))
+    scored = 0
+    if len(fresh) == len(distinct):
+        # Nothing reusable: a self-join scores each candidate pair once
+        found, scored = similar_pairs(distinct, threshold)
+    elif fresh:
+        index = TokenIndex(distinct, threshold)
+        for k in sorted(fresh):
+            for k2, sim in index.matches(distinct[k]):
+                # A pair of two fresh sets is found from both ends; keep one
+                if k2 != k and not (k2 in fresh and k2 < k):
+                    found.append((min(k, k2), max(k, k2), sim))
+        scored = index.scored
+        found.sort()
+    if fresh or prev is None or len(prev["sets"]) != len(names):
+        cache.set_extra(name, {"threshold": threshold, "sets": names, "pairs": [list(p) for p in found]})
+    return found, scored
+
+def cached_similar_pairs(sets: List[FrozenSet[str]], threshold: float, cache=None) -> Tuple[List[Tuple[int, int, float]], int]:
+    """similar_pairs(sets, threshold) via distinct_similar_pairs; identical sets pair with similarity 1.0."""
+    if cache is None or threshold <= 0:
+        return similar_pairs(sets, threshold)
+    positions: Dict[FrozenSet[str], List[int]] = {}
+    for i, s in enumerate(sets):
+        positions.setdefault(s, []).append(i)
+    distinct = list(positions)
+    found, scored = distinct_similar_pairs(distinct, threshold, cache)
+
+    pairs = []
+    for ka, kb, sim in found:
+        for i in positions[distinct[ka]]:
+            for j in positions[distinct[kb]]:
+                pairs.append((min(i, j), max(i, j), sim))
+    for s, ps in positions.items():
+        if s and len(ps) > 1 and threshold <= 1.0:
+            pairs.extend((i, j, 1.0) for x, i in enumerate(ps) for j in ps[x + 1:])
+    pairs.sort()
+    return pairs, scored
+
+def detect_collisions(global_decisions: List[Decision], similarity_threshold: float = 0.65, cache=None) -> Dict:
     issues = []
     actions = []
     gated = []
 
     # field validation for GLOBAL-STATE decisions
     for d in global_decisions:
-        missing = []
-        for f in REQ_FIELDS:
-            if f not in d.block:
-                missing.append(f)
-        if d.status and d.status not in STATUS_OK:
+        missing = list(d.missing)
+        if d.status and d.status not in openclaw_decisions.STATUS_OK:
             missing.append("Status: (must be ACTIVE or SUPERSEDED)")
         if missing:
             issues.append({"type":"missing_fields","key":d.key,"domain":d.domain,"missing":missing,"lines":[d.line_start,d.line_end]})
@@ -274,26 +576,338 @@ def detect_collisions(global_decisions: List[Decision], similarity_threshold: fl
     # Safe duplicate resolution actions and replacements generated separately in apply
     # Near duplicates and competing domain actives are gated proposals
     # Build similarity comparisons within same domain first, then across unknown domain.
-    for i in range(len(active)):
-        for j in range(i+1, len(active)):
-            a, b = active[i], active[j]
-            if a.key == b.key:
-                continue
-            # only compare if same domain or either unknown
-            if a.domain != b.domain and a.domain != "unknown" and b.domain != "unknown":
-                continue
-            sim = jaccard(tokens(a.decision), tokens(b.decision))
-            if sim >= similarity_threshold:
-                gated.append({
-                    "type":"near_duplicate_active",
-                    "a_key": a.key,
-                    "b_key": b.key,
-                    "domain": a.domain if a.domain != "unknown" else b.domain,
-                    "similarity": round(sim, 2),
-                    "recommendation": "Merge into one canonical ACTIVE decision and SUPERSEDE the other(s). Requires owner approval.",
-                })
+    PROFILE.start("similarity")
+    pairs, scored = cached_similar_pairs([d.tokens for d in active], similarity_threshold, cache)
+    for i, j, sim in pairs:
+        a, b = active[i], active[j]
+        if a.key == b.key:
+            continue
+        # only compare if same domain or either unknown
+        if a.domain != b.domain and a.domain != "unknown" and b.domain != "unknown":
+            continue
+        gated.append({
+            "type":"near_duplicate_active",
+            "a_key": a.key,
+            "b_key": b.key,
+            "domain": a.domain if a.domain != "unknown" else b.domain,
+            "similarity": round(sim, 2),
+            "recommendation": "Merge into one canonical ACTIVE decision and SUPERSEDE the other(s). Requires owner approval.",
+        })
+    PROFILE.stop(items=scored)
     return {"issues": issues, "gated": gated}
 
+def cross_check_memory(memory_decisions: List[Decision], global_decisions: List[Decision],
+                       similarity_threshold: float = 0.65) -> List[Dict]:
+    """
+    Advisory findings for memory decisions, checked against GLOBAL-STATE:
+      memory_duplicate    same decision (normalized key) and status as a canonical one
+      memory_contradicts  same decision, or a near match, with another status
+      memory_near_duplicate
+                          a near match (Jaccard >= threshold, compatible domain)
+                          worded differently, with the same status
+      memory_unpromoted   ACTIVE or status-less, with no canonical counterpart
+    A decision repeated across memory files is checked once, with the status
+    of its last occurrence, and reported with all its sources. Near matches
+    come from a TokenIndex over GLOBAL-STATE, so the cost follows the number
+    of decisions, not memory x canonical pairs.
+    """
+    PROFILE.start("crosscheck")
+    groups: Dict[str, List[Decision]] = {}
+    for d in memory_decisions:
+        if d.decision:
+            groups.setdefault(d.key, []).append(d)
+
+    by_key: Dict[str, Decision] = {}
+    for g in global_decisions:
+        # Prefer the ACTIVE one when GLOBAL-STATE itself repeats a decision
+        if g.key not in by_key or (g.status == "ACTIVE" and by_key[g.key].status != "ACTIVE"):
+            by_key[g.key] = g
+    index = TokenIndex([g.tokens for g in global_decisions], similarity_threshold)
+
+    advisory = []
+    for key, occurrences in groups.items():
+        m = occurrences[-1]
+        entry = {"type": "", "key": key, "domain": m.domain, "status": m.status or "-"}
+        canonical = by_key.get(key)
+        if canonical is not None:
+            if m.status in ("", canonical.status):
+                entry["type"] = "memory_duplicate"
+                entry["recommendation"] = "Already canonical in GLOBAL-STATE.yaml; the memory copy needs no promotion."
+            else:
+                entry["type"] = "memory_contradicts"
+                entry["recommendation"] = "Memory and GLOBAL-STATE.yaml disagree on status; GLOBAL-STATE.yaml is authoritative."
+            entry.update(canonical_key=canonical.key, canonical_status=canonical.status or "-",
+                         canonical_lines=[canonical.line_start, canonical.line_end], similarity=1.0)
+        else:
+            best = None
+            for i, sim in index.matches(m.tokens):
+                g = global_decisions[i]
+                if m.domain != g.domain and "unknown" not in (m.domain, g.domain):
+                    continue
+                if best is None or sim > best[1]:
+                    best = (g, sim)
+            if best is not None:
+                g, sim = best
+                if m.status in ("", g.status):
+                    entry["type"] = "memory_near_duplicate"
+                    entry["recommendation"] = "Memory restates a canonical decision differently; reconcile the wording or promote a superseding decision."
+                else:
+                    entry["type"] = "memory_contradicts"
+                    entry["recommendation"] = "Memory and a similar GLOBAL-STATE.yaml decision disagree on status; GLOBAL-STATE.yaml is authoritative."
+                entry.update(canonical_key=g.key, canonical_status=g.status or "-",
+                             canonical_lines=[g.line_start, g.line_end], similarity=round(sim, 2))
+            elif m.status in ("", "ACTIVE"):
+                entry["type"] = "memory_unpromoted"
+                entry["recommendation"] = "Promote to GLOBAL-STATE.yaml if still in force, or mark it SUPERSEDED in memory."
+            else:
+                continue
+        sources = list(dict.fromkeys(d.source for d in occurrences))
+        entry["sources"] = sources
+        entry["occurrences"] = len(occurrences)
+        advisory.append(entry)
+
+    order = {"memory_contradicts": 0, "memory_unpromoted": 1, "memory_near_duplicate": 2, "memory_duplicate": 3}
+    advisory.sort(key=lambda e: order[e["type"]])
+    PROFILE.stop(items=len(memory_decisions))
+    PROFILE.add("similarity", items=index.scored)
+    return advisory
+
+# ── Fleet mode (multi-agent overlay) ──────────────────────────────────
+
+def _scan_names(d: Path, suffix: str) -> List[str]:
+    """Sorted names of the regular files in d ending with suffix ([] if d is missing)."""
+    try:
+        with os.scandir(d) as it:
+            return sorted(e.name for e in it if e.name.endswith(suffix) and e.is_file())
+    except OSError:
+        return []
+
+def discover_fleet(kit_dir: Path) -> Tuple[List[Path], List[str], List[str]]:
+    """
+    (paths, sources, owners) of every decision file in a multi-agent
+    workspace: GLOBAL-STATE.yaml (owner "global"), shared/decisions/*.yaml
+    ("shared") and each agents/<id>/MEMORY.md and memory/*.md (owner <id>),
+    in that order. Within an owner, files are in name order, so daily logs
+    run oldest first.
+    """
+    paths, sources, owners = [], [], []
+
+    def add(source: str, owner: str):
+        paths.append(kit_dir / source)
+        sources.append(source)
+        owners.append(owner)
+
+    if (kit_dir / "GLOBAL-STATE.yaml").is_file():
+        add("GLOBAL-STATE.yaml", "global")
+    for name in _scan_names(kit_dir / "shared" / "decisions", ".yaml"):
+        add(f"shared/decisions/{name}", "shared")
+    try:
+        with os.scandir(kit_dir / "agents") as it:
+            agents = sorted(e.name for e in it if e.is_dir() and not e.name.startswith("."))
+    except OSError:
+        agents = []
+    for agent in agents:
+        if (kit_dir / "agents" / agent / "MEMORY.md").is_file():
+            add(f"agents/{agent}/MEMORY.md", agent)
+        for name in _scan_names(kit_dir / "agents" / agent / "memory", ".md"):
+            add(f"agents/{agent}/memory/{name}", agent)
+    return paths, sources, owners
+
+def read_manifest_decisions(path: Path) -> List[Dict]:
+    """
+    The cross_agent_decisions entries of shared/MANIFEST.yaml (id, summary,
+    affects, status and line), read line by line; the manifest's layout is
+    fixed by MANIFEST-SCHEMA.md, so no YAML parser is needed.
+    """
+    entries = []
+    try:
+        lines = path.read_text(encoding="utf-8", errors="ignore").splitlines()
+    except OSError:
+        return entries
+    inside = False
+    for n, line in enumerate(lines, 1):
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#"):
+            continue
+        if not line[0].isspace() and not stripped.startswith("-"):
+            inside = stripped.startswith("cross_agent_decisions:")
+            continue
+        if not inside:
+            continue
+        if stripped.startswith("- "):
+            entries.append({"line": n})
+            stripped = stripped[2:].strip()
+        if not entries:
+            continue
+        field, colon, value = stripped.partition(":")
+        if colon:
+            entries[-1][field.strip()] = value.split(" #", 1)[0].strip().strip("\"'")
+    return [e for e in entries if e.get("id")]
+
+def detect_fleet_collisions(decisions: List[Decision], owners: List[str], manifest: List[Dict],
+                            shared_status: Dict[str, str], similarity_threshold: float = 0.65,
+                            cache=None) -> Dict:
+    """
+    ACTIVE collisions between owners (GLOBAL-STATE, shared decisions, each agent):
+      cross_agent_duplicate       the same decision (token set) ACTIVE for two or more owners
+      cross_agent_near_duplicate  decisions with Jaccard >= threshold, ACTIVE for different
+                                  owners in compatible domains
+    plus manifest entries whose shared/decisions file is missing or disagrees
+    on status. A decision an owner records repeatedly (daily logs) counts
+    once, with the status of its last occurrence. The index is built over
+    distinct token sets, so repeats cost nothing in the similarity phase.
+    """
+    PROFILE.start("detect")
+    last: Dict[Tuple[str, str], Decision] = {}
+    for d, owner in zip(decisions, owners):
+        if d.decision:
+            last[(owner, d.key)] = d
+    groups: Dict[FrozenSet[str], List[Tuple[str, Decision]]] = {}
+    for (owner, _), d in last.items():
+        if d.status == "ACTIVE" and d.tokens:
+            groups.setdefault(d.tokens, []).append((owner, d))
+
+    def where(held):
+        return [f"{owner}: {d.source}:{d.line_start}" for owner, d in held]
+
+    collisions = []
+    for held in groups.values():
+        held_by = sorted({owner for owner, _ in held})
+        if len(held_by) > 1:
+            collisions.append({
+                "type": "cross_agent_duplicate",
+                "key": held[0][1].key,
+                "owners": held_by,
+                "similarity": 1.0,
+                "sources": where(held),
+                "recommendation": "Keep one ACTIVE copy (GLOBAL-STATE.yaml or shared/decisions/) and reference it from the others.",
+            })
+    PROFILE.stop(items=len(decisions))
+
+    PROFILE.start("similarity")
+    distinct = list(groups)
+    pairs, scored = distinct_similar_pairs(distinct, similarity_threshold, cache, "fleet_near_duplicates")
+    for ka, kb, sim in pairs:
+        a_held, b_held = groups[distinct[ka]], groups[distinct[kb]]
+        hits = [(x, y) for x in a_held for y in b_held
+                if x[0] != y[0] and (x[1].domain == y[1].domain or "unknown" in (x[1].domain, y[1].domain))]
+        if not hits:
+            continue
+        a_side = list(dict.fromkeys(x for x, _ in hits))
+        b_side = list(dict.fromkeys(y for _, y in hits))
+        domains = [d.domain for _, d in a_side + b_side if d.domain != "unknown"]
+        collisions.append({
+            "type": "cross_agent_near_duplicate",
+            "a_key": a_held[0][1].key,
+            "b_key": b_held[0][1].key,
+            "owners": sorted({owner for owner, _ in a_side + b_side}),
+            "domain": domains[0] if domains else "unknown",
+            "similarity": round(sim, 2),
+            "a_sources": where(a_side),
+            "b_sources": where(b_side),
+            "recommendation": "Merge into one shared ACTIVE decision and SUPERSEDE the others. Requires owner approval.",
+        })
+    PROFILE.stop(items=scored)
+
+    issues = []
+    for e in manifest:
+        status = (e.get("status") or "").upper()
+        if e["id"] not in shared_status:
+            issues.append({"type": "manifest_missing_file", "id": e["id"], "status": status or "-",
+                           "lines": [e["line"], e["line"]]})
+        elif status and status != shared_status[e["id"]]:
+            issues.append({"type": "manifest_status_mismatch", "id": e["id"], "status": status,
+                           "file_status": shared_status[e["id"]] or "-", "lines": [e["line"], e["line"]]})
+    return {"collisions": collisions, "issues": issues, "active": len(set(
+        (owner, d.key) for held in groups.values() for owner, d in held))}
+
+def scan_fleet(args, ws: Path, kit_dir: Path, cache=None) -> int:
+    """scan --fleet: one indexed view of every agent's decisions; writes FLEET-DRAFT.yaml and FLEET-DRAFT.md."""
+    with PROFILE.phase("discovery"):
+        paths, sources, owners = discover_fleet(kit_dir)
+        PROFILE.add("discovery", items=len(paths))
+    if not paths:
+        print(f"[ERROR] No GLOBAL-STATE.yaml, shared/decisions/ or agents/ found under {kit_dir}", file=sys.stderr)
+        return 2
+    parsed = parse_files(paths, sources, args.jobs, cache)
+    decisions = [d for file_decisions in parsed for d in file_decisions]
+    decision_owners = [owner for owner, file_decisions in zip(owners, parsed) for _ in file_decisions]
+
+    # Status of each shared decision file, by XD id (its last decision wins)
+    shared_status = {p.stem: (file_decisions[-1].status if file_decisions else "")
+                     for p, owner, file_decisions in zip(paths, owners, parsed) if owner == "shared"}
+    manifest = read_manifest_decisions(kit_dir / "shared" / "MANIFEST.yaml")
+    found = detect_fleet_collisions(decisions, decision_owners, manifest, shared_status,
+                                    similarity_threshold=args.similarity, cache=cache)
+
+    agents = sorted(set(owners) - {"global", "shared"})
+    out = {
+        "meta": {
+            "generated": datetime.datetime.utcnow().isoformat() + "Z",
+            "kit_dir": str(kit_dir),
+            "similarity_threshold": args.similarity,
+        },
+        "summary": {
+            "agents": len(agents),
+            "files": len(paths),
+            "decisions": len(decisions),
+            "active": found["active"],
+            "cross_agent_duplicate": sum(1 for c in found["collisions"] if c["type"] == "cross_agent_duplicate"),
+            "cross_agent_near_duplicate": sum(1 for c in found["collisions"] if c["type"] == "cross_agent_near_duplicate"),
+            "manifest_issues": len(found["issues"]),
+        },
+        "collisions": found["collisions"],
+        "manifest_issues": found["issues"],
+    }
+
+    PROFILE.start("format")
+    write_yaml(ws, out, "FLEET-DRAFT.yaml")
+    summary = out["summary"]
+    md = ["# Fleet Decision Collisions", ""]
+    md.append(f"- Generated: {out['meta']['generated']}")
+    md.append(f"- Agents: {summary['agents']} ({', '.join(agents) or 'none'})")
+    md.append(f"- Decision files: {summary['files']}")
+    md.append(f"- Decisions: {summary['decisions']} ({summary['active']} ACTIVE per owner)")
+    md.append(f"- Cross-agent duplicates: {summary['cross_agent_duplicate']}")
+    md.append(f"- Cross-agent near duplicates: {summary['cross_agent_near_duplicate']}")
+    md.append(f"- Manifest issues: {summary['manifest_issues']}")
+    md.append("")
+    if out["collisions"]:
+        md.append("## ACTIVE collisions across agents (require owner approval)")
+        for c in out["collisions"]:
+            if c["type"] == "cross_agent_duplicate":
+                md.append(f"- {c['type']} | key={c['key']} | owners={', '.join(c['owners'])}")
+                md.extend(f"  - {w}" for w in c["sources"])
+            else:
+                md.append(f"- {c['type']} | a={c['a_key']} | b={c['b_key']} | owners={', '.join(c['owners'])}"
+                          f" | domain={c['domain']} | similarity={c['similarity']}")
+                md.extend(f"  - a: {w}" for w in c["a_sources"])
+                md.extend(f"  - b: {w}" for w in c["b_sources"])
+            md.append(f"  - {c['recommendation']}")
+        md.append("")
+    if out["manifest_issues"]:
+        md.append("## shared/MANIFEST.yaml cross_agent_decisions")
+        for it in out["manifest_issues"]:
+            line = f"- {it['type']} | id={it['id']} | status={it['status']} | lines={it['lines']}"
+            if "file_status" in it:
+                line += f" | file_status={it['file_status']}"
+            md.append(line)
+        md.append("")
+    write_md(ws, "\n".join(md) + "\n", "FLEET-DRAFT.md")
+    PROFILE.stop(items=2)
+
+    if cache is not None:
+        cache.save()
+    print(f"Wrote {ws/'FLEET-DRAFT.yaml'} and {ws/'FLEET-DRAFT.md'}")
+    _finish_profile(args, ws)
+    return 0
+
+def _finish_profile(args, ws: Path):
+    if not args.profile:
+        return
+    print(PROFILE.format(), file=sys.stderr)
+    openclaw_profile.log_event(str(ws), PROFILE, command=args.cmd)
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("cmd", choices=["scan", "apply"])
@@ -301,34 +915,44 @@ def main():
     ap.add_argument("--kit_dir", default=".", help="Kit directory containing GLOBAL-STATE.yaml if not in workspace")
     ap.add_argument("--global_state", default=None, help="Path to GLOBAL-STATE.yaml (defaults to <kit_dir>/GLOBAL-STATE.yaml)")
     ap.add_argument("--include_memory", action="store_true", help="Also scan MEMORY.md and memory/*.md as advisory")
+    ap.add_argument("--fleet", action="store_true",
+                    help="scan only: check ACTIVE decisions across GLOBAL-STATE.yaml, shared/decisions/ and every agents/<id>/ (multi-agent overlay)")
     ap.add_argument("--approve", default="", help='Approval token for gated applies, e.g. "APPROVE STRUCTURAL CHANGE: DECISION-RESOLVE"')
     ap.add_argument("--similarity", type=float, default=0.65)
+    ap.add_argument("--jobs", type=int, default=DEFAULT_JOBS,
+                    help=f"Worker processes for parsing memory files (default: {DEFAULT_JOBS})")
+    ap.add_argument("--no-cache", action="store_true",
+                    help="Ignore and do not update the parsed-decision cache (<workspace>/.cache/decisions.json)")
+    ap.add_argument("--profile", action="store_true", help="Print per-phase timings to stderr")
     args = ap.parse_args()
+    PROFILE.enabled = args.profile
 
     ws = Path(args.workspace).expanduser()
     ensure_workspace(ws)
 
     kit_dir = Path(args.kit_dir).expanduser()
+    cache = None if args.no_cache else openclaw_decisions.DecisionCache(openclaw_decisions.default_cache_path(ws))
+    if args.fleet:
+        if args.cmd != "scan":
+            print("[ERROR] --fleet is scan-only; fleet collisions are proposals.", file=sys.stderr)
+            return 2
+        return scan_fleet(args, ws, kit_dir, cache)
+
     gs_path = Path(args.global_state).expanduser() if args.global_state else (kit_dir / "GLOBAL-STATE.yaml")
     if not gs_path.exists():
         print(f"[ERROR] GLOBAL-STATE.yaml not found at {gs_path}", file=sys.stderr)
         return 2
 
-    gs_text = load_text(gs_path)
-    global_decisions = parse_decisions(gs_text, "GLOBAL-STATE.yaml")
+    global_decisions = parse_file(gs_path, "GLOBAL-STATE.yaml", cache)
 
     # Advisory memory scan
-    memory_decisions = []
+    memory_decisions, memory_files = [], 0
     if args.include_memory:
-        mem_path = kit_dir / "MEMORY.md"
-        if mem_path.exists():
-            memory_decisions.extend(parse_decisions(load_text(mem_path), "MEMORY.md"))
-        mem_dir = kit_dir / "memory"
-        if mem_dir.exists() and mem_dir.is_dir():
-            for p in sorted(mem_dir.glob("*.md")):
-                memory_decisions.extend(parse_decisions(load_text(p), f"memory/{p.name}"))
+        memory_decisions, memory_files = parse_memory(kit_dir, args.jobs, cache)
 
-    collisions = detect_collisions(global_decisions, similarity_threshold=args.similarity)
+    with PROFILE.phase("detect"):
+        collisions = detect_collisions(global_decisions, similarity_threshold=args.similarity, cache=cache)
+        PROFILE.add("detect", items=len(global_decisions))
 
     # Prepare scan output
     scan_out = {
@@ -348,12 +972,25 @@ def main():
         "gated": collisions["gated"],
         "safe_auto_actions": [],
     }
+    if args.include_memory:
+        advisory = cross_check_memory(memory_decisions, global_decisions, similarity_threshold=args.similarity)
+        scan_out["summary"].update({
+            "memory_files": memory_files,
+            "memory_decisions": len(memory_decisions),
+            "memory_contradicts": sum(1 for a in advisory if a["type"] == "memory_contradicts"),
+            "memory_unpromoted": sum(1 for a in advisory if a["type"] == "memory_unpromoted"),
+            "memory_near_duplicate": sum(1 for a in advisory if a["type"] == "memory_near_duplicate"),
+            "memory_duplicate": sum(1 for a in advisory if a["type"] == "memory_duplicate"),
+        })
+        scan_out["memory_advisory"] = advisory
 
     # Always compute what safe auto changes WOULD be (but only apply in apply)
-    safe_actions, replacements = safe_duplicate_resolution([d for d in global_decisions if d.status=="ACTIVE"])
+    with PROFILE.phase("resolve"):
+        safe_actions, replacements = safe_duplicate_resolution([d for d in global_decisions if d.status=="ACTIVE"])
     scan_out["safe_auto_actions"] = safe_actions
 
     # Write drafts
+    PROFILE.start("format")
     write_yaml(ws, scan_out, "RESOLUTION-DRAFT.yaml")
 
     md = []
@@ -364,6 +1001,11 @@ def main():
     md.append(f"- Global ACTIVE: {scan_out['summary']['global_active']}")
     md.append(f"- Issues: {scan_out['summary']['issues']}")
     md.append(f"- Gated proposals: {scan_out['summary']['gated']}")
+    if args.include_memory:
+        summary = scan_out["summary"]
+        md.append(f"- Memory decisions: {summary['memory_decisions']} in {summary['memory_files']} files "
+                  f"({summary['memory_contradicts']} contradict, {summary['memory_unpromoted']} unpromoted, "
+                  f"{summary['memory_near_duplicate']} near-duplicate, {summary['memory_duplicate']} duplicate)")
     md.append("")
     if scan_out["issues"]:
         md.append("## Issues (must fix)")
@@ -383,6 +1025,20 @@ def main():
             md.append(f"- {g['type']} | a={g['a_key']} | b={g['b_key']} | domain={g.get('domain','unknown')} | similarity={g.get('similarity')}")
             md.append(f"  - {g['recommendation']}")
         md.append("")
+    if scan_out.get("memory_advisory"):
+        md.append("## Memory advisory (GLOBAL-STATE.yaml is canonical; nothing here is applied)")
+        for a in scan_out["memory_advisory"]:
+            line = f"- {a['type']} | key={a['key']} | status={a['status']} | domain={a['domain']}"
+            if "canonical_key" in a:
+                line += (f" | canonical={a['canonical_key']} ({a['canonical_status']}) | lines={a['canonical_lines']}"
+                         f" | similarity={a['similarity']}")
+            md.append(line)
+            shown = ", ".join(a["sources"][:3])
+            if len(a["sources"]) > 3:
+                shown += f" (+{len(a['sources']) - 3} more)"
+            md.append(f"  - seen {a['occurrences']}x in {shown}")
+            md.append(f"  - {a['recommendation']}")
+        md.append("")
     md.append("## Apply instructions")
     md.append("")
     md.append("1) Scan:")
@@ -401,35 +1057,37 @@ def main():
     md.append("  --approve \"APPROVE STRUCTURAL CHANGE: DECISION-RESOLVE\"")
     md.append("```")
     write_md(ws, "\n".join(md) + "\n", "RESOLUTION-DRAFT.md")
+    PROFILE.stop(items=2)
 
-    # Patch output (only for safe replacements computed now; gated merges are proposals)
-    patch_text = build_patch(gs_path, replacements) if replacements else ""
-    if patch_text.strip():
-        write_md(ws, patch_text, "RESOLUTION-PATCH.diff")
+    # Patch output (only for safe replacements computed now; gated merges are proposals).
+    # The patch and apply both splice at the block spans captured by the parse.
+    gs_data = load_bytes(gs_path) if replacements else b""
+    spans = block_spans(gs_data, replacements)
+    with PROFILE.phase("patch"):
+        patch_text = build_patch(gs_path, gs_data, spans) if spans else ""
+        if patch_text.strip():
+            write_md(ws, patch_text, "RESOLUTION-PATCH.diff")
+        PROFILE.add("patch", items=len(spans))
+
+    if cache is not None:
+        cache.save()
 
     if args.cmd == "scan":
         print(f"Wrote {ws/'RESOLUTION-DRAFT.yaml'} and {ws/'RESOLUTION-DRAFT.md'}")
         if patch_text.strip():
             print(f"Wrote {ws/'RESOLUTION-PATCH.diff'} (safe auto fixes)")
+        _finish_profile(args, ws)
         return 0
 
     # apply
     # apply safe replacements
-    applied_any = False
-    if replacements:
-        # apply by replacing blocks in file text
-        file_text = gs_text
-        for dec, new_block in sorted(replacements, key=lambda x: x[0].line_start, reverse=True):
-            idx = file_text.find(dec.block)
-            if idx == -1:
-                continue
-            file_text = file_text[:idx] + new_block + file_text[idx+len(dec.block):]
-            applied_any = True
-        if applied_any:
-            gs_path.write_text(file_text, encoding="utf-8")
-            print("[OK] Applied safe duplicate ACTIVE supersede edits to GLOBAL-STATE.yaml")
-    else:
+    PROFILE.start("apply")
+    if spans:
+        write_atomic(gs_path, rewrite(gs_data, spans))
+        print("[OK] Applied safe duplicate ACTIVE supersede edits to GLOBAL-STATE.yaml")
+    elif not replacements:
         print("[OK] No safe duplicate ACTIVE collisions found.")
+    PROFILE.stop(items=len(spans))
 
     # gated apply placeholder (future): we do not auto-merge; require approval
     if args.approve.strip():
@@ -439,6 +1097,7 @@ def main():
             # For now, gated changes remain proposals only.
             # Future enhancement: read RESOLUTION-DRAFT.yaml 'selected' actions and apply.
             print("[NOTE] Approval recognized. No gated actions selected in this version; proposals remain in RESOLUTION-DRAFT.md.")
+    _finish_profile(args, ws)
     return 0
 
 if __name__ == "__main__":
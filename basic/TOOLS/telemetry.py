@@ -8,9 +8,11 @@ Local-only event logger. Writes JSON lines to:
 No content is logged. Events are counts and timestamps only.
 """
 from __future__ import annotations
-import argparse, json, os, time, uuid
+import argparse, os, time, uuid
 from pathlib import Path
 
+import openclaw_json
+
 def workspace_id(workspace: Path) -> str:
     tid = workspace / "telemetry" / "workspace_id"
     if tid.exists():
@@ -31,7 +33,7 @@ def emit(workspace: Path, event: str, kit_version: str, data: dict):
         "data": data or {},
     }
     with (tel_dir / "metrics.jsonl").open("a", encoding="utf-8") as f:
-        f.write(json.dumps(row, separators=(",", ":")) + "\n")
+        f.write(openclaw_json.dumps(row, compact=True) + "\n")
 
 def main():
     ap = argparse.ArgumentParser()
@@ -46,7 +48,7 @@ def main():
 
     ws = Path(args.workspace).expanduser()
     try:
-        data = json.loads(args.data)
+        data = openclaw_json.loads(args.data)
         if not isinstance(data, dict):
             data = {}
     except Exception:
@@ -0,0 +1,40 @@
+"""
+Shared fixtures for the TOOLS test suite.
+
+The tools are standalone scripts that import their siblings by name, so
+the suite puts TOOLS/ and TOOLS/advanced/ on sys.path the same way the
+scripts themselves run. Run from the repository root or basic/:
+
+  python -m pytest -q basic/tests
+"""
+from __future__ import annotations
+import json
+import os
+import sys
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+TOOLS = os.path.join(os.path.dirname(HERE), "TOOLS")
+sys.path.insert(0, os.path.join(TOOLS, "advanced"))
+sys.path.insert(0, TOOLS)
+
+
+def write_lines(path, entries, trailing_newline=True):
+    """Write transcript lines: dicts are JSON-encoded, strings written as-is."""
+    lines = [e if isinstance(e, str) else json.dumps(e) for e in entries]
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + ("\n" if trailing_newline else ""))
+    return str(path)
+
+
+@pytest.fixture
+def transcript(tmp_path):
+    """transcript(name, entries, trailing_newline=True) -> path under tmp_path/sessions."""
+    sessions = tmp_path / "sessions"
+    sessions.mkdir(exist_ok=True)
+
+    def make(name, entries, trailing_newline=True):
+        return write_lines(sessions / name, entries, trailing_newline)
+
+    return make
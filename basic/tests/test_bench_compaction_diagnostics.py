@@ -0,0 +1,65 @@
+"""Regression tests for TOOLS/advanced/gen_session_transcripts.py and bench_compaction_diagnostics.py."""
+from __future__ import annotations
+import json
+import os
+import subprocess
+import sys
+
+import bench_compaction_diagnostics as bench
+import gen_session_transcripts as gen
+import openclaw_compaction_diagnostics as diag
+from conftest import TOOLS
+
+
+def test_generator_is_deterministic_and_counts_what_it_writes(tmp_path):
+    a, b, c = (str(tmp_path / name) for name in ("a.jsonl", "b.jsonl", "c.jsonl"))
+    written, lines, compactions = gen.generate(a, 100_000, seed=7, compaction_density=10)
+    assert gen.generate(b, 100_000, seed=7, compaction_density=10) == (written, lines, compactions)
+    with open(a, "rb") as fa, open(b, "rb") as fb:
+        assert fa.read() == fb.read()
+    gen.generate(c, 100_000, seed=8, compaction_density=10)
+    with open(a, "rb") as fa, open(c, "rb") as fc:
+        assert fa.read() != fc.read()
+
+    assert written == os.path.getsize(a) >= 100_000
+    with open(a, "rb") as f:
+        assert sum(1 for _ in f) == lines
+    assert diag.analyze_session(a)["total_compactions"] == compactions > 0
+
+
+def test_generator_malformed_rate(tmp_path):
+    path = str(tmp_path / "m.jsonl")
+    _, lines, _ = gen.generate(path, 200_000, seed=1, malformed_rate=0.1)
+    bad = 0
+    with open(path, "rb") as f:
+        for raw in f:
+            try:
+                json.loads(raw)
+            except ValueError:
+                bad += 1
+    assert 0.05 * lines < bad < 0.15 * lines
+
+
+def test_parse_size_and_tool_mix():
+    assert gen.parse_size("512K") == 512 * 1024 and gen.parse_size("2M") == 2 * 1024 ** 2
+    assert gen.parse_tool_mix("read=4,exec=1") == {"read": 4, "exec": 1}
+
+
+def test_check_baseline_flags_regressions():
+    baseline = {"cases": {"summary": {"mb_per_s": 100.0, "peak_rss_mb": 50.0}}}
+    ok = {"cases": {"summary": {"mb_per_s": 85.0, "peak_rss_mb": 55.0}}}
+    slow = {"cases": {"summary": {"mb_per_s": 70.0, "peak_rss_mb": 70.0}}}
+    assert bench.check_baseline(ok, baseline, 0.2) == []
+    assert len(bench.check_baseline(slow, baseline, 0.2)) == 2
+
+
+def test_bench_runs_and_checks_results(tmp_path):
+    script = os.path.join(TOOLS, "advanced", "bench_compaction_diagnostics.py")
+    base = str(tmp_path / "baseline.json")
+    proc = subprocess.run([sys.executable, script, "--size", "200K", "--sessions", "3",
+                           "--session-size", "40K", "--repeat", "1", "--save-baseline", base],
+                          capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stderr
+    with open(base, encoding="utf-8") as f:
+        cases = json.load(f)["cases"]
+    assert set(cases) == {"analyze_session", "analyze_session_full", "format_report", "summary"}
@@ -0,0 +1,699 @@
+"""Regression tests for TOOLS/openclaw_compaction_diagnostics.py."""
+from __future__ import annotations
+import io
+import json
+import os
+import select
+import subprocess
+import sys
+
+import pytest
+
+import openclaw_compaction_diagnostics as diag
+from conftest import write_lines
+
+
+def tool_use(name, **args):
+    return {"type": "tool_use", "name": name, "input": args}
+
+
+def comparable(results):
+    """Per-session results as JSON-safe dicts, sorted by session file."""
+    return sorted((diag._serializable_result(r) for r in results), key=lambda r: r["session_file"])
+
+
+def rescan(files, workspace):
+    return comparable(diag.analyze_sessions(files, workspace=workspace))
+
+
+def from_index(db, files, workspace):
+    index = diag.EventIndex(db)
+    try:
+        index.update(files)
+        return comparable(index.results(workspace=workspace))
+    finally:
+        index.close()
+
+
+# ── Event index ───────────────────────────────────────────────────────
+
+def test_index_tolerates_non_str_tool_fields(tmp_path, transcript):
+    path = transcript("odd.jsonl", [
+        tool_use("write", path={"x": 1}),
+        tool_use("read", file=["GLOBAL-STATE.yaml"]),
+        {"type": "tool_use", "name": {"n": 1}, "input": {"path": "memory/a.md"}},
+        {"type": "compaction", "summary": "token summary"},
+        tool_use("read", path="GLOBAL-STATE.yaml"),
+    ])
+    db = str(tmp_path / "index.sqlite")
+    assert from_index(db, [path], str(tmp_path)) == rescan([path], str(tmp_path))
+
+    index = diag.EventIndex(db)
+    try:
+        rows = index.conn.execute("SELECT tool, path FROM tool_calls ORDER BY line_num").fetchall()
+    finally:
+        index.close()
+    assert rows == [("write", None), ("read", None), ("read", "GLOBAL-STATE.yaml")]
+
+
+def test_index_matches_rescan_and_skips_unchanged(tmp_path, transcript):
+    files = [
+        transcript("a.jsonl", [
+            {"type": "message", "content": "NO_REPLY", "totalTokens": 1200},
+            tool_use("write", path="memory/2026-01-01.md"),
+            {"type": "compaction", "summary": "token summary", "tokensBefore": 1200},
+            tool_use("read", path="GLOBAL-STATE.yaml"),
+        ]),
+        # A last line with no newline is indexed, as a rescan analyzes it
+        transcript("b.jsonl", [{"type": "compaction", "summary": "only"}], trailing_newline=False),
+    ]
+    db = str(tmp_path / "index.sqlite")
+    ws = str(tmp_path)
+    assert from_index(db, files, ws) == rescan(files, ws)
+
+    index = diag.EventIndex(db)
+    try:
+        assert index.update(files) == (0, 2)
+    finally:
+        index.close()
+
+    # Completing the partial line and growing the file resumes from the checkpoint
+    with open(files[1], "a", encoding="utf-8") as f:
+        f.write("\n" + json.dumps(tool_use("read", path="memory/2026-01-01.md")) + "\n")
+    assert from_index(db, files, ws) == rescan(files, ws)
+    rebuilt = str(tmp_path / "rebuilt.sqlite")
+    assert from_index(rebuilt, files, ws) == from_index(db, files, ws)
+
+
+# ── Result cache ──────────────────────────────────────────────────────
+
+def cached_run(files, workspace, cache_path):
+    cache = diag.SessionCache(cache_path)
+    results = comparable(diag.analyze_sessions(files, workspace=workspace, cache=cache))
+    cache.save()
+    return cache, results
+
+
+def session(n):
+    return [
+        {"type": "message", "content": "NO_REPLY", "totalTokens": 1000 + n},
+        tool_use("write", path="memory/2026-01-01.md"),
+        {"type": "compaction", "summary": f"token summary {n}"},
+        tool_use("read", path="GLOBAL-STATE.yaml"),
+    ]
+
+
+def test_cache_hits_unchanged_and_invalidates_changed(tmp_path, transcript):
+    files = [transcript(f"s{i}.jsonl", session(i)) for i in range(3)]
+    ws, cache_path = str(tmp_path), str(tmp_path / "cache.json")
+    _, cold = cached_run(files, ws, cache_path)
+    assert cold == rescan(files, ws)
+
+    # A run where every session hits does not rewrite the cache file
+    before = os.stat(cache_path).st_mtime_ns
+    os.utime(cache_path, ns=(before - 10**9, before - 10**9))
+    before = os.stat(cache_path).st_mtime_ns
+    cache, warm = cached_run(files, ws, cache_path)
+    assert warm == cold
+    assert os.stat(cache_path).st_mtime_ns == before
+
+    # A rewritten transcript is a miss and is re-analyzed
+    with open(files[0], "a", encoding="utf-8") as f:
+        f.write(json.dumps({"type": "compaction", "summary": "again"}) + "\n")
+    key = diag.SessionCache.stat_key(files[0])
+    assert cache.get(files[0], key) is diag._CACHE_MISS
+    _, after = cached_run(files, ws, cache_path)
+    assert after == rescan(files, ws)
+    assert after[0]["total_compactions"] == 2
+
+
+def test_cache_keeps_checkpoints_for_recent_sessions_only(tmp_path, transcript, monkeypatch):
+    monkeypatch.setattr(diag, "CHECKPOINT_MAX_SESSIONS", 2)
+    files = [transcript(f"s{i}.jsonl", session(i)) for i in range(4)]
+    # Distinct, recent mtimes (within CHECKPOINT_MAX_IDLE)
+    now = int(diag.datetime.now().timestamp()) * 10**9
+    for i, f in enumerate(files):
+        os.utime(f, ns=(now - (4 - i) * 10**9,) * 2)
+    cache, _ = cached_run(files, str(tmp_path), str(tmp_path / "cache.json"))
+    reloaded = diag.SessionCache(cache.path)
+    kept = [os.path.basename(p) for p, e in reloaded.entries.items() if e["checkpoint"]]
+    assert sorted(kept) == ["s2.jsonl", "s3.jsonl"]
+
+
+# ── mmap engine ──────────────────────────────────────────────────────
+
+def spelled_compactions():
+    """Compactions in every spelling the detector rules accept, plus near misses."""
+    return [
+        {"type": "message", "content": "NO_REPLY", "totalTokens": 900},
+        tool_use("write", path="memory/2026-01-01.md"),
+        {"type": "log", "message": "CoMpAcTiOn finished, summary written"},
+        tool_use("read", path="GLOBAL-STATE.yaml"),
+        '{"type": "\\u0063ompaction", "summary": "token summary"}',
+        '{"type": "message", "\\u0074otalTokens": 7000}',
+        {"type": "compaction", "summary": "token summary"},
+        {"type": "Compaction", "summary": "not a compaction type"},
+        '{"type": "compaction", "truncated',
+    ] + [{"type": "message", "content": f"filler {i}"} for i in range(45)] + [
+        {"type": "log", "message": "COMPACTION truncated history"},
+        tool_use("read", path="memory/2026-01-01.md"),
+    ]
+
+
+def test_mmap_engine_matches_stream(transcript, monkeypatch):
+    path = transcript("s.jsonl", spelled_compactions())
+    stream = diag._analyze_record(path, prefilter=False)[0]
+    assert [e["line_num"] for e in stream["events"]] == [2, 4, 6, 54]
+    assert stream["peak_tokens"] == 7000
+    assert diag._analyze_record(path, prefilter=True)[0] == stream
+    assert diag._analyze_record(path, engine="mmap")[0] == stream
+    # Markers split across the lowercasing chunks are still found
+    monkeypatch.setattr(diag, "FOLD_CHUNK", 7)
+    assert diag._analyze_record(path, engine="mmap")[0] == stream
+
+
+def test_mmap_cached_records_serve_stream_runs(tmp_path, transcript):
+    files = [transcript("s.jsonl", spelled_compactions())]
+    ws, cache_path = str(tmp_path), str(tmp_path / "cache.json")
+    cache = diag.SessionCache(cache_path)
+    list(diag.analyze_sessions(files, workspace=ws, cache=cache, engine="mmap"))
+    cache.save()
+    cached = diag.analyze_sessions(files, workspace=ws, cache=diag.SessionCache(cache_path))
+    assert comparable(cached) == rescan(files, ws)
+
+
+# ── Process pool ─────────────────────────────────────────────────────
+
+def test_jobs_match_serial_and_small_runs_skip_the_pool(tmp_path, transcript, monkeypatch):
+    files = [transcript(f"s{i}.jsonl", session(i) * (i + 1)) for i in range(4)]
+    ws = str(tmp_path)
+    serial = rescan(files, ws)
+
+    started = []
+    real_pool = diag.ProcessPoolExecutor
+
+    def pool(*args, **kwargs):
+        started.append(kwargs["max_workers"])
+        return real_pool(*args, **kwargs)
+
+    monkeypatch.setattr(diag, "ProcessPoolExecutor", pool)
+    assert comparable(diag.analyze_sessions(files, workspace=ws, jobs=4)) == serial
+    assert started == []
+
+    monkeypatch.setattr(diag, "POOL_MIN_BYTES", os.path.getsize(files[-1]))
+    assert comparable(diag.analyze_sessions(files, workspace=ws, jobs=4)) == serial
+    assert started == [4]
+
+
+# ── Streaming analyzer ───────────────────────────────────────────────
+
+def filler(n, start=0):
+    return [{"type": "message", "content": f"filler {start + i}"} for i in range(n)]
+
+
+def window_edges():
+    """
+    Three compactions probing the 30-entry lookback and 40-entry
+    lookforward edges. Expected values follow the original all-in-memory
+    analyze_session, which indexed decoded entries (malformed lines never
+    took a slot).
+    """
+    return ([tool_use("write", path="memory/2026-01-01.md"), "{broken"]
+            + filler(29)                                           # lines 2..30
+            + [{"type": "compaction"}]                             # 31: A, write is 30 entries back
+            + filler(38, 32)                                       # lines 32..69
+            + [{"type": "message", "content": "x", "totalTokens": 5000},
+               tool_use("read", path="GLOBAL-STATE.yaml"),         # 71: 40th entry after A
+               {"type": "compaction", "summary": "token count"},  # 72: B
+               {"type": "message", "content": "Resuming the migration"},
+               {"type": "compaction", "deletedCount": 3},          # 74: C, ends B's lookforward
+               tool_use("read", path="memory/2026-01-01.md")])
+
+
+def test_streaming_analyzer_window_edges(transcript):
+    result = diag.analyze_session(transcript("s.jsonl", window_edges()), prefilter=False)
+    events = result["compaction_events"]
+    assert [e.line_num for e in events] == [31, 72, 74]
+    assert events[0].memory_writes_before == ["memory/2026-01-01.md"]
+    assert events[0].state_reads_after == ["GLOBAL-STATE.yaml"]
+    assert not events[1].pre_flush_detected and events[1].summary_available
+    assert events[1].recovery_announced and not events[1].memory_reads_after
+    assert events[2].summary_available and events[2].memory_reads_after == ["memory/2026-01-01.md"]
+    assert (result["total_compactions"], result["flush_successes"], result["recovery_successes"]) == (3, 1, 2)
+    assert result["peak_tokens"] == 5000
+
+    # One entry further and the write falls out of A's lookback
+    shifted = window_edges()
+    shifted[2:2] = filler(1, 100)
+    events = diag.analyze_session(transcript("t.jsonl", shifted), prefilter=False)["compaction_events"]
+    assert events[0].memory_writes_before == [] and events[0].state_reads_after == ["GLOBAL-STATE.yaml"]
+    # ... and the read out of its lookforward
+    shifted = window_edges()
+    shifted[32:32] = filler(1, 100)
+    events = diag.analyze_session(transcript("u.jsonl", shifted), prefilter=False)["compaction_events"]
+    assert events[0].memory_writes_before == ["memory/2026-01-01.md"] and events[0].state_reads_after == []
+
+
+def test_streaming_analyzer_edge_cases(transcript):
+    assert diag.analyze_session(transcript("empty.jsonl", [])) is None
+    assert diag.analyze_session(transcript("bad.jsonl", ["{broken", "not json"])) is None
+    quiet = diag.analyze_session(transcript("quiet.jsonl", filler(3)))
+    assert quiet["total_compactions"] == 0 and quiet["compaction_events"] == []
+
+
+# ── Resume checkpoints ───────────────────────────────────────────────
+
+def resumed(path, checkpoint):
+    """_analyze_record from a checkpoint that went through the JSON cache."""
+    return diag._analyze_record(path, json.loads(json.dumps(checkpoint)), prefilter=False)
+
+
+@pytest.mark.parametrize("split", [1, 20, 31, 32, 60, 72, 73, 75])
+def test_resume_matches_fresh_scan(tmp_path, split):
+    lines = [e if isinstance(e, str) else json.dumps(e) for e in window_edges()]
+    path = str(tmp_path / "s.jsonl")
+    head, rest = "\n".join(lines[:split]) + "\n", "\n".join(lines[split:]) + "\n"
+    # The head ends with half of the next line, still being written
+    cut = len(lines[split]) // 2 if split < len(lines) else 0
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(head + rest[:cut])
+    _, checkpoint = diag._analyze_record(path, prefilter=False)
+    assert checkpoint["line_num"] == split
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(rest[cut:])
+    with open(path, "rb") as f:
+        assert diag._resume_point(f, checkpoint)
+    fresh = diag._analyze_record(path, prefilter=False)
+    assert resumed(path, checkpoint) == fresh
+
+
+def test_resume_rescans_rewritten_or_truncated_files(tmp_path):
+    path = tmp_path / "s.jsonl"
+    write_lines(path, window_edges())
+    _, checkpoint = diag._analyze_record(str(path), prefilter=False)
+
+    # Rewritten in place (same inode, longer): the bytes before the offset differ
+    entries = window_edges()
+    entries[0] = tool_use("edit", path="GLOBAL-STATE.yaml")
+    write_lines(path, entries + filler(3))
+    with open(path, "rb") as f:
+        assert not diag._resume_point(f, checkpoint)
+    assert resumed(str(path), checkpoint) == diag._analyze_record(str(path), prefilter=False)
+
+    # Truncated below the offset
+    write_lines(path, window_edges()[:40])
+    assert resumed(str(path), checkpoint) == diag._analyze_record(str(path), prefilter=False)
+
+
+# ── Lazy decoding prefilter ──────────────────────────────────────────
+
+def both_ways(path):
+    eager = diag._analyze_record(path, prefilter=False)[0]
+    assert diag._analyze_record(path, prefilter=True)[0] == eager
+    return eager
+
+
+def test_prefilter_matches_full_decode_on_generated_transcripts(tmp_path):
+    import gen_session_transcripts as gen
+    for seed in range(3):
+        path = str(tmp_path / f"s{seed}.jsonl")
+        gen.generate(path, 200_000, seed=seed, compaction_density=20, malformed_rate=0.05)
+        assert both_ways(path)["events"]
+
+
+def test_prefilter_braced_malformed_lines_take_no_slot(transcript):
+    braced = '{"type": "message", "content": "NO_REPLY", oops}'
+    entries = window_edges()
+    entries[1] = braced
+    entries[2:2] = [braced] * 3
+    record = both_ways(transcript("s.jsonl", entries))
+    assert record["events"][0]["memory_writes_before"] == ["memory/2026-01-01.md"]
+    assert not record["events"][0]["pre_flush_detected"]
+
+    path = transcript("bad.jsonl", [braced, '{"type": "compaction" oops}'])
+    assert both_ways(path) is None
+
+
+# ── Live watch ───────────────────────────────────────────────────────
+
+def append(path, *entries, newline=True):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("\n".join(e if isinstance(e, str) else json.dumps(e) for e in entries) + ("\n" if newline else ""))
+
+
+def test_watcher_reports_appended_compactions_once(tmp_path, transcript):
+    old = transcript("old.jsonl", [{"type": "compaction", "summary": "before watch"}])
+    seen = []
+    watcher = diag.SessionWatcher(str(tmp_path / "sessions"), lambda path, entry: seen.append(
+        (os.path.basename(path), entry.get("summary") or entry.get("message"))))
+    watcher.prime()
+    watcher.scan()
+    assert seen == []
+
+    append(old, *filler(2), {"type": "compaction", "summary": "one"})
+    # A compaction line still being written is reported once it is complete
+    line = json.dumps({"type": "compaction", "summary": "two"})
+    append(old, line[:10], newline=False)
+    watcher.scan()
+    append(old, line[10:], '{"type": "\\u0063ompaction", "summary": "three"}')
+    watcher.scan()
+    watcher.scan()
+    assert seen == [("old.jsonl", "one"), ("old.jsonl", "two"), ("old.jsonl", "three")]
+
+    # New files are read from the start; rewritten files are re-read
+    seen.clear()
+    transcript("new.jsonl", [{"type": "log", "message": "Compaction: summary written"}])
+    write_lines(old, [{"type": "compaction", "summary": "rewritten"}])
+    watcher.scan()
+    assert sorted(seen) == [("new.jsonl", "Compaction: summary written"), ("old.jsonl", "rewritten")]
+
+    os.remove(old)
+    watcher.scan()
+    assert list(watcher.files) == [str(tmp_path / "sessions" / "new.jsonl")]
+
+
+def test_compaction_detected_event_fields():
+    event = diag.compaction_detected_event(
+        "/x/sessions/abc.jsonl", {"type": "compaction", "summary": "12345", "tokensBefore": 9000})
+    assert event["event"] == "compaction_detected" and event["source"] == "watch"
+    assert (event["sessionKey"], event["preCompactTokens"], event["summaryLength"]) == ("abc", 9000, 5)
+
+
+def test_watch_command_prints_events(tmp_path, transcript):
+    path = transcript("s.jsonl", filler(2))
+    script = os.path.join(os.path.dirname(diag.__file__), "openclaw_compaction_diagnostics.py")
+    proc = subprocess.Popen([sys.executable, script, "watch", "--sessions-dir", str(tmp_path / "sessions"),
+                             "--workspace", str(tmp_path), "--interval", "0.05"],
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    try:
+        # An append made before the watcher primed is not reported, so retry
+        for _ in range(20):
+            append(path, {"type": "compaction", "summary": "live", "tokensBefore": 120000})
+            if select.select([proc.stdout], [], [], 0.5)[0]:
+                break
+        event = json.loads(proc.stdout.readline())
+    finally:
+        proc.kill()
+        proc.wait()
+    assert (event["sessionKey"], event["preCompactTokens"]) == ("s", 120000)
+
+
+# ── Compressed transcripts ───────────────────────────────────────────
+
+def compress(path, ext):
+    with open(path, "rb") as f:
+        data = f.read()
+    target = path + ext
+    with diag.COMPRESSED_OPENERS[ext](target, "wb") as f:
+        f.write(data)
+    return target
+
+
+@pytest.mark.parametrize("ext", sorted(diag.COMPRESSED_OPENERS))
+def test_archives_analyze_like_plain_transcripts(tmp_path, transcript, ext):
+    plain = transcript("s.jsonl", window_edges())
+    expected = diag._analyze_record(plain, prefilter=False)[0]
+    archive = compress(plain, ext)
+    assert diag._analyze_record(archive) == (expected, None)
+    assert diag._analyze_record(archive, engine="mmap") == (expected, None)
+    # Cached like any other transcript, and never checkpointed
+    cache = diag.SessionCache(str(tmp_path / "cache.json"))
+    list(diag.analyze_sessions([archive], workspace=str(tmp_path), cache=cache))
+    assert cache.entries[archive]["checkpoint"] is None
+    assert cache.get(archive, diag.SessionCache.stat_key(archive)) is not diag._CACHE_MISS
+
+
+def test_archives_discovered_unless_original_present(tmp_path, transcript):
+    sessions = tmp_path / "sessions"
+    compress(transcript("live.jsonl", filler(2)), ".gz")
+    old = transcript("old.jsonl", filler(2))
+    compress(old, ".gz")
+    os.remove(old)
+    (sessions / "notes.txt").write_text("x", encoding="utf-8")
+    names = sorted(os.path.basename(p) for p in diag.find_session_files(str(sessions)))
+    assert names == ["live.jsonl", "old.jsonl.gz"]
+
+
+def test_truncated_archive_is_analyzed_up_to_the_damage(tmp_path, transcript, capsys):
+    archive = compress(transcript("s.jsonl", window_edges() * 40), ".gz")
+    with open(archive, "rb") as f:
+        data = f.read()
+    with open(archive, "wb") as f:
+        f.write(data[:len(data) // 2])
+    result = diag.analyze_session(archive)
+    assert 0 < result["total_compactions"] < 3 * 40
+    assert "unreadable after line" in capsys.readouterr().err
+
+
+# ── Token series ─────────────────────────────────────────────────────
+
+def test_lttb_keeps_endpoints_and_spikes():
+    xs = list(range(1000))
+    ys = [100] * 1000
+    ys[517] = 90_000
+    keep = diag.lttb_indices(xs, ys, 20)
+    assert len(keep) == 20 and keep == sorted(keep)
+    assert keep[0] == 0 and keep[-1] == 999 and 517 in keep
+    assert diag.lttb_indices(xs[:10], ys[:10], 20) == list(range(10))
+    assert diag.lttb_indices(xs, ys, 2) == [0, 999]
+
+
+def test_token_series_stays_bounded():
+    series = diag.TokenSeries()
+    for i in range(20_000):
+        series.add(i, float(i), 150_000 if i == 12_345 else 1000 + i % 7)
+    assert len(series) <= diag.SERIES_BUFFER
+    rec = series.to_record()
+    assert len(rec["line"]) == diag.SERIES_RECORD_POINTS
+    assert rec["line"][0] == 0 and rec["line"][-1] == 19_999
+    assert max(rec["tokens"]) == 150_000
+    assert diag.downsample_series(rec, 8)["line"] == [rec["line"][i] for i in diag.lttb_indices(
+        rec["line"], rec["tokens"], 8)]
+
+
+def test_token_series_in_results(transcript):
+    path = transcript("s.jsonl", [
+        {"type": "message", "totalTokens": 1000, "timestamp": "2026-01-01T00:00:00Z"},
+        {"type": "message", "content": "no tokens"},
+        {"type": "message", "usage": {"input_tokens": 3000, "output_tokens": 200}},
+        {"type": "compaction", "contextTokens": 2500, "timestamp": "2026-01-01T00:01:00+00:00"},
+    ])
+    result = diag.analyze_session(path)
+    assert result["token_series"] == {"line": [0, 2, 3], "ts": [1767225600.0, None, 1767225660.0],
+                                      "tokens": [1000, 3000, 2500]}
+    diag._limit_series(result, 2)
+    assert result["token_series"]["line"] == [0, 3]
+    diag._limit_series(result, 0)
+    assert "token_series" not in result
+
+
+# ── NDJSON output ────────────────────────────────────────────────────
+
+def report(*args):
+    script = os.path.join(os.path.dirname(diag.__file__), "openclaw_compaction_diagnostics.py")
+    proc = subprocess.run([sys.executable, script, "report", *args], capture_output=True, text=True, check=True)
+    return proc.stdout
+
+
+def test_ndjson_matches_json_report(tmp_path, transcript):
+    transcript("a.jsonl", window_edges())
+    transcript("b.jsonl", session(1))
+    common = ["--sessions-dir", str(tmp_path / "sessions"), "--workspace", str(tmp_path), "--no-cache",
+              "--series-points", "4"]
+    sessions = json.loads(report("--json", *common))
+    lines = [json.loads(line) for line in report("--ndjson", *common).splitlines()]
+    assert [line.pop("type") for line in lines] == ["session", "session", "summary"]
+    assert lines[:2] == sessions
+    assert lines[2] == {"sessions_analyzed": 2, "total_compactions": 4, "flush_successes": 2,
+                        "flush_failures": 2, "recovery_successes": 3, "recovery_failures": 1}
+
+
+def test_ndjson_writes_each_session_as_it_arrives(tmp_path, transcript):
+    files = [transcript("a.jsonl", window_edges()), transcript("b.jsonl", session(1))]
+    out = io.StringIO()
+
+    def results():
+        for r in diag.analyze_sessions(files, workspace=str(tmp_path)):
+            yield r
+            # Written before the next session is analyzed
+            assert r["session_file"] in out.getvalue().splitlines()[-1]
+
+    totals = diag.write_ndjson(results(), out)
+    assert totals["sessions_analyzed"] == 2
+
+
+# ── All agents ───────────────────────────────────────────────────────
+
+def test_all_agents_rollups_match_per_agent_reports(tmp_path):
+    root = tmp_path / "agents"
+    layout = {"alpha": [window_edges(), session(1)], "beta": [session(2)], "empty": []}
+    for agent, sessions in layout.items():
+        (root / agent / "sessions").mkdir(parents=True)
+        for i, entries in enumerate(sessions):
+            write_lines(root / agent / "sessions" / f"s{i}.jsonl", entries)
+    (root / "no-sessions").mkdir()
+    common = ["--workspace", str(tmp_path), "--no-cache", "--series-points", "0", "--ndjson"]
+
+    fleet = [json.loads(line) for line in report("--all-agents", "--agents-root", str(root), *common).splitlines()]
+    assert [r["agent"] for r in fleet if r["type"] == "agent"] == ["alpha", "beta", "empty"]
+    for agent in ("alpha", "beta"):
+        own = [json.loads(line) for line in
+               report("--sessions-dir", str(root / agent / "sessions"), *common).splitlines()]
+        rows = [dict(r, agent=None) for r in fleet if r.get("agent") == agent and r["type"] == "session"]
+        assert sorted(rows, key=lambda r: r["session_file"]) == sorted(
+            (dict(r, agent=None) for r in own[:-1]), key=lambda r: r["session_file"])
+        rollup = next(r for r in fleet if r["type"] == "agent" and r["agent"] == agent)
+        assert {k: rollup[k] for k in own[-1] if k != "type"} == {k: v for k, v in own[-1].items() if k != "type"}
+    total = fleet[-1]
+    assert total["type"] == "summary" and total["sessions_analyzed"] == 3
+    assert total["total_compactions"] == 3 + 1 + 1
+
+
+# ── Entry features ───────────────────────────────────────────────────
+
+def test_entry_features():
+    feat = diag._entry_features(tool_use("edit", path="memory/GLOBAL-STATE.yaml"))
+    assert (feat.tool_name, feat.path_class) == ("edit", diag.PATH_MEMORY | diag.PATH_STATE)
+    assert diag._entry_features(tool_use("exec", path="memory/x.md")).path == ""
+    assert diag._entry_features(tool_use("read", file="GLOBAL-STATE.yaml")).path_class == diag.PATH_STATE
+    assert diag._entry_features({"type": "message", "content": "Session nearing compaction"}).flush_marker
+    assert diag._entry_features({"type": "message", "content": "Picking up where we left off"}).recovery_phrase
+    assert diag._entry_features({"type": "compaction"}).is_compaction
+    plain = diag._entry_features({"type": "message", "content": "hello"})
+    assert not (plain.flush_marker or plain.recovery_phrase or plain.tool_name or plain.is_compaction)
+
+
+def test_dense_compactions_reduce_each_entry_once(transcript, monkeypatch):
+    # Every compaction's windows overlap the previous ones
+    entries = []
+    for i in range(40):
+        entries += [tool_use("write", path="memory/a.md"), {"type": "compaction", "summary": f"token {i}"},
+                    tool_use("read", path="GLOBAL-STATE.yaml")]
+    path = transcript("s.jsonl", entries)
+    expected = diag._analyze_record(path, prefilter=False)[0]
+
+    calls = []
+    real = diag._entry_features
+    monkeypatch.setattr(diag, "_entry_features", lambda entry: calls.append(1) or real(entry))
+    for engine in ("stream", "mmap"):
+        calls.clear()
+        assert diag._analyze_record(path, prefilter=False, engine=engine)[0] == expected
+        assert len(calls) <= len(entries)
+    assert len(expected["events"]) == 40 and all(e["memory_writes_before"] for e in expected["events"])
+
+
+# ── Detector registry ────────────────────────────────────────────────
+
+@pytest.fixture
+def detectors():
+    """configure_detectors, with the built-in rules restored afterwards."""
+    yield diag.configure_detectors
+    diag.configure_detectors(None)
+
+
+def custom_transcript():
+    return ([tool_use("write", path="memory/a.md"),
+             {"type": "event", "event": "context_compacted"},
+             tool_use("read", path="GLOBAL-STATE.yaml"),
+             {"type": "log", "message": "compaction summary written"},
+             {"type": "message", "content": "Resumed from checkpoint 4"}]
+            + filler(3))
+
+
+def test_custom_and_disabled_rules(transcript, detectors):
+    path = transcript("s.jsonl", custom_transcript())
+    assert [e["line_num"] for e in diag._analyze_record(path)[0]["events"]] == [3]
+
+    detectors({"rules": [{"name": "compaction.v2", "stage": "compaction", "field": "event",
+                          "equals": "context_compacted"},
+                         {"name": "recovery.resume", "stage": "recovery", "regex": "(?i)resumed from checkpoint"}],
+               "disable": ["compaction.log_message"]})
+    assert not diag.DETECTORS.mmap_ok
+    record = diag._analyze_record(path, prefilter=False)[0]
+    assert [e["line_num"] for e in record["events"]] == [1]
+    assert record["events"][0]["recovery_announced"]
+    assert diag._analyze_record(path, prefilter=True)[0] == record
+    assert diag._analyze_record(path, engine="mmap")[0] == record
+    hits = {r.name: r.hits for r in diag.DETECTORS.rules}
+    assert hits["compaction.v2"] == 3 and "compaction.log_message" not in hits
+
+
+def test_regex_compaction_rule_disables_the_prefilter(transcript, detectors):
+    path = transcript("s.jsonl", custom_transcript())
+    detectors({"rules": [{"name": "compaction.re", "stage": "compaction", "field": "event", "regex": "_compacted$"}]})
+    assert diag.DETECTORS.prefilter_markers is None
+    record = diag._analyze_record(path, prefilter=True)[0]
+    assert [e["line_num"] for e in record["events"]] == [1, 3]
+    assert diag._analyze_record(path, prefilter=False)[0] == record
+
+
+@pytest.mark.parametrize("config", [
+    {"rules": [{"name": "x", "stage": "bogus", "phrases": ["a"]}]},
+    {"rules": [{"name": "x", "stage": "flush", "phrases": ["a"], "regex": "a"}]},
+    {"rules": [{"name": "x", "stage": "flush", "regex": "("}]},
+    {"rules": [{"name": "x", "stage": "flush", "equals": "a"}]},
+    {"rules": [{"name": "flush.no_reply", "stage": "flush", "phrases": ["a"]}]},
+    {"disable": ["no.such.rule"]},
+    ["not", "an", "object"],
+])
+def test_invalid_detector_configs(config):
+    with pytest.raises(ValueError):
+        diag.DetectorRegistry.from_config(config)
+
+
+def test_detector_config_file(tmp_path, transcript, detectors):
+    files = [transcript("s.jsonl", custom_transcript())]
+    ws, cache_path = str(tmp_path), str(tmp_path / "cache.json")
+    _, builtin = cached_run(files, ws, cache_path)
+
+    (tmp_path / diag.DETECTORS_FILENAME).write_text("{not json", encoding="utf-8")
+    proc = subprocess.run([sys.executable, diag.__file__, "summary", "--sessions-dir", str(tmp_path / "sessions"),
+                           "--workspace", ws], capture_output=True, text=True)
+    assert proc.returncode == 2 and "Invalid detector config" in proc.stderr
+
+    config = {"rules": [{"name": "c", "stage": "compaction", "field": "event", "equals": "context_compacted"}]}
+    (tmp_path / diag.DETECTORS_FILENAME).write_text(json.dumps(config), encoding="utf-8")
+    detectors(diag.load_detector_config(diag.default_detectors_path(ws)))
+    # Cached results from the built-in rules are not reused
+    _, custom = cached_run(files, ws, cache_path)
+    assert custom == rescan(files, ws) != builtin
+    assert custom[0]["total_compactions"] == 2
+
+
+# ── Session discovery ────────────────────────────────────────────────
+
+def test_discovery_days_pruning_and_partitions(tmp_path):
+    from datetime import datetime, timedelta
+    now = datetime.now()
+    day = lambda ago: (now - timedelta(days=ago)).strftime("%Y-%m-%d")
+    sessions = tmp_path / "sessions"
+    y, m, d = day(0).split("-")
+    layout = {                                 # path -> mtime, days ago
+        "recent.jsonl": 0,
+        "stale.jsonl": 30,
+        f"{day(20)}T10-00-00.jsonl": 0,        # name older than the cutoff + slack
+        f"{day(8)}.jsonl": 0.5,                # inside the slack
+        f"{y}/{m}/{d}/nested.jsonl": 0.2,
+        f"{day(1)}/daily.jsonl": 0.1,
+        f"{day(40)}/old.jsonl": 0,             # partition older than the cutoff
+        "misc/ignored.jsonl": 0,
+    }
+    for rel, ago in layout.items():
+        path = sessions / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        write_lines(path, filler(1))
+        t = (now - timedelta(days=ago)).timestamp()
+        os.utime(path, (t, t))
+
+    names = lambda paths: [os.path.relpath(p, sessions) for p in paths]
+    assert names(diag.find_session_files(str(sessions), days=7)) == ["recent.jsonl", f"{day(8)}.jsonl"]
+    assert names(diag.find_session_files(str(sessions), days=7, partitioned=True)) == [
+        "recent.jsonl", f"{day(1)}/daily.jsonl", os.path.join(y, m, d, "nested.jsonl"), f"{day(8)}.jsonl"]
+    everything = names(diag.find_session_files(str(sessions), partitioned=True))
+    assert len(everything) == 7 and "misc/ignored.jsonl" not in everything
+    assert sorted(names(diag.iter_session_files(str(sessions), partitioned=True))) == sorted(everything)
+    # Discovery stats are reused as cache keys, then released
+    path = str(sessions / "recent.jsonl")
+    assert path in diag._DISCOVERED_STATS
+    assert diag.SessionCache.stat_key(path)[1] == os.path.getsize(path)
+    assert path not in diag._DISCOVERED_STATS
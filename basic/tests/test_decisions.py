@@ -0,0 +1,209 @@
+"""Regression tests for TOOLS/openclaw_decisions.py."""
+from __future__ import annotations
+import datetime
+import io
+import os
+import random
+import re
+import sys
+
+import pytest
+
+import openclaw_decisions as decisions
+
+SLOTS = decisions.Decision.__slots__
+
+BLOCKS = """# Global state
+
+[DECISION]
+Decision: Use the Postgres event-store for ALL writes!
+Approved by: owner
+Date: 2026-02-01 (ratified)
+Status: active
+Domain:  Infra
+
+[DECISION]
+Decision: Retire the old cron runner
+Date: 2026-02-30
+Status: SUPERSEDED
+Superseded by: 0123456789
+
+[DECISION]
+Decision: the and of
+Status: ACTIVE
+Domain: ops
+"""
+
+
+# ── Decision fields ──────────────────────────────────────────────────
+
+def test_fields_are_parsed_once():
+    first, second, third = decisions.parse_decisions(BLOCKS, "GLOBAL-STATE.yaml")
+    assert first.source == "GLOBAL-STATE.yaml"
+    assert first.status == "ACTIVE" and first.domain == "infra"
+    assert first.tokens == frozenset(decisions.tokens(first.decision))
+    assert first.key_norm == "use postgres event store all writes"
+    assert first.key == decisions.sha10(first.key_norm)
+    assert first.day == datetime.date(2026, 2, 1) and first.missing == ()
+    assert (first.line_start, first.line_end) == (3, 9)
+
+    assert second.domain == "unknown" and second.superseded_by == "0123456789"
+    assert second.day is None               # not a real date
+    assert second.missing == ("Approved by:",)
+
+    # Only stopwords: the key falls back to the normalized text
+    assert third.tokens == frozenset() and third.key == decisions.sha10("the and of")
+    assert third.missing == ("Approved by:", "Date:")
+
+
+def test_domain_status_and_tokens_are_interned():
+    a = decisions.parse_decisions(BLOCKS, "x")[0]
+    b = decisions.parse_decisions(BLOCKS, "y")[0]
+    assert a.status is b.status is sys.intern("ACTIVE")
+    assert a.domain is b.domain is sys.intern("infra")
+    word = next(w for w in a.tokens if w == "postgres")
+    assert word is sys.intern("postgres")
+    assert not hasattr(a, "__dict__")
+
+
+def test_record_round_trip():
+    for d in decisions.parse_decisions(BLOCKS, "GLOBAL-STATE.yaml"):
+        back = decisions.Decision.from_record("MEMORY.md", d.to_record())
+        assert back.source == "MEMORY.md"
+        for name in SLOTS:
+            if name != "source":
+                assert getattr(back, name) == getattr(d, name), name
+        assert back.status is d.status and back.domain is d.domain
+
+
+# ── Block scanner ────────────────────────────────────────────────────
+
+OLD_RE = re.compile(r"\[DECISION\](.*?)(?=\n\[|\Z)", re.DOTALL)
+
+
+def regex_blocks(text):
+    """The blocks the tools found before scan_blocks: (text, line_start, line_end)."""
+    return [("[DECISION]" + m.group(1), text.count("\n", 0, m.start()) + 1,
+             text.count("\n", 0, m.end()) + 1) for m in OLD_RE.finditer(text)]
+
+
+def scanned(data, chunk_size=decisions.CHUNK_SIZE):
+    return list(decisions.scan_blocks(io.BytesIO(data), chunk_size))
+
+
+def random_document(rng):
+    lines = []
+    for _ in range(rng.randint(0, 40)):
+        lines.append(rng.choice([
+            "[DECISION]", "Decision: use a queue", "Status: ACTIVE", "", "  [not a break]",
+            "[other]", "notes [DECISION] inline", "[DECISION] Decision: inline", "café ✓",
+            "[", "x\ry",
+        ]))
+    return rng.choice(["\n", "\r\n"]).join(lines) + rng.choice(["", "\n", "\r\n"])
+
+
+def test_scanner_matches_regex_blocks():
+    rng = random.Random(21)
+    for _ in range(300):
+        text = random_document(rng)
+        data = text.encode("utf-8")
+        # Block text is normalized like a text-mode read, but only "\n" ends a line
+        expected = [(t.replace("\r", "\n"), a, b)
+                    for t, a, b in regex_blocks(text.replace("\r\n", "\n"))]
+        for chunk_size in (1, 3, 7, 64, decisions.CHUNK_SIZE):
+            blocks = scanned(data, chunk_size)
+            assert [(b.text, b.line_start, b.line_end) for b in blocks] == expected
+            for b in blocks:
+                assert decisions.block_text(data[b.byte_start:b.byte_end]) == b.text
+                assert not data[b.byte_start:b.byte_end].endswith(b"\r")
+
+
+def test_byte_spans_cover_the_block_exactly():
+    text = "intro\r\n[DECISION]\r\nDecision: a\r\n[next]\r\n[DECISION]\r\nDecision: b"
+    data = text.encode("utf-8")
+    first, second = scanned(data, 4)
+    assert data[first.byte_start:first.byte_end] == b"[DECISION]\r\nDecision: a"
+    assert data[first.byte_end:first.byte_end + 3] == b"\r\n["
+    assert (first.line_start, first.line_end) == (2, 3)
+    assert data[second.byte_start:second.byte_end] == b"[DECISION]\r\nDecision: b"
+    assert second.byte_end == len(data) and (second.line_start, second.line_end) == (5, 6)
+
+
+def test_parse_file_reads_the_same_blocks(tmp_path):
+    path = tmp_path / "MEMORY.md"
+    path.write_bytes(BLOCKS.encode("utf-8"))
+    from_file = decisions.parse_file(path, "MEMORY.md")
+    from_text = decisions.parse_decisions(BLOCKS, "MEMORY.md")
+    assert [d.to_record() for d in from_file] == [d.to_record() for d in from_text]
+    assert [d.block for d in from_file] == [b[0] for b in regex_blocks(BLOCKS)]
+
+
+# ── Parsed-decision cache ────────────────────────────────────────────
+
+def cached(path, cache_path, source="GLOBAL-STATE.yaml", **kwargs):
+    cache = decisions.DecisionCache(str(cache_path), **kwargs)
+    found = cache.parse_file(path, source)
+    return cache, [d.to_record() for d in found]
+
+
+def test_unchanged_file_is_served_from_cache(tmp_path, monkeypatch):
+    path = tmp_path / "GLOBAL-STATE.yaml"
+    path.write_text(BLOCKS, encoding="utf-8")
+    cache_path = tmp_path / ".cache" / "decisions.json"
+    cache, first = cached(path, cache_path)
+    assert cache.hits == 0 and first == [d.to_record() for d in decisions.parse_file(path, "x")]
+    cache.save()
+    saved = cache_path.stat().st_mtime_ns
+
+    def fail(path, source):
+        raise AssertionError(f"re-parsed {path}")
+    monkeypatch.setattr(decisions, "parse_file_hashed", fail)
+    cache, again = cached(path, cache_path, source="MEMORY.md")
+    assert cache.hits == 1 and again == first and not cache.dirty
+    assert decisions.DecisionCache(str(cache_path)).parse_file(path, "MEMORY.md")[0].source == "MEMORY.md"
+
+    # Same bytes, new mtime: the hash matches, so the entry's key is refreshed
+    os.utime(path, ns=(0, 0))
+    cache, touched = cached(path, cache_path)
+    assert touched == first and cache.dirty
+    cache.save()
+    assert cache_path.stat().st_mtime_ns != saved
+    cache, _ = cached(path, cache_path)
+    assert cache.hits == 1 and not cache.dirty
+
+
+def test_changed_file_is_parsed_again(tmp_path):
+    path = tmp_path / "GLOBAL-STATE.yaml"
+    path.write_text(BLOCKS, encoding="utf-8")
+    cache_path = tmp_path / "decisions.json"
+    cache, _ = cached(path, cache_path)
+    cache.save()
+    path.write_text(BLOCKS.replace("Retire", "Replace"), encoding="utf-8")
+    cache, records = cached(path, cache_path)
+    assert cache.hits == 0 and cache.dirty
+    assert records == [d.to_record() for d in decisions.parse_file(path, "x")]
+    assert "Replace the old cron runner" in records[1][1]
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache_path = tmp_path / "decisions.json"
+    paths = []
+    for k in range(3):
+        paths.append(tmp_path / f"{k}.md")
+        paths[-1].write_text(BLOCKS, encoding="utf-8")
+    cache = decisions.DecisionCache(str(cache_path), max_entries=2)
+    for p in (paths[0], paths[1], paths[0], paths[2]):
+        cache.parse_file(p, p.name)
+    cache.save()
+    cache = decisions.DecisionCache(str(cache_path), max_entries=2)
+    assert list(cache.entries) == [str(paths[0]), str(paths[2])]
+
+
+def test_unreadable_or_old_cache_is_ignored(tmp_path):
+    path = tmp_path / "GLOBAL-STATE.yaml"
+    path.write_text(BLOCKS, encoding="utf-8")
+    cache_path = tmp_path / "decisions.json"
+    for content in ("not json", '{"version": 0, "files": [["x", {}]]}', "[]"):
+        cache_path.write_text(content, encoding="utf-8")
+        cache, records = cached(path, cache_path)
+        assert cache.hits == 0 and len(records) == 3
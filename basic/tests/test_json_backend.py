@@ -0,0 +1,119 @@
+"""
+Regression tests for TOOLS/openclaw_json.py: every backend decodes the same.
+
+The backend is chosen once, at import, from OPENCLAW_JSON_BACKEND, so each
+case runs in a subprocess per backend and is compared with the stdlib run.
+Fast backends that are not installed are skipped.
+"""
+from __future__ import annotations
+import importlib.util
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import TOOLS
+
+FAST_BACKENDS = [
+    pytest.param(name, marks=pytest.mark.skipif(
+        importlib.util.find_spec(name) is None, reason=f"{name} not installed"))
+    for name in ("orjson", "msgspec")
+]
+
+# Lines stdlib json accepts but fast decoders reject or misread, plus
+# lines nobody accepts. Written as raw bytes.
+EDGE_LINES = [
+    b'{"type": "message", "totalTokens": 12345678901234567890123}',
+    b'{"type": "message", "id": -98765432109876543210, "n": 1}',
+    b'{"type": "message", "totalTokens": 184467440737095516150}',
+    b'{"type": "message", "score": NaN, "low": -Infinity, "high": Infinity}',
+    b'{"type": "message", "content": "lone \\ud800 surrogate"}',
+    b'{"type": "message", "content": "bad \xff\xfe utf-8"}',
+    b'{"type": "compaction", "summary": "caf\xc3\xa9"}',
+    b'{"type": "message", "content": "truncated',
+    b'{not json}',
+    b'',
+    b'   ',
+    b'[1, 2, 3]',
+    b'{"type": "message", "usage": {"input_tokens": 9007199254740993}}',
+]
+
+PARSE = """
+import sys, openclaw_json, openclaw_compaction_diagnostics as diag
+assert openclaw_json.BACKEND == sys.argv[2], openclaw_json.BACKEND
+for i, entry in diag.parse_jsonl(sys.argv[1]):
+    print(i, repr(entry))
+"""
+
+
+def run(backend, args, env=None, cwd=TOOLS):
+    env = dict(os.environ, OPENCLAW_JSON_BACKEND=backend, **(env or {}))
+    proc = subprocess.run([sys.executable, *args], cwd=cwd, env=env,
+                          capture_output=True, text=True, check=True)
+    return proc.stdout
+
+
+def parse_with(backend, path):
+    return run(backend, ["-c", PARSE, str(path), backend])
+
+
+def test_stdlib_backend_decodes_edge_lines(tmp_path):
+    path = tmp_path / "edge.jsonl"
+    path.write_bytes(b"\n".join(EDGE_LINES) + b"\n")
+    out = parse_with("json", path).splitlines()
+    assert [line.split(" ", 1)[0] for line in out] == ["0", "1", "2", "3", "4", "5", "6", "11", "12"]
+    assert "12345678901234567890123" in out[0]
+    assert "'score': nan" in out[3] and "'low': -inf" in out[3]
+    assert "\ufffd\ufffd" in out[5]
+
+
+@pytest.mark.parametrize("backend", FAST_BACKENDS)
+def test_parse_jsonl_matches_stdlib(tmp_path, backend):
+    path = tmp_path / "edge.jsonl"
+    path.write_bytes(b"\n".join(EDGE_LINES) + b"\n")
+    assert parse_with(backend, path) == parse_with("json", path)
+
+
+@pytest.mark.parametrize("backend", FAST_BACKENDS)
+def test_diagnostics_report_matches_stdlib(tmp_path, backend):
+    sessions = tmp_path / "sessions"
+    sessions.mkdir()
+    # The analyzer expects objects, so the top-level array is left out
+    lines = [line for line in EDGE_LINES if not line.startswith(b"[")]
+    (sessions / "s1.jsonl").write_bytes(b"\n".join(lines + [
+        b'{"type": "message", "content": "NO_REPLY", "totalTokens": 5000}',
+        b'{"type": "compaction", "summary": "second"}',
+        b'{"type": "tool_use", "name": "read", "input": {"path": "GLOBAL-STATE.yaml"}}',
+    ]) + b"\n")
+    args = [os.path.join(TOOLS, "openclaw_compaction_diagnostics.py"), "report",
+            "--sessions-dir", str(sessions), "--workspace", str(tmp_path),
+            "--json", "--no-cache", "--jobs", "1"]
+    assert run(backend, args) == run("json", args)
+
+
+@pytest.mark.parametrize("backend", FAST_BACKENDS)
+def test_telemetry_round_trip_matches_stdlib(tmp_path, backend):
+    data = '{"big": 12345678901234567890123, "ratio": NaN, "floor": -Infinity, "note": "\\ud800"}'
+    outputs = []
+    for name in ("json", backend):
+        ws = tmp_path / name
+        run(name, [os.path.join(TOOLS, "telemetry.py"), "lint_run",
+                   "--workspace", str(ws), "--data", data],
+            env={"OPENCLAW_TELEMETRY_ENABLED": "1"})
+        metrics = ws / "telemetry" / "metrics.jsonl"
+        with metrics.open("a", encoding="utf-8") as f:
+            f.write('{"event": "lint_run", "n": 98765432109876543210}\n')
+            f.write('{"event": "decision_prompt_shown", "x": Infinity}\n')
+            f.write('{"event": "broken"\n')
+            f.write('not json at all\n')
+            f.write('{"event": "tool_profile", "tool": "lint", "wall_ms": 1.5,'
+                    ' "phases": {"parse": {"wall_ms": NaN}}}\n')
+        row = metrics.read_text(encoding="utf-8").splitlines()[0]
+        outputs.append((row.split('"data":', 1)[1],
+                        run(name, [os.path.join(TOOLS, "advanced", "telemetry_report.py"),
+                                   "--workspace", str(ws)])))
+    assert outputs[1] == outputs[0]
+    row, report = outputs[0]
+    assert "12345678901234567890123" in row
+    assert "Events: 4" in report and "- lint_run: 2" in report
@@ -0,0 +1,52 @@
+"""Regression tests for TOOLS/openclaw_lint_decisions.py."""
+from __future__ import annotations
+import os
+import subprocess
+import sys
+
+from conftest import TOOLS
+
+LINTER = os.path.join(TOOLS, "openclaw_lint_decisions.py")
+
+BLOCKS = """[DECISION]
+Date: 2026-01-02
+Decision: Use SQLite for the event index
+Approved by: ops
+Status: ACTIVE
+
+[DECISION]
+Date: 2026-01-03
+Decision: Use SQLite for the event index
+Status: ACTIVE
+"""
+
+
+def lint(*args, cwd):
+    env = dict(os.environ, OPENCLAW_TELEMETRY_ENABLED="1", XDG_CACHE_HOME=str(cwd / "xdg"))
+    return subprocess.run([sys.executable, LINTER, *args], cwd=cwd, env=env,
+                          capture_output=True, text=True)
+
+
+def test_profile_event_goes_to_the_linted_workspace(tmp_path):
+    ws = tmp_path / "ws"
+    (ws / "memory").mkdir(parents=True)
+    (ws / "memory" / "2026-01-03.md").write_text(BLOCKS, encoding="utf-8")
+    elsewhere = tmp_path / "elsewhere"
+    elsewhere.mkdir()
+
+    proc = lint(str(ws / "memory" / "2026-01-03.md"), "--profile", cwd=elsewhere)
+    assert proc.returncode == 2
+    assert "missing fields: Approved by:" in proc.stdout
+    assert "appears multiple times" in proc.stdout
+    assert "2 issue(s)" in proc.stdout
+    assert not (elsewhere / "telemetry").exists()
+    assert not (ws / "memory" / "telemetry").exists()
+
+    report = subprocess.run([sys.executable, os.path.join(TOOLS, "advanced", "telemetry_report.py"),
+                             "--workspace", str(ws)], capture_output=True, text=True, check=True)
+    assert "- tool_profile: 1" in report.stdout
+    assert "- lint_decisions:" in report.stdout
+
+    other = tmp_path / "other"
+    lint(str(ws / "memory" / "2026-01-03.md"), "--profile", "--workspace", str(other), cwd=elsewhere)
+    assert (other / "telemetry" / "metrics.jsonl").exists()
@@ -0,0 +1,78 @@
+"""Regression tests for TOOLS/openclaw_profile.py and the tools' --profile output."""
+from __future__ import annotations
+import json
+import os
+import subprocess
+import sys
+import time
+
+import openclaw_profile
+from conftest import TOOLS, write_lines
+
+
+def test_disabled_profiler_records_nothing():
+    prof = openclaw_profile.Profiler("t")
+    with prof.phase("read"):
+        prof.add("read", nbytes=10, items=1)
+    assert prof.timed("x", len)("abc") == 3
+    assert prof.stop() == (0, 0) and prof.phases == {}
+
+
+def test_nested_phases_report_self_time():
+    openclaw_profile._clock_bias()          # calibrated once, on first use
+    prof = openclaw_profile.Profiler("t", enabled=True)
+    wall0 = time.perf_counter_ns()
+    with prof.phase("outer"):
+        time.sleep(0.02)
+        with prof.phase("inner"):
+            time.sleep(0.05)
+    elapsed = time.perf_counter_ns() - wall0
+    outer, inner = prof.phases["outer"].wall_ns, prof.phases["inner"].wall_ns
+    assert 20e6 <= outer < 45e6 and inner >= 50e6
+    assert abs(outer + inner - elapsed) < 10e6
+    assert prof.to_record()["phases"]["inner"]["calls"] == 1
+
+
+def test_counters():
+    prof = openclaw_profile.Profiler("t", enabled=True)
+    assert list(prof.iter_bytes("read", [b"ab", b"cde"])) == [b"ab", b"cde"]
+    assert list(prof.iter_items("scan", "xyz")) == ["x", "y", "z"]
+    assert prof.timed("parse", lambda s: s.split(), items=len)("a b c d") == ["a", "b", "c", "d"]
+    rec = prof.to_record()["phases"]
+    assert (rec["read"]["bytes"], rec["read"]["items"], rec["read"]["calls"]) == (5, 2, 3)
+    assert rec["scan"]["items"] == 3 and rec["parse"]["items"] == 4
+    assert "read" in prof.format().splitlines()[2]
+
+    event = prof.telemetry_event(command="report")
+    assert (event["event"], event["tool"], event["command"]) == ("tool_profile", "t", "report")
+    assert set(event["phases"]) == {"read", "scan", "parse"}
+
+
+def test_log_event_only_with_telemetry_on(tmp_path, monkeypatch):
+    prof = openclaw_profile.Profiler("t", enabled=True)
+    with prof.phase("read"):
+        pass
+    monkeypatch.delenv("OPENCLAW_TELEMETRY_ENABLED", raising=False)
+    openclaw_profile.log_event(str(tmp_path), prof)
+    assert not (tmp_path / "telemetry").exists()
+    monkeypatch.setenv("OPENCLAW_TELEMETRY_ENABLED", "1")
+    openclaw_profile.log_event(str(tmp_path), prof)
+    with open(tmp_path / "telemetry" / "metrics.jsonl", encoding="utf-8") as f:
+        assert json.loads(f.read())["tool"] == "t"
+
+
+def test_diagnostics_profile_output(tmp_path):
+    (tmp_path / "sessions").mkdir()
+    write_lines(tmp_path / "sessions" / "s.jsonl", [
+        {"type": "message", "content": "NO_REPLY", "totalTokens": 100}, {"type": "compaction"}])
+    env = dict(os.environ, OPENCLAW_TELEMETRY_ENABLED="1")
+    proc = subprocess.run([sys.executable, os.path.join(TOOLS, "openclaw_compaction_diagnostics.py"), "report",
+                           "--sessions-dir", str(tmp_path / "sessions"), "--workspace", str(tmp_path), "--profile"],
+                          capture_output=True, text=True, env=env, check=True)
+    assert "Phase profile (compaction_diagnostics" in proc.stderr
+    assert "compaction.type" in proc.stderr
+    with open(tmp_path / "telemetry" / "metrics.jsonl", encoding="utf-8") as f:
+        events = [json.loads(line) for line in f]
+    profile = next(e for e in events if e["event"] == "tool_profile")
+    assert {"discovery", "read", "analyze", "format"} <= set(profile["phases"])
+    assert profile["detectors"]["compaction.type"]["hits"] == 1
@@ -0,0 +1,469 @@
+"""Regression tests for TOOLS/openclaw_resolve_decisions.py."""
+from __future__ import annotations
+import difflib
+import io
+import os
+import random
+import shutil
+import stat
+import subprocess
+import sys
+
+import pytest
+
+from conftest import TOOLS
+import openclaw_decisions
+import openclaw_resolve_decisions as resolve
+
+RESOLVER = os.path.join(TOOLS, "openclaw_resolve_decisions.py")
+
+THRESHOLDS = [0.0, 0.3, 0.5, 0.65, 0.8, 1.0]
+
+
+def brute_pairs(sets, threshold):
+    return [(i, j, resolve.jaccard_sets(sets[i], sets[j]))
+            for i in range(len(sets)) for j in range(i + 1, len(sets))
+            if resolve.jaccard_sets(sets[i], sets[j]) >= threshold]
+
+
+def random_sets(rng, n, vocab=24):
+    # A small vocabulary, repeated sets and empty sets make plenty of near hits
+    words = [f"w{k}" for k in range(vocab)]
+    sets = [frozenset(rng.sample(words, rng.randint(0, 8))) for _ in range(n)]
+    return sets + [rng.choice(sets) for _ in range(n // 5)]
+
+
+# ── Near-duplicate pairs ─────────────────────────────────────────────
+
+@pytest.mark.parametrize("threshold", THRESHOLDS)
+def test_similar_pairs_equal_brute_force(threshold):
+    rng = random.Random(threshold)
+    for _ in range(20):
+        sets = random_sets(rng, 40)
+        pairs, scored = resolve.similar_pairs(sets, threshold)
+        assert pairs == brute_pairs(sets, threshold)
+        assert scored <= len(sets) * (len(sets) - 1) // 2
+
+
+@pytest.mark.parametrize("threshold", THRESHOLDS)
+def test_token_index_matches_equal_brute_force(threshold):
+    rng = random.Random(threshold)
+    sets = random_sets(rng, 60)
+    index = resolve.TokenIndex(sets, threshold)
+    for probe in random_sets(rng, 30, vocab=30):
+        expected = [(i, resolve.jaccard_sets(s, probe)) for i, s in enumerate(sets)
+                    if resolve.jaccard_sets(s, probe) >= threshold]
+        assert index.matches(probe) == expected
+
+
+@pytest.mark.parametrize("threshold", THRESHOLDS)
+def test_cached_pairs_equal_brute_force_as_sets_change(tmp_path, threshold):
+    rng = random.Random(threshold)
+    path = tmp_path / "decisions.json"
+    sets = random_sets(rng, 50)
+    for _ in range(5):
+        cache = openclaw_decisions.DecisionCache(str(path))
+        pairs, _ = resolve.cached_similar_pairs(sets, threshold, cache)
+        assert pairs == brute_pairs(sets, threshold)
+        cache.save()
+        # Drop some sets, add new ones and reorder the rest for the next run
+        sets = [s for s in sets if rng.random() > 0.2] + random_sets(rng, 10)
+        rng.shuffle(sets)
+
+
+def test_unchanged_sets_reuse_cached_pairs(tmp_path):
+    rng = random.Random(7)
+    sets = random_sets(rng, 50)
+    path = tmp_path / "decisions.json"
+    cache = openclaw_decisions.DecisionCache(str(path))
+    first, scored = resolve.cached_similar_pairs(sets, 0.5, cache)
+    cache.save()
+    assert scored > 0
+    cache = openclaw_decisions.DecisionCache(str(path))
+    again, scored = resolve.cached_similar_pairs(sets, 0.5, cache)
+    assert again == first and scored == 0 and not cache.dirty
+
+
+# ── Span rewrite and patch ───────────────────────────────────────────
+
+def global_state(n, newline="\n", final_newline=True):
+    """n decisions in three groups of exact duplicates, blank lines and notes between."""
+    parts = ["# GLOBAL-STATE", ""]
+    for k in range(n):
+        parts += ["[DECISION]", f"Decision: Use backend {k % 3} for the event store",
+                  "Approved by: owner", f"Date: 2026-01-{k % 28 + 1:02d}", "Status: ACTIVE",
+                  "Domain: infra", ""]
+        if k % 4 == 0:
+            parts += ["[note]", f"checked {k}", ""]
+    text = newline.join(parts[:-1])
+    return (text + newline if final_newline else text).encode("utf-8")
+
+
+def naive_rewrite(data, replacements):
+    """The per-replacement find-and-splice the resolver used before block spans."""
+    text = data.decode("utf-8")
+    for dec, new_block in replacements:
+        if "\r\n" in text:
+            new_block = new_block.replace("\n", "\r\n")
+        old = dec.block.replace("\n", "\r\n") if "\r\n" in text else dec.block
+        k = text.find(old)
+        text = text[:k] + new_block + text[k + len(old):]
+    return text.encode("utf-8")
+
+
+def apply_patch(lines, patch):
+    """Apply a unified diff to a list of lines, checking every context and removed line."""
+    out, pos = [], 0
+    # Lines keep their "\r", so split on "\n" only
+    for line in patch.split("\n")[2:-1]:
+        if line.startswith("@@"):
+            start = int(line.split()[1][1:].split(",")[0]) - 1
+            out += lines[pos:start]
+            pos = start
+        elif line[0] in " -":
+            assert lines[pos] == line[1:]
+            if line[0] == " ":
+                out.append(line[1:])
+            pos += 1
+        else:
+            out.append(line[1:])
+    return out + lines[pos:]
+
+
+def spliced(data):
+    active = [d for d in parse_bytes(data) if d.status == "ACTIVE"]
+    _, replacements = resolve.safe_duplicate_resolution(active)
+    return replacements, resolve.block_spans(data, replacements)
+
+
+def parse_bytes(data):
+    return [openclaw_decisions.Decision("GLOBAL-STATE.yaml", b)
+            for b in openclaw_decisions.scan_blocks(io.BytesIO(data))]
+
+
+@pytest.mark.parametrize("newline", ["\n", "\r\n"])
+@pytest.mark.parametrize("final_newline", [True, False])
+def test_rewrite_matches_find_and_splice(newline, final_newline):
+    data = global_state(40, newline, final_newline)
+    replacements, spans = spliced(data)
+    assert len(spans) == len(replacements) == 37
+    out = resolve.rewrite(data, spans)
+    assert out == naive_rewrite(data, replacements)
+    assert out.count(b"Status: SUPERSEDED") == 37
+    # Line endings and the blank lines between blocks are kept
+    assert out.count(b"\n") - out.count(b"\r\n") == (0 if newline == "\r\n" else out.count(b"\n"))
+    assert out.count(newline.encode() * 2) == data.count(newline.encode() * 2)
+    assert out.endswith(newline.encode()) == final_newline
+
+
+@pytest.mark.parametrize("newline", ["\n", "\r\n"])
+@pytest.mark.parametrize("final_newline", [True, False])
+def test_patch_turns_the_file_into_the_rewrite(tmp_path, newline, final_newline):
+    data = global_state(40, newline, final_newline)
+    _, spans = spliced(data)
+    before = resolve._split_lines(data.decode())
+    after = resolve._split_lines(resolve.rewrite(data, spans).decode())
+    path = tmp_path / "GLOBAL-STATE.yaml"
+    patch = resolve.build_patch(path, data, spans)
+    assert patch.startswith(f"--- {path}\n+++ {path}\n")
+    assert apply_patch(before, patch) == after
+    # Hunks split where a whole-file diff's would
+    hunks = [ln for ln in difflib.unified_diff(before, after, lineterm="") if ln.startswith("@@")]
+    assert [ln for ln in patch.split("\n") if ln.startswith("@@")] == hunks
+
+
+def test_changed_blocks_are_not_spliced():
+    data = global_state(6)
+    replacements, _ = spliced(data)
+    first = replacements[0][0]
+    edited = data[:first.byte_start + 1] + b"X" + data[first.byte_start + 2:]
+    assert [dec for dec, _ in resolve.block_spans(edited, replacements)] == [r[0] for r in replacements[1:]]
+
+
+@pytest.mark.skipif(shutil.which("patch") is None, reason="patch not installed")
+@pytest.mark.parametrize("newline", ["\n", "\r\n"])
+def test_scan_patch_applies_to_the_apply_result(tmp_path, newline):
+    kit = tmp_path / "kit"
+    kit.mkdir()
+    gs = kit / "GLOBAL-STATE.yaml"
+    gs.write_bytes(global_state(12, newline))
+    copy = tmp_path / "copy.yaml"
+    shutil.copy(gs, copy)
+    gs.chmod(0o640)
+    ws = tmp_path / "ws"
+    for cmd in ("scan", "apply"):
+        subprocess.run([sys.executable, RESOLVER, cmd, "--workspace", str(ws), "--kit_dir", str(kit)],
+                       check=True, capture_output=True)
+    subprocess.run(["patch", "--binary", "-s", str(copy), str(ws / "RESOLUTION-PATCH.diff")], check=True)
+    assert copy.read_bytes() == gs.read_bytes()
+    assert gs.read_bytes().count(b"Status: SUPERSEDED") == 9
+    assert stat.S_IMODE(gs.stat().st_mode) == 0o640
+    assert list(kit.iterdir()) == [gs]
+
+
+# ── Memory cross-check ───────────────────────────────────────────────
+
+def block(text, status="ACTIVE", domain=None):
+    lines = ["[DECISION]", f"Decision: {text}", "Approved by: owner", "Date: 2026-03-01"]
+    if status:
+        lines.append(f"Status: {status}")
+    if domain:
+        lines.append(f"Domain: {domain}")
+    return "\n".join(lines) + "\n\n"
+
+
+CANONICAL = (block("Use Postgres for the event store", domain="infra")
+             + block("Deploy from the main branch only", domain="ops")
+             + block("Keep nightly backups for thirty days", "SUPERSEDED", "ops"))
+
+
+def memory_files(kit, files):
+    (kit / "memory").mkdir(parents=True)
+    for name, text in files.items():
+        (kit / name).write_text(text, encoding="utf-8")
+
+
+def test_memory_findings_by_type():
+    canonical = openclaw_decisions.parse_decisions(CANONICAL, "GLOBAL-STATE.yaml")
+    daily = openclaw_decisions.parse_decisions(
+        block("Use Postgres for the event store", status=None)
+        + block("Deploy from the main branch only", "SUPERSEDED")
+        + block("Use Postgres for the event store today", domain="infra")
+        + block("Deploy from the main branch only, always", "SUPERSEDED", "ops")
+        + block("Keep nightly backups for thirty days, offsite", "ACTIVE", "infra")
+        + block("Rotate API keys monthly", "SUPERSEDED")
+        + block("Drop the legacy queue", "SUPERSEDED"),
+        "memory/2026-03-01.md")
+    # The last occurrence's status counts: now ACTIVE and never promoted
+    memory = daily + openclaw_decisions.parse_decisions(block("Rotate API keys monthly"), "MEMORY.md")
+    advisory = resolve.cross_check_memory(memory, canonical)
+    found = [(a["type"], a.get("canonical_key"), a["status"], a["sources"], a["occurrences"]) for a in advisory]
+    pg, deploy, _ = (d.key for d in canonical)
+    assert found == [
+        ("memory_contradicts", deploy, "SUPERSEDED", ["memory/2026-03-01.md"], 1),
+        ("memory_contradicts", deploy, "SUPERSEDED", ["memory/2026-03-01.md"], 1),
+        # A near match in another domain does not count
+        ("memory_unpromoted", None, "ACTIVE", ["memory/2026-03-01.md"], 1),
+        ("memory_unpromoted", None, "ACTIVE", ["memory/2026-03-01.md", "MEMORY.md"], 2),
+        ("memory_near_duplicate", pg, "ACTIVE", ["memory/2026-03-01.md"], 1),
+        ("memory_duplicate", pg, "-", ["memory/2026-03-01.md"], 1),
+    ]
+    assert advisory[0]["similarity"] == 1.0 and advisory[1]["similarity"] < 1.0
+
+
+def brute_near_match(m, canonical, threshold):
+    best = None
+    for g in canonical:
+        sim = resolve.jaccard_sets(g.tokens, m.tokens)
+        if sim < threshold or (m.domain != g.domain and "unknown" not in (m.domain, g.domain)):
+            continue
+        if best is None or sim > best[1]:
+            best = (g, sim)
+    return best
+
+
+@pytest.mark.parametrize("threshold", [0.3, 0.65])
+def test_near_matches_equal_brute_force(threshold):
+    rng = random.Random(23)
+    words = [f"term{k}" for k in range(30)]
+
+    def blocks(n):
+        return "".join(block(" ".join(rng.sample(words, rng.randint(1, 6))),
+                             rng.choice(["ACTIVE", "SUPERSEDED", None]), rng.choice([None, "infra", "ops"]))
+                       for _ in range(n))
+
+    canonical = openclaw_decisions.parse_decisions(blocks(80), "GLOBAL-STATE.yaml")
+    memory = openclaw_decisions.parse_decisions(blocks(200), "MEMORY.md")
+    by_key = {g.key for g in canonical}
+    last = {m.key: m for m in memory}
+    expected = {}
+    for key, m in last.items():
+        best = None if key in by_key else brute_near_match(m, canonical, threshold)
+        if best is not None:
+            expected[key] = (best[0].key, round(best[1], 2))
+    advisory = resolve.cross_check_memory(memory, canonical, threshold)
+    near = {a["key"]: (a["canonical_key"], a["similarity"]) for a in advisory
+            if "canonical_key" in a and a["key"] not in by_key}
+    assert expected and near == expected
+
+
+def test_memory_files_parse_the_same_in_parallel(tmp_path):
+    kit = tmp_path / "kit"
+    memory_files(kit, {"MEMORY.md": block("Rotate API keys monthly")})
+    for day in range(1, 21):
+        (kit / "memory" / f"2026-03-{day:02d}.md").write_text(
+            block(f"Decision number {day}") + block("Rotate API keys monthly", "SUPERSEDED"), encoding="utf-8")
+    serial, n = resolve.parse_memory(kit, jobs=1)
+    parallel, _ = resolve.parse_memory(kit, jobs=4)
+    assert n == 21 and len(serial) == 41
+    assert [(d.source, d.to_record()) for d in parallel] == [(d.source, d.to_record()) for d in serial]
+    assert serial[0].source == "MEMORY.md" and serial[-1].source == "memory/2026-03-20.md"
+
+
+# ── Parsed-decision cache ────────────────────────────────────────────
+
+def scan(kit, ws, *args):
+    proc = subprocess.run([sys.executable, RESOLVER, "scan", "--workspace", str(ws), "--kit_dir", str(kit),
+                           "--include_memory", "--jobs", "1", *args], check=True, capture_output=True)
+    draft = (ws / "RESOLUTION-DRAFT.yaml").read_text(encoding="utf-8")
+    return proc, [ln for ln in draft.splitlines() if "generated" not in ln]
+
+
+def test_cached_scans_match_uncached(tmp_path):
+    kit, ws = tmp_path / "kit", tmp_path / "ws"
+    memory_files(kit, {"GLOBAL-STATE.yaml": global_state(9).decode() + CANONICAL,
+                       "MEMORY.md": block("Rotate API keys monthly")})
+    (kit / "memory" / "2026-03-01.md").write_text(block("Use backend 1 for the event store today"), encoding="utf-8")
+    _, uncached = scan(kit, tmp_path / "plain", "--no-cache")
+    assert not (tmp_path / "plain" / ".cache").exists()
+
+    _, first = scan(kit, ws)
+    cache_file = ws / ".cache" / "decisions.json"
+    written = cache_file.stat().st_mtime_ns
+    _, second = scan(kit, ws)
+    assert first == second == uncached
+    # An all-hit run leaves the cache file alone
+    assert cache_file.stat().st_mtime_ns == written
+
+    (kit / "memory" / "2026-03-02.md").write_text(block("Keep nightly backups for thirty days"), encoding="utf-8")
+    _, third = scan(kit, ws)
+    assert cache_file.stat().st_mtime_ns != written
+    assert third == scan(kit, tmp_path / "plain", "--no-cache")[1] != first
+
+
+# ── Fleet mode ───────────────────────────────────────────────────────
+
+MANIFEST = """version: 1
+agents: []
+cross_agent_decisions:
+  - id: XD-2026-03-01-001
+    summary: "Use Postgres for the event store"   # shared store
+    affects: ["dev", "ops"]
+    status: ACTIVE
+  - id: XD-2026-03-01-002
+    summary: "Ship on Fridays"
+    status: ACTIVE
+  - id: XD-2026-03-01-003
+    status: SUPERSEDED
+pending_requests:
+  - id: REQ-dev-2026-03-01-001
+    status: ACTIVE
+"""
+
+
+def fleet(kit, files):
+    for name, text in files.items():
+        (kit / name).parent.mkdir(parents=True, exist_ok=True)
+        (kit / name).write_text(text, encoding="utf-8")
+
+
+def fleet_collisions(kit, threshold=0.65, cache=None):
+    paths, sources, owners = resolve.discover_fleet(kit)
+    parsed = resolve.parse_files(paths, sources, 1)
+    decisions = [d for file_decisions in parsed for d in file_decisions]
+    decision_owners = [o for o, file_decisions in zip(owners, parsed) for _ in file_decisions]
+    shared = {p.stem: fd[-1].status for p, o, fd in zip(paths, owners, parsed) if o == "shared"}
+    manifest = resolve.read_manifest_decisions(kit / "shared" / "MANIFEST.yaml")
+    return resolve.detect_fleet_collisions(decisions, decision_owners, manifest, shared, threshold, cache)
+
+
+def test_fleet_discovery_and_manifest(tmp_path):
+    fleet(tmp_path, {
+        "GLOBAL-STATE.yaml": "", "shared/MANIFEST.yaml": MANIFEST,
+        "shared/decisions/XD-2026-03-01-001.yaml": "", "shared/decisions/notes.txt": "",
+        "agents/ops/memory/2026-03-02.md": "", "agents/ops/memory/2026-03-01.md": "",
+        "agents/dev/MEMORY.md": "", "agents/.hidden/MEMORY.md": "",
+    })
+    paths, sources, owners = resolve.discover_fleet(tmp_path)
+    assert sources == ["GLOBAL-STATE.yaml", "shared/decisions/XD-2026-03-01-001.yaml", "agents/dev/MEMORY.md",
+                       "agents/ops/memory/2026-03-01.md", "agents/ops/memory/2026-03-02.md"]
+    assert owners == ["global", "shared", "dev", "ops", "ops"]
+    assert paths == [tmp_path / s for s in sources]
+    assert resolve.read_manifest_decisions(tmp_path / "shared" / "MANIFEST.yaml") == [
+        {"line": 4, "id": "XD-2026-03-01-001", "summary": "Use Postgres for the event store",
+         "affects": '["dev", "ops"]', "status": "ACTIVE"},
+        {"line": 8, "id": "XD-2026-03-01-002", "summary": "Ship on Fridays", "status": "ACTIVE"},
+        {"line": 11, "id": "XD-2026-03-01-003", "status": "SUPERSEDED"},
+    ]
+
+
+def test_fleet_collisions(tmp_path):
+    fleet(tmp_path, {
+        "GLOBAL-STATE.yaml": block("Use Postgres for the event store", domain="infra"),
+        "shared/MANIFEST.yaml": MANIFEST,
+        "shared/decisions/XD-2026-03-01-001.yaml": block("Use Postgres for the event store", domain="infra"),
+        "shared/decisions/XD-2026-03-01-003.yaml": block("Retire the cron runner", domain="ops"),
+        "agents/dev/MEMORY.md": block("Deploy from the main branch only", domain="ops")
+                                + block("Deploy from the main branch only", domain="ops"),
+        # A later log supersedes the earlier ACTIVE copy
+        "agents/dev/memory/2026-03-01.md": block("Rotate API keys monthly"),
+        "agents/dev/memory/2026-03-02.md": block("Rotate API keys monthly", "SUPERSEDED"),
+        "agents/ops/MEMORY.md": block("Rotate API keys monthly")
+                                + block("Deploy from the main branch only, always", domain="ops")
+                                + block("Use Postgres for the event store today", domain="sales"),
+    })
+    found = fleet_collisions(tmp_path)
+    assert [(c["type"], c["owners"]) for c in found["collisions"]] == [
+        ("cross_agent_duplicate", ["global", "shared"]),
+        ("cross_agent_near_duplicate", ["dev", "ops"]),
+    ]
+    near = found["collisions"][1]
+    assert near["domain"] == "ops" and near["similarity"] == 0.83
+    # The last occurrence of a repeated decision is the one reported
+    assert near["a_sources"] == ["dev: agents/dev/MEMORY.md:8"] and near["b_sources"] == ["ops: agents/ops/MEMORY.md:7"]
+    assert found["collisions"][0]["sources"] == ["global: GLOBAL-STATE.yaml:1",
+                                                 "shared: shared/decisions/XD-2026-03-01-001.yaml:1"]
+    assert found["issues"] == [
+        {"type": "manifest_missing_file", "id": "XD-2026-03-01-002", "status": "ACTIVE", "lines": [8, 8]},
+        {"type": "manifest_status_mismatch", "id": "XD-2026-03-01-003", "status": "SUPERSEDED",
+         "file_status": "ACTIVE", "lines": [11, 11]},
+    ]
+    # Per owner: global 1, shared 2, dev 1 (its key rotation was superseded), ops 3
+    assert found["active"] == 7
+
+
+@pytest.mark.parametrize("threshold", [0.3, 0.65, 1.0])
+def test_fleet_collisions_equal_brute_force(tmp_path, threshold):
+    rng = random.Random(25)
+    words = [f"term{k}" for k in range(20)]
+    files = {}
+    for agent in ("a", "b", "c", "d"):
+        for day in range(1, 6):
+            files[f"agents/{agent}/memory/2026-03-0{day}.md"] = "".join(
+                block(" ".join(rng.sample(words, rng.randint(1, 5))), rng.choice(["ACTIVE", "ACTIVE", "SUPERSEDED"]),
+                      rng.choice([None, "infra", "ops"])) for _ in range(8))
+    fleet(tmp_path, files)
+    paths, sources, owners = resolve.discover_fleet(tmp_path)
+    last = {}
+    for p, owner in zip(paths, owners):
+        for d in openclaw_decisions.parse_file(p, str(p)):
+            last[(owner, d.key)] = d
+    held = [(owner, d) for (owner, _), d in last.items() if d.status == "ACTIVE"]
+    expected = set()
+    for x, (ox, dx) in enumerate(held):
+        for oy, dy in held[x + 1:]:
+            sim = resolve.jaccard_sets(dx.tokens, dy.tokens)
+            if ox != oy and dx.tokens != dy.tokens and sim >= threshold \
+                    and (dx.domain == dy.domain or "unknown" in (dx.domain, dy.domain)):
+                expected.add(frozenset((dx.key, dy.key)))
+
+    cache = openclaw_decisions.DecisionCache(str(tmp_path / "decisions.json"))
+    for run in (None, cache, cache):
+        found = fleet_collisions(tmp_path, threshold, run)
+        near = {frozenset((c["a_key"], c["b_key"])) for c in found["collisions"]
+                if c["type"] == "cross_agent_near_duplicate"}
+        assert near == expected
+    assert expected or threshold == 1.0
+
+
+def test_fleet_scan_writes_drafts(tmp_path):
+    kit, ws = tmp_path / "kit", tmp_path / "ws"
+    fleet(kit, {"agents/dev/MEMORY.md": block("Rotate API keys monthly"),
+                "agents/ops/MEMORY.md": block("Rotate API keys monthly")})
+    args = ["--workspace", str(ws), "--kit_dir", str(kit), "--fleet", "--jobs", "1"]
+    subprocess.run([sys.executable, RESOLVER, "scan", *args], check=True, capture_output=True)
+    md = (ws / "FLEET-DRAFT.md").read_text(encoding="utf-8")
+    assert "- Agents: 2 (dev, ops)" in md and "- Cross-agent duplicates: 1" in md
+    assert "  - ops: agents/ops/MEMORY.md:1" in md
+    proc = subprocess.run([sys.executable, RESOLVER, "apply", *args], capture_output=True, text=True)
+    assert proc.returncode == 2 and "scan-only" in proc.stderr